@@ -4,6 +4,7 @@ import requests
 import psycopg2
 from flask import Flask, jsonify, request
 from groq import Groq
+from upstream import api_ninjas
 
 
 # Load environment variables
@@ -36,9 +37,8 @@ def get_db_connection():
 
 # PART-1: Make a request and print the response
 def fetch_country_data(country_name):
-    api_url = f"https://api.api-ninjas.com/v1/country?name={country_name}"
     try:
-        response = requests.get(api_url, headers={'X-Api-Key': API_KEY})
+        response = api_ninjas.get('/v1/country', params={'name': country_name}, headers={'X-Api-Key': API_KEY})
         response.raise_for_status()  # Raises an HTTPError for bad responses
         data = response.json()[0]
         print("API Response:", data)  # Print the response
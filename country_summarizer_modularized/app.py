@@ -1,21 +1,38 @@
+import os
+import time
+
+# Taken before the heavy imports, so cold-start time includes them
+_STARTED = time.perf_counter()
+
 from flask import Flask
 from dotenv import load_dotenv
 from routes import setup_routes
-from config import setup_database
+from config import setup_database, get_pool, logger
 
 # Load environment variables
 load_dotenv()
 
-# Flask application setup
-app = Flask(__name__)
 
-# Setup database
-setup_database()
+def create_app(config=None):
+    """Builds the Flask app; SETUP_DATABASE=0 skips the table DDL when a release step already ran it."""
+    app = Flask(__name__)
+    app.config.update(SETUP_DATABASE=os.getenv('SETUP_DATABASE', '1') == '1')
+    app.config.update(config or {})
 
-# Setup routes
-setup_routes(app)
+    # Setup database
+    if app.config['SETUP_DATABASE']:
+        setup_database()
+    else:
+        # Still open the pool before the first request instead of during it
+        get_pool()
 
-if __name__ == '__main__':
-    app.run(debug=True)
+    # Setup routes
+    setup_routes(app)
 
-# db_config
\ No newline at end of file
+    app.config['COLD_START_SECONDS'] = time.perf_counter() - _STARTED
+    logger.info(f"App ready in {app.config['COLD_START_SECONDS']:.3f}s")
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(debug=True)
@@ -1,6 +1,10 @@
 import os
+import time
 import psycopg2
 import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -10,26 +14,237 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    try:
-        connection = psycopg2.connect( #it is a python drive for postgres
-            host=os.getenv('DB_HOST'),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            port=int(os.getenv('DB_PORT', 5432))
-        )
+# Pool sizing and behaviour, all overridable through the environment
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))  # idle seconds before a ping
+
+
+class DatabaseUnavailableError(Exception):
+    """Raised when a database connection cannot be opened or borrowed from the pool."""
+
+
+class PoolTimeoutError(DatabaseUnavailableError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections with health checks and usage stats."""
+
+    def __init__(self, min_size, max_size, timeout, health_check_interval, **connect_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size=%s max_size=%s" % (min_size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at) pairs, most recently used on the right
+        self._size = 0  # open connections, idle + checked out
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'connect_failures': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+            'wait_time_total': 0.0,
+        }
+
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        try:
+            connection = psycopg2.connect(**self.connect_kwargs)  #it is a python drive for postgres
+        except psycopg2.Error as e:
+            with self._cond:
+                self._size -= 1
+                self._stats['connect_failures'] += 1
+                self._cond.notify()
+            logger.error(f"Error connecting to database: {e}")
+            raise DatabaseUnavailableError(f"Could not connect to database: {e}") from e
+        with self._cond:
+            self._stats['connects'] += 1
         return connection
-    except Exception as e:
-        logger.error(f"Error connecting to database: {e}")
-        return None
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def getconn(self, timeout=None):
+        """Borrows a connection, waiting up to `timeout` seconds for one to free up."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise DatabaseUnavailableError("Connection pool is closed")
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        create = False
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, idle_since, create = None, None, True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if create:
+                conn = self._connect()
+            elif not self._is_healthy(conn, idle_since):
+                # Broken or dropped by the server, replace it with a fresh one
+                logger.warning("Discarding broken pooled database connection")
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """Returns a borrowed connection, closing it instead if it is broken."""
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrows a connection for one transaction: commits on success, rolls back on error."""
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, discard=broken or conn.closed)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        return stats
+
+    def closeall(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+                    host=os.getenv('DB_HOST'),
+                    database=os.getenv('DB_NAME'),
+                    user=os.getenv('DB_USER'),
+                    password=os.getenv('DB_PASSWORD'),
+                    port=int(os.getenv('DB_PORT', 5432))
+                )
+    return _pool
+
+
+def get_db_connection(timeout=None):
+    """Borrows a pooled connection as a context manager; raises DatabaseUnavailableError on failure."""
+    return get_pool().connection(timeout)
+
+
+def get_pool_stats():
+    """Returns usage stats for the connection pool, or None if it has not been created yet."""
+    return _pool.stats() if _pool is not None else None
+
 
 def setup_database():
-    conn = get_db_connection()
-    if not conn:
+    try:
+        with get_db_connection() as conn:
+            _create_tables(conn)
+    except DatabaseUnavailableError:
         logger.error("Failed to connect to the database. Cannot set up tables.")
-        return
+        raise
+    logger.info("Database setup completed successfully.")
 
+def _create_tables(conn):
     cursor = conn.cursor()  #a cursor object is an interface to execute SQL commands and retrieve data from a database. It allows the program to execute queries, fetch data, and navigate through records one by one or in batches.
     
     try:
@@ -48,15 +263,11 @@ def setup_database():
             gdp_per_capita FLOAT
         );
         """)
-        
-        conn.commit()
-        logger.info("Database setup completed successfully.")
     except Exception as e:
-        conn.rollback()
         logger.error(f"Error setting up database: {e}")
+        raise
     finally:
         cursor.close()
-        conn.close()
 
 if __name__ == "__main__":
     setup_database()
@@ -1,10 +1,9 @@
 from flask import jsonify, request
 from services import (
     fetch_country_data, store_country_data, get_country_data, get_country_data_summary,
-    fetch_economy_data, store_economy_data, get_economy_data
+    fetch_economy_data, store_economy_data, get_economy_data, get_groq_client
 )
 from prompts import get_prompt_for_parameter, format_prompt, get_comprehensive_prompt
-from groq import Groq
 import os
 import logging
 
@@ -12,12 +11,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set up Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
 def generate_summary(prompt):
     try:
-        chat_completion = groq_client.chat.completions.create(
+        chat_completion = get_groq_client().chat.completions.create(
             messages=[
                 {
                     "role": "system",
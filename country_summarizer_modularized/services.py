@@ -1,6 +1,7 @@
 import os
 import requests
-from config import get_db_connection
+from config import get_db_connection, DatabaseUnavailableError
+from upstream import api_ninjas
 from groq import Groq
 import logging
 
@@ -11,12 +12,19 @@ logger = logging.getLogger(__name__)
 # Your API keys
 API_KEY = os.getenv('YOUR_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-groq_client = Groq(api_key=GROQ_API_KEY)
+_groq_client = None
+
+
+def get_groq_client():
+    """Returns the Groq client, building it on first use so importing needs no credentials."""
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = Groq(api_key=GROQ_API_KEY)
+    return _groq_client
 
 def fetch_country_data(country_name):
     """Fetches country data from an external API."""
-    api_url = f"https://api.api-ninjas.com/v1/country?name={country_name}"
-    response = requests.get(api_url, headers={'X-Api-Key': API_KEY})
+    response = api_ninjas.get('/v1/country', params={'name': country_name}, headers={'X-Api-Key': API_KEY})
     if response.status_code == 200:
         data = response.json()[0]
         return {
@@ -36,9 +44,6 @@ def fetch_country_data(country_name):
 
 def store_country_data(data):
     """Stores country data in the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     insert_query = """
     INSERT INTO country_economy (
         country_name, surface_area, exports, tourists, gdp, population,
@@ -58,34 +63,30 @@ def store_country_data(data):
         gdp_per_capita = EXCLUDED.gdp_per_capita;
     """
     
-    cursor.execute(insert_query, (
-        data['country_name'],
-        float(data.get('surface_area', 0)),
-        float(data.get('exports', 0)),
-        float(data.get('tourists', 0)),
-        float(data.get('gdp', 0)),
-        int(data.get('population', 0)),
-        float(data.get('imports', 0)),
-        float(data.get('urban_population_growth', 0)),
-        int(data.get('urban_population', 0)),
-        float(data.get('gdp_growth', 0)),
-        float(data.get('gdp_per_capita', 0))
-    ))
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(insert_query, (
+            data['country_name'],
+            float(data.get('surface_area', 0)),
+            float(data.get('exports', 0)),
+            float(data.get('tourists', 0)),
+            float(data.get('gdp', 0)),
+            int(data.get('population', 0)),
+            float(data.get('imports', 0)),
+            float(data.get('urban_population_growth', 0)),
+            int(data.get('urban_population', 0)),
+            float(data.get('gdp_growth', 0)),
+            float(data.get('gdp_per_capita', 0))
+        ))
+        cursor.close()
 
 def get_country_data(country_name):
     """Retrieves country data from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
-    country_data = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
+        country_data = cursor.fetchone()
+        cursor.close()
     
     if country_data:
         return {
@@ -119,7 +120,7 @@ def get_country_data_summary(country_name):
     Provide insights on the country's economy, tourism, and demographics in a paragraph."""
 
     try:
-        response = groq_client.chat.completions.create(
+        response = get_groq_client().chat.completions.create(
             messages=[
                 {
                     "role": "system",
@@ -142,9 +143,6 @@ def get_country_data_summary(country_name):
     
 def store_economy_data(country_name, data):
     """Stores country economic data in the country_economy table."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     insert_query = """
     INSERT INTO country_economy (
         country_name, imports, urban_population_growth, exports,
@@ -163,36 +161,35 @@ def store_economy_data(country_name, data):
     """
 
     try:
-        cursor.execute(insert_query, (
-            country_name,
-            data.get('imports', 0),
-            data.get('urban_population_growth', 0),
-            data.get('exports', 0),
-            data.get('population', 0),
-            data.get('urban_population', 0),
-            data.get('gdp', 0),
-            data.get('gdp_growth', 0),
-            data.get('gdp_per_capita', 0)
-        ))
-        conn.commit()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(insert_query, (
+                    country_name,
+                    data.get('imports', 0),
+                    data.get('urban_population_growth', 0),
+                    data.get('exports', 0),
+                    data.get('population', 0),
+                    data.get('urban_population', 0),
+                    data.get('gdp', 0),
+                    data.get('gdp_growth', 0),
+                    data.get('gdp_per_capita', 0)
+                ))
+            finally:
+                cursor.close()
         logger.info(f"Economy data for {country_name} stored successfully.")
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        conn.rollback()
         logger.error(f"Error storing economy data for {country_name}: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
 
 def get_economy_data(country_name):
     """Retrieves economy data from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
-    economy_data = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
+        economy_data = cursor.fetchone()
+        cursor.close()
 
     if economy_data:
         return {
@@ -211,10 +208,8 @@ def get_economy_data(country_name):
 
 def fetch_economy_data(country_name):
     """Fetches country data including economic indicators."""
-    api_url = f"https://api.api-ninjas.com/v1/country?name={country_name}"
-    
     try:
-        response = requests.get(api_url, headers={'X-Api-Key': API_KEY})
+        response = api_ninjas.get('/v1/country', params={'name': country_name}, headers={'X-Api-Key': API_KEY})
         response.raise_for_status()
         
         if response.status_code == 200:
@@ -0,0 +1,115 @@
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+API_NINJAS_BASE_URL = os.getenv('API_NINJAS_BASE_URL', 'https://api.api-ninjas.com')
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 10))
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 3))
+UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', 0.25))  # seconds
+UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', 8))  # seconds
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 20))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client with timeouts, jittered retries and per-call latency stats."""
+
+    def __init__(self, base_url, connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT,
+                 max_retries=UPSTREAM_MAX_RETRIES, backoff_base=UPSTREAM_BACKOFF_BASE,
+                 backoff_max=UPSTREAM_BACKOFF_MAX, pool_size=UPSTREAM_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        # Retries are handled in get() so they can be jittered and counted
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'attempts': 0,
+            'retries': 0,
+            'errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'status_counts': {},
+        }
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: a random delay up to the exponential ceiling
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, latency, status=None, error=False):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['latency_total'] += latency
+            self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            if error:
+                self._stats['errors'] += 1
+            if status is not None:
+                key = str(status)
+                self._stats['status_counts'][key] = self._stats['status_counts'].get(key, 0) + 1
+
+    def get(self, path, params=None, headers=None):
+        """Sends a GET, retrying 429/5xx responses and connection failures with jittered backoff.
+
+        Returns the final response (which may still be an error status) or raises the last
+        requests.RequestException once the retries are used up.
+        """
+        url = f"{self.base_url}{path}"
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            with self._lock:
+                self._stats['attempts'] += 1
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+                logger.warning(f"Upstream call to {path} failed ({e}), retrying")
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, response.status_code,
+                                 error=response.status_code >= 400)
+                    return response
+                logger.warning(f"Upstream call to {path} returned {response.status_code}, retrying")
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                response.close()
+
+            with self._lock:
+                self._stats['retries'] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['status_counts'] = dict(self._stats['status_counts'])
+        stats['latency_avg'] = stats['latency_total'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+api_ninjas = UpstreamClient(API_NINJAS_BASE_URL)
@@ -1,21 +1,54 @@
+import time
+
+# Taken before the heavy imports, so cold-start time includes them
+_STARTED = time.perf_counter()
+
 from flask import Flask
 from dotenv import load_dotenv
-from routes.endpoints import setup_routes
-from models.db_config import setup_database
 
-# Load environment variables
+# Load environment variables before the app modules read them
 load_dotenv()
 
-# Flask application setup
-app = Flask(__name__)
+from routes.endpoints import setup_routes
+from services.startup import (
+    SETUP_STORAGE, APP_PRELOAD, run_schema_setup, warm_caches, prepare_fork, start_worker, record_cold_start,
+    running_cli_command
+)
 
-# Setup database
-setup_database()
 
-# Setup routes
-setup_routes(app)
+def create_app(config=None):
+    """Builds the Flask app.
 
-if __name__ == '__main__':
-    app.run(debug=True)
+    `config` overrides SETUP_STORAGE (create tables now), PRELOAD (warm caches, then close connections so
+    the server can fork workers; each worker then calls services.startup.start_worker, see gunicorn.conf.py)
+    and START_BACKGROUND (set up storage, warm caches and start background threads; off when a `flask` CLI
+    command other than `run` loads the app).
+    """
+    app = Flask(__name__)
+    app.config.update(SETUP_STORAGE=SETUP_STORAGE, PRELOAD=APP_PRELOAD, START_BACKGROUND=not running_cli_command())
+    app.config.update(config or {})
+
+    if app.config['START_BACKGROUND']:
+        if app.config['SETUP_STORAGE']:
+            run_schema_setup()
+        warm_caches()
+        if app.config['PRELOAD']:
+            prepare_fork()
+        else:
+            start_worker()
 
-# db_config
\ No newline at end of file
+    # Setup routes
+    setup_routes(app)
+
+    @app.cli.command('setup-storage')
+    def setup_storage_command():
+        """Create the storage backend's tables (run once per deployment)."""
+        run_schema_setup()
+
+    if app.config['START_BACKGROUND']:
+        record_cold_start('preload' if app.config['PRELOAD'] else 'single', _STARTED)
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(debug=True)
@@ -0,0 +1,53 @@
+import time
+
+# Taken before the heavy imports, so cold-start time includes them
+_STARTED = time.perf_counter()
+
+from quart import Quart
+from dotenv import load_dotenv
+
+# Load environment variables before the route modules read them
+load_dotenv()
+
+from routes.async_endpoints import setup_async_routes
+from models.async_db_operations import get_async_pool, close_async_pool, USE_ASYNCPG
+from services.async_upstream import async_api_ninjas
+from services.startup import SETUP_STORAGE, run_schema_setup, warm_caches, start_worker, record_cold_start
+
+
+def create_app(config=None):
+    """Builds the async (ASGI) app, serving the same routes as app.py.
+
+    Run with: hypercorn 'asgi:create_app()' --bind 0.0.0.0:5000
+    Hypercorn imports the app in every worker, so pair several workers with SETUP_STORAGE=0 and a
+    one-off `flask --app app setup-storage`.
+    """
+    app = Quart(__name__)
+    app.config.update(SETUP_STORAGE=SETUP_STORAGE)
+    app.config.update(config or {})
+
+    if app.config['SETUP_STORAGE']:
+        run_schema_setup()
+    warm_caches()
+    start_worker()
+
+    # Setup routes
+    setup_async_routes(app)
+
+    @app.before_serving
+    async def open_pools():
+        # Opened before the first request rather than by it
+        if USE_ASYNCPG:
+            await get_async_pool()
+
+    @app.after_serving
+    async def close_pools():
+        await close_async_pool()
+        await async_api_ninjas.aclose()
+
+    record_cold_start('async', _STARTED)
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(debug=True)
@@ -0,0 +1,119 @@
+"""Microbenchmark for utils.prompts.format_prompt.
+
+Compares the compiled-template renderer against the previous implementation, which copied the
+data, redefined a string.Formatter subclass and re-parsed the template on every call.
+
+    python -m benchmarks.bench_format_prompt [--number 20000]
+"""
+import json
+import string
+import argparse
+import timeit
+
+from utils.prompts import (
+    format_prompt, derive_metrics, POPULATION_DENSITY_PROMPT, TRADE_PROMPT, IMPORT_EXPORT_PROMPT, COMPREHENSIVE_PROMPT
+)
+
+SAMPLE_COUNTRY = {
+    'country_name': 'India',
+    'surface_area': 3287263.0,
+    'exports': 323.3,
+    'tourists': 17914.0,
+    'gdp': 2875142.0,
+    'population': 1380004385,
+    'imports': 486.1,
+    'urban_population_growth': 2.3,
+    'urban_population': 483098640,
+    'gdp_growth': 4.2,
+    'gdp_per_capita': 2104.1,
+}
+
+TEMPLATES = {
+    'population_density': POPULATION_DENSITY_PROMPT,
+    'trade': TRADE_PROMPT,
+    'import_export': IMPORT_EXPORT_PROMPT,
+    'comprehensive': COMPREHENSIVE_PROMPT,
+}
+
+
+def legacy_format_prompt(prompt, country_name, data):
+    """The format_prompt implementation before templates were precompiled, kept for comparison."""
+    formatted_data = data.copy()
+    formatted_data['country_name'] = country_name
+
+    def safe_calc(operation, default=0):
+        try:
+            return operation()
+        except (KeyError, TypeError, ZeroDivisionError):
+            return default
+
+    formatted_data['urban_population_percentage'] = safe_calc(lambda: (formatted_data.get('urban_population', 0) / formatted_data.get('population', 1)) * 100)
+    formatted_data['population_density'] = safe_calc(lambda: formatted_data.get('population', 0) / formatted_data.get('surface_area', 1))
+    formatted_data['trade_to_gdp_ratio'] = safe_calc(lambda: ((formatted_data.get('exports', 0) + formatted_data.get('imports', 0)) / formatted_data.get('gdp', 1)) * 100)
+    formatted_data['trade_balance'] = safe_calc(lambda: formatted_data.get('exports', 0) - formatted_data.get('imports', 0))
+    formatted_data['trade_balance_status'] = 'surplus' if formatted_data['trade_balance'] > 0 else 'deficit'
+    formatted_data['exports_to_gdp_ratio'] = safe_calc(lambda: (formatted_data.get('exports', 0) / formatted_data.get('gdp', 1)) * 100)
+    formatted_data['imports_to_gdp_ratio'] = safe_calc(lambda: (formatted_data.get('imports', 0) / formatted_data.get('gdp', 1)) * 100)
+    formatted_data['trade_openness_index'] = safe_calc(lambda: ((formatted_data.get('exports', 0) + formatted_data.get('imports', 0)) / formatted_data.get('gdp', 1)) * 100)
+
+    required_fields = ['population', 'urban_population', 'urban_population_growth', 'gdp', 'gdp_growth', 'gdp_per_capita', 'exports', 'imports', 'surface_area']
+    for field in required_fields:
+        if field not in formatted_data or formatted_data[field] is None:
+            formatted_data[field] = "N/A"
+
+    for key, value in formatted_data.items():
+        if isinstance(value, (int, float)):
+            if abs(value) >= 1e9:
+                formatted_data[key] = f"{value/1e9:.2f} billion"
+            elif abs(value) >= 1e6:
+                formatted_data[key] = f"{value/1e6:.2f} million"
+            elif abs(value) >= 1e3:
+                formatted_data[key] = f"{value/1e3:.2f} thousand"
+            else:
+                formatted_data[key] = f"{value:.2f}"
+        elif value == "N/A":
+            formatted_data[key] = "N/A"
+
+    class CustomFormatter(string.Formatter):
+        def format_field(self, value, format_spec):
+            if format_spec.endswith('f') and not isinstance(value, (int, float)):
+                return value
+            return super().format_field(value, format_spec)
+
+    formatter = CustomFormatter()
+    return formatter.format(prompt, **formatted_data)
+
+
+# A row as read back from Postgres, with the generated metric columns already filled in
+STORED_COUNTRY = dict(SAMPLE_COUNTRY, **derive_metrics(SAMPLE_COUNTRY))
+
+
+def run(number):
+    results = {}
+    for name, template in TEMPLATES.items():
+        # Both implementations must produce the exact same prompt
+        expected = legacy_format_prompt(template, 'India', SAMPLE_COUNTRY)
+        assert format_prompt(template, 'India', SAMPLE_COUNTRY) == expected
+        assert format_prompt(template, 'India', STORED_COUNTRY) == expected
+
+        before = min(timeit.repeat(lambda: legacy_format_prompt(template, 'India', SAMPLE_COUNTRY), number=number, repeat=3))
+        after = min(timeit.repeat(lambda: format_prompt(template, 'India', SAMPLE_COUNTRY), number=number, repeat=3))
+        stored = min(timeit.repeat(lambda: format_prompt(template, 'India', STORED_COUNTRY), number=number, repeat=3))
+        results[name] = {
+            'before_us_per_call': round(before / number * 1e6, 2),
+            'after_us_per_call': round(after / number * 1e6, 2),
+            'after_stored_metrics_us_per_call': round(stored / number * 1e6, 2),
+            'speedup': round(before / after, 2),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark format_prompt before/after template precompilation.")
+    parser.add_argument('--number', type=int, default=20000, help="Calls per timing run")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.number), indent=2))
+
+
+if __name__ == '__main__':
+    main()
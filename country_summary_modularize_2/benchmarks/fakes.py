@@ -0,0 +1,182 @@
+"""Local stand-ins for API-Ninjas and the Groq chat completions API, used by the load test.
+
+Both run as threaded HTTP servers on 127.0.0.1 and are pointed at through API_NINJAS_BASE_URL and
+GROQ_BASE_URL, so the application code under test is exactly what runs in production.
+"""
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'countries.json')
+
+# Text the fake LLM repeats until it has produced the requested number of tokens
+LOREM_TOKENS = (
+    "The economy shows steady growth supported by trade, a growing urban population and stable "
+    "investment, while rising imports and infrastructure needs remain the main challenges ahead."
+).split()
+
+
+def load_fixture(path=FIXTURE_PATH):
+    """Returns {country name: API-Ninjas /v1/country payload} from a fixture file."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class _FakeServer:
+    """Runs a ThreadingHTTPServer on an ephemeral port in a daemon thread."""
+
+    handler_class = None
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _CountryHandler(_Handler):
+    def do_GET(self):
+        fake = self.server.fake
+        fake.count()
+        url = urlparse(self.path)
+        if url.path != '/v1/country':
+            return self.send_json(404, {"error": "Not found"})
+        if fake.latency:
+            time.sleep(fake.latency)
+        name = parse_qs(url.query).get('name', [''])[0]
+        self.send_json(200, fake.countries.get(name.strip().lower(), []))
+
+
+class FakeCountryAPI(_FakeServer):
+    """Serves /v1/country fixture data by name or ISO-2 code after `latency` seconds; unknown countries return []."""
+
+    handler_class = _CountryHandler
+
+    def __init__(self, countries, latency=0.0):
+        super().__init__()
+        self.countries = {name.lower(): payload for name, payload in countries.items()}
+        # Like API-Ninjas, also answer to a country's ISO-2 code
+        self.countries.update({
+            payload[0]['iso2'].lower(): payload for payload in countries.values() if payload and payload[0].get('iso2')
+        })
+        self.latency = latency
+
+
+class _ChatHandler(_Handler):
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count()
+        if urlparse(self.path).path != '/openai/v1/chat/completions':
+            return self.send_json(404, {"error": {"message": "Not found"}})
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        tokens = fake.completion_tokens(body)
+        if body.get('stream'):
+            return self.stream(body, tokens)
+        sections = fake.json_sections(body)
+        if sections:
+            # JSON mode: one section per requested key, each as long as a single summary
+            time.sleep(fake.latency + len(tokens) * len(sections) * fake.token_interval)
+            content = json.dumps({section: "".join(tokens).strip() for section in sections})
+        else:
+            time.sleep(fake.latency + len(tokens) * fake.token_interval)
+            content = "".join(tokens)
+        self.send_json(200, fake.completion(body, content))
+
+    def stream(self, body, tokens):
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        time.sleep(fake.latency)
+        for token in tokens:
+            self.wfile.write(b"data: " + json.dumps(fake.chunk(body, token)).encode('utf-8') + b"\n\n")
+            self.wfile.flush()
+            time.sleep(fake.token_interval)
+        self.wfile.write(b"data: " + json.dumps(fake.chunk(body, None, 'stop')).encode('utf-8') + b"\n\n")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class FakeGroq(_FakeServer):
+    """OpenAI-compatible chat completions endpoint with a fixed time to first token and token rate.
+
+    JSON-mode requests (multi-aspect summaries) get one section per requested parameter.
+    """
+
+    handler_class = _ChatHandler
+
+    def __init__(self, latency=0.2, token_rate=200.0, max_tokens=120):
+        super().__init__()
+        self.latency = latency
+        self.token_interval = 1.0 / token_rate if token_rate > 0 else 0.0
+        self.max_tokens = max_tokens
+
+    def completion_tokens(self, body):
+        count = min(body.get('max_tokens') or self.max_tokens, self.max_tokens)
+        return [f"{LOREM_TOKENS[i % len(LOREM_TOKENS)]} " for i in range(count)]
+
+    def json_sections(self, body):
+        """Returns the keys a JSON-mode prompt asks for, or [] for a plain completion."""
+        if (body.get('response_format') or {}).get('type') != 'json_object':
+            return []
+        prompt = body['messages'][-1]['content']
+        keys = prompt.rsplit('Use exactly these keys:', 1)[-1].split('.', 1)[0]
+        return [key.strip().strip('"') for key in keys.split(',') if key.strip()]
+
+    def completion(self, body, content):
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'fake'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def chunk(self, body, token, finish_reason=None):
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get('model', 'fake'),
+            "choices": [{"index": 0, "delta": {"content": token} if token else {}, "finish_reason": finish_reason}],
+        }
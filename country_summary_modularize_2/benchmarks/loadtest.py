@@ -0,0 +1,257 @@
+"""Load test for every route in routes/endpoints.py against local stand-ins for Groq and API-Ninjas.
+
+Starts the fake servers from benchmarks/fakes.py, points the app at them, serves app.py on an
+ephemeral port and drives each route at the given concurrency. Storage is whatever STORAGE_BACKEND
+selects: a local, disposable Postgres, or `memory` / `sqlite` to run without a database server.
+
+    python -m benchmarks.loadtest [--concurrency 8] [--requests 200] [--routes country,economy]
+                                  [--llm-latency 0.2] [--llm-token-rate 200] [--api-latency 0.05]
+                                  [--cold-summaries] [--output results.json]
+
+Results are printed (or written to --output) as JSON: throughput plus p50/p95/p99 latency per route.
+"""
+import os
+import sys
+import math
+import json
+import time
+import argparse
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fakes import FakeCountryAPI, FakeGroq, load_fixture, FIXTURE_PATH
+
+# Accept header that opts a summary route into server-sent events, like ?stream=1
+SSE_HEADERS = {'Accept': 'text/event-stream'}
+# Revalidates with the ETag last returned for the same URL in this scenario (the first request has none)
+CONDITIONAL_HEADERS = {'If-None-Match': '{etag}'}
+
+# (name, method, path template, body, headers); {country} and {countries} are filled from the fixture and
+# {job} from summary jobs submitted before the scenarios run. Bodies: 'names' (the fixture countries) or
+# 'job' (a summary job for the next country).
+SCENARIOS = (
+    ('country', 'GET', '/country/{country}', None, None),
+    ('country_conditional', 'GET', '/country/{country}', None, CONDITIONAL_HEADERS),
+    ('countries', 'GET', '/countries?names={countries}', None, None),
+    ('countries_post', 'POST', '/countries', 'names', None),
+    ('fetch_and_store', 'GET', '/fetch-and-store/{country}', None, None),
+    ('fetch_and_store_economy', 'GET', '/fetch-and-store-economy/{country}', None, None),
+    ('economy', 'GET', '/economy/{country}', None, None),
+    ('economy_conditional', 'GET', '/economy/{country}', None, CONDITIONAL_HEADERS),
+    ('country_summary', 'GET', '/country-summary/{country}', None, None),
+    ('country_summary_conditional', 'GET', '/country-summary/{country}', None, CONDITIONAL_HEADERS),
+    ('country_summary_stream', 'GET', '/country-summary/{country}?stream=1', None, None),
+    ('parameter_summary', 'GET', '/country-parameter-summary/{country}?parameter=trade', None, None),
+    ('comprehensive_summary', 'GET', '/country-parameter-summary/{country}', None, None),
+    ('parameter_summary_stream', 'GET', '/country-parameter-summary/{country}?parameter=import_export&stream=1',
+     None, None),
+    ('parameter_summary_sse', 'GET', '/country-parameter-summary/{country}?parameter=trade', None, SSE_HEADERS),
+    ('multi_parameter_summary', 'GET',
+     '/country-parameter-summary/{country}?parameters=population_density,trade,import_export', None, None),
+    ('summary_job_submit', 'POST', '/summaries', 'job', None),
+    ('summary_job_status', 'GET', '/summaries/{job}', None, None),
+    ('rankings', 'GET', '/rankings?metric=trade_to_gdp_ratio&top=10', None, None),
+    ('country_rankings', 'GET', '/rankings/{country}', None, None),
+    ('db_pool_stats', 'GET', '/db-pool-stats', None, None),
+    ('summary_cache_stats', 'GET', '/summary-cache-stats', None, None),
+    ('loader_stats', 'GET', '/loader-stats', None, None),
+    ('upstream_stats', 'GET', '/upstream-stats', None, None),
+    ('summary_job_stats', 'GET', '/summary-job-stats', None, None),
+    ('metrics', 'GET', '/metrics', None, None),
+)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    """Aggregates one scenario's samples into the reported numbers (latencies in milliseconds)."""
+    ordered = sorted(latencies)
+    status_counts = {}
+    for status in statuses:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'status_counts': status_counts,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'max_ms': ms(ordered[-1]) if ordered else None,
+    }
+
+
+def submit_jobs(base_url, countries):
+    """Submits one summary job per country and returns their ids, for the {job} scenarios."""
+    job_ids = []
+    for country in countries:
+        response = requests.post(f"{base_url}/summaries", json={'country': country, 'parameter': 'trade'}, timeout=30)
+        response.raise_for_status()
+        job_ids.append(response.json()['id'])
+    return job_ids
+
+
+def run_scenario(base_url, scenario, countries, total, concurrency, job_ids=()):
+    """Sends `total` requests for one scenario from `concurrency` threads; returns its summary."""
+    name, method, template, body, header_templates = scenario
+    local = threading.local()
+    country_cycle = itertools.cycle(countries)
+    job_cycle = itertools.cycle(job_ids or [''])
+    cycle_lock = threading.Lock()
+    etags = {}
+    batch = ",".join(countries)
+
+    def send(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        with cycle_lock:
+            country = next(country_cycle)
+            job = next(job_cycle)
+            url = base_url + template.format(country=country, countries=batch, job=job)
+            etag = etags.get(url)
+        payload = None
+        if body == 'names':
+            payload = {'names': countries}
+        elif body == 'job':
+            payload = {'country': country, 'parameters': ['trade', 'import_export']}
+        headers = {}
+        for header, value in (header_templates or {}).items():
+            if '{etag}' in value:
+                if etag is None:
+                    continue
+                value = value.format(etag=etag)
+            headers[header] = value
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, json=payload, headers=headers, timeout=120)
+            response.content  # read streamed bodies to the end
+            if 'ETag' in response.headers:
+                with cycle_lock:
+                    etags[url] = response.headers['ETag']
+            return time.perf_counter() - started, response.status_code, response.status_code >= 500
+        except requests.RequestException:
+            return time.perf_counter() - started, 'error', True
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(send, range(total)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        [latency for latency, _, _ in samples],
+        [status for _, status, _ in samples],
+        sum(1 for _, _, failed in samples if failed),
+        elapsed
+    )
+
+
+def start_app(fixture, args):
+    """Starts the fakes, points the app's environment at them and serves app.py; returns the handles."""
+    country_api = FakeCountryAPI(fixture, latency=args.api_latency).start()
+    groq = FakeGroq(latency=args.llm_latency, token_rate=args.llm_token_rate, max_tokens=args.llm_tokens).start()
+
+    # Must be set before the app modules are imported, since they read their settings at import time
+    os.environ['API_NINJAS_BASE_URL'] = country_api.base_url
+    os.environ['GROQ_BASE_URL'] = groq.base_url
+    os.environ.setdefault('GROQ_API_KEY', 'loadtest')
+    os.environ.setdefault('YOUR_API_KEY', 'loadtest')
+    # The fakes have no rate limits; set these to measure the app at a real quota instead
+    os.environ.setdefault('GROQ_REQUESTS_PER_MINUTE', '0')
+    os.environ.setdefault('GROQ_TOKENS_PER_MINUTE', '0')
+    os.environ.setdefault('API_NINJAS_REQUESTS_PER_MINUTE', '0')
+    os.environ['DB_POOL_MAX_SIZE'] = os.getenv('DB_POOL_MAX_SIZE', str(max(10, args.concurrency)))
+    if args.cold_summaries:
+        os.environ['SUMMARY_CACHE_SIZE'] = '0'
+        os.environ['SUMMARY_CACHE_PERSIST'] = '0'
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    app = create_app()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, country_api, groq
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test every route against local Groq and API-Ninjas fakes.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route")
+    parser.add_argument('--routes', help="Comma-separated scenario names to run (default: all)")
+    parser.add_argument('--fixture', default=FIXTURE_PATH, help="JSON fixture of API-Ninjas responses by country")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Fake Groq time to first token, seconds")
+    parser.add_argument('--llm-token-rate', type=float, default=200, help="Fake Groq tokens per second")
+    parser.add_argument('--llm-tokens', type=int, default=120, help="Tokens per fake completion")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Fake API-Ninjas latency, seconds")
+    parser.add_argument('--cold-summaries', action='store_true',
+                        help="Disable the summary cache so every summary request reaches the fake LLM")
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenarios = SCENARIOS
+    if args.routes:
+        wanted = {name.strip() for name in args.routes.split(',') if name.strip()}
+        unknown = wanted - {scenario[0] for scenario in SCENARIOS}
+        if unknown:
+            parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in SCENARIOS if scenario[0] in wanted]
+
+    fixture = load_fixture(args.fixture)
+    countries = sorted(fixture)
+    server, country_api, groq = start_app(fixture, args)
+    base_url = "http://{}:{}".format(*server.server_address[:2])
+    try:
+        # Store every fixture country first so read routes measure the warm path
+        for country in countries:
+            requests.get(f"{base_url}/fetch-and-store/{country}", timeout=30).raise_for_status()
+
+        job_ids = submit_jobs(base_url, countries) if any('{job}' in scenario[2] for scenario in scenarios) else []
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario[0]] = run_scenario(
+                base_url, scenario, countries, args.requests, args.concurrency, job_ids
+            )
+            print(f"{scenario[0]}: p50 {results[scenario[0]]['p50_ms']} ms", file=sys.stderr)
+    finally:
+        server.shutdown()
+        country_api.stop()
+        groq.stop()
+
+    report = {
+        'config': {
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'llm_latency': args.llm_latency,
+            'llm_token_rate': args.llm_token_rate,
+            'llm_tokens': args.llm_tokens,
+            'api_latency': args.api_latency,
+            'cold_summaries': args.cold_summaries,
+            'countries': len(countries),
+        },
+        'upstream_requests': {'api_ninjas': country_api.requests, 'groq': groq.requests},
+        'routes': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if any(result['errors'] for result in results.values()) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,19 @@
+# Preload-then-fork production server: gunicorn -c gunicorn.conf.py
+#
+# The master imports the app once, sets up the schema and warms the caches, then closes its connections.
+# Each forked worker opens its own database connections and background threads in post_fork, before it
+# accepts traffic, and shares the preloaded caches with the master through copy-on-write memory.
+import os
+
+os.environ.setdefault('APP_PRELOAD', '1')
+
+wsgi_app = 'app:create_app()'
+preload_app = True
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def post_fork(server, worker):
+    from services.startup import start_worker
+    start_worker()
@@ -0,0 +1,157 @@
+import os
+import asyncio
+
+import asyncpg
+
+from models.country import CountryRecord, COUNTRY_COLUMNS, STORED_COLUMNS
+from models.db_config import DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DatabaseUnavailableError
+from models import db_operations
+from models.db_operations import country_values, notify_countries_changed, notify_countries_stored
+from models.storage import STORAGE_BACKEND
+from models.storage.postgres import UPSERT_CONFLICT_CLAUSE
+from utils.metrics import timed
+
+# asyncpg only serves the Postgres backend; embedded backends are called in a worker thread
+USE_ASYNCPG = STORAGE_BACKEND == 'postgres'
+
+# Postgres array types for STORED_COLUMNS, used to upsert many rows through unnest()
+_COLUMN_TYPES = (
+    'varchar', 'float8', 'float8', 'float8', 'float8', 'int8',
+    'float8', 'float8', 'int8', 'float8', 'float8',
+)
+
+SELECT_COUNTRY_QUERY = "SELECT {} FROM country_economy WHERE country_name = $1".format(", ".join(COUNTRY_COLUMNS))
+SELECT_COUNTRIES_QUERY = "SELECT {} FROM country_economy WHERE country_name = ANY($1)".format(", ".join(COUNTRY_COLUMNS))
+UPSERT_COUNTRIES_QUERY = "INSERT INTO country_economy ({columns}) SELECT * FROM unnest({arrays})".format(
+    columns=", ".join(STORED_COLUMNS),
+    arrays=", ".join(f"${i}::{pg_type}[]" for i, pg_type in enumerate(_COLUMN_TYPES, start=1))
+) + UPSERT_CONFLICT_CLAUSE
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool():
+    """Returns the asyncpg pool for the running event loop, creating it on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = await asyncpg.create_pool(
+                        host=os.getenv('DB_HOST'),
+                        database=os.getenv('DB_NAME'),
+                        user=os.getenv('DB_USER'),
+                        password=os.getenv('DB_PASSWORD'),
+                        port=int(os.getenv('DB_PORT', 5432)),
+                        min_size=DB_POOL_MIN_SIZE,
+                        max_size=DB_POOL_MAX_SIZE,
+                        timeout=DB_POOL_TIMEOUT,
+                    )
+                except (OSError, asyncpg.PostgresError) as e:
+                    raise DatabaseUnavailableError(f"Could not connect to database: {e}") from e
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@timed('db.get_country_record')
+async def get_country_record(country_name):
+    """Fetches a country's stored row as a CountryRecord in a single query."""
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.get_country_record, country_name)
+    pool = await get_async_pool()
+    row = await pool.fetchrow(SELECT_COUNTRY_QUERY, country_name)
+    return CountryRecord.from_row(tuple(row)) if row else None
+
+
+@timed('db.get_country_records')
+async def get_country_records(country_names):
+    """Fetches every stored row among `country_names` in one query, keyed by country name."""
+    if not country_names:
+        return {}
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.get_country_records, country_names)
+    pool = await get_async_pool()
+    rows = await pool.fetch(SELECT_COUNTRIES_QUERY, list(country_names))
+    return {row['country_name']: CountryRecord.from_row(tuple(row)) for row in rows}
+
+
+@timed('db.store_country_records')
+async def store_country_records(rows):
+    """Upserts many countries in one statement; returns the names whose rows were inserted or changed."""
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.store_country_records, rows)
+    values = list({data['country_name']: country_values(data) for data in rows}.values())
+    if not values:
+        return []
+
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            changed = [row['country_name'] for row in await conn.fetch(UPSERT_COUNTRIES_QUERY, *zip(*values))]
+            await conn.execute(
+                "UPDATE country_economy SET fetched_at = NOW() WHERE country_name = ANY($1)",
+                [value[0] for value in values]
+            )
+            if changed:
+                await conn.execute("DELETE FROM country_summary WHERE country_name = ANY($1)", changed)
+
+    # Listeners re-read rows through the sync storage layer, so keep them off the event loop
+    await asyncio.to_thread(notify_countries_changed, changed)
+    await asyncio.to_thread(notify_countries_stored, [value[0] for value in values])
+    return changed
+
+
+async def store_country_data(data):
+    """Stores country data in the database; returns True if the row was inserted or changed."""
+    return bool(await store_country_records([data]))
+
+
+@timed('db.get_stored_summary')
+async def get_stored_summary(country_name, parameter, prompt_hash, model):
+    """Fetches a previously generated summary from the country_summary table."""
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.get_stored_summary, country_name, parameter, prompt_hash, model)
+    pool = await get_async_pool()
+    return await pool.fetchval(
+        """
+        SELECT summary FROM country_summary
+        WHERE country_name = $1 AND parameter = $2 AND prompt_hash = $3 AND model = $4
+        """,
+        country_name, parameter, prompt_hash, model
+    )
+
+
+@timed('db.get_country_miss')
+async def get_country_miss(name_key):
+    """Returns when the stored negative-cache entry for a normalised name expires, or None."""
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.get_country_miss, name_key)
+    pool = await get_async_pool()
+    return await pool.fetchval(
+        "SELECT expires_at FROM country_not_found WHERE name_key = $1 AND expires_at > NOW()", name_key
+    )
+
+
+@timed('db.store_summary')
+async def store_summary(country_name, parameter, prompt_hash, model, summary):
+    """Persists a generated summary in the country_summary table."""
+    if not USE_ASYNCPG:
+        return await asyncio.to_thread(db_operations.store_summary, country_name, parameter, prompt_hash, model, summary)
+    pool = await get_async_pool()
+    await pool.execute(
+        """
+        INSERT INTO country_summary (country_name, parameter, prompt_hash, model, summary)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (country_name, parameter, prompt_hash, model) DO UPDATE SET
+            summary = EXCLUDED.summary,
+            created_at = NOW();
+        """,
+        country_name, parameter, prompt_hash, model, summary
+    )
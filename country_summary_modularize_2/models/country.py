@@ -0,0 +1,66 @@
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class CountryRecord:
+    """One row of the country_economy table."""
+    country_name: str
+    surface_area: Optional[float] = None
+    exports: Optional[float] = None
+    tourists: Optional[float] = None
+    gdp: Optional[float] = None
+    population: Optional[int] = None
+    imports: Optional[float] = None
+    urban_population_growth: Optional[float] = None
+    urban_population: Optional[int] = None
+    gdp_growth: Optional[float] = None
+    gdp_per_capita: Optional[float] = None
+    # Generated columns, computed by Postgres whenever the row is written
+    urban_population_percentage: Optional[float] = None
+    population_density: Optional[float] = None
+    trade_to_gdp_ratio: Optional[float] = None
+    trade_balance: Optional[float] = None
+    trade_balance_status: Optional[str] = None
+    exports_to_gdp_ratio: Optional[float] = None
+    imports_to_gdp_ratio: Optional[float] = None
+    trade_openness_index: Optional[float] = None
+    # When the row was last fetched from (or confirmed against) the upstream API
+    fetched_at: Optional[datetime] = None
+    # When the row's data last changed; its version for HTTP validators
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a record from a row selected with COUNTRY_COLUMNS."""
+        return cls(*row)
+
+    def to_dict(self, keys=None):
+        """Returns the record as a plain dict, optionally restricted to `keys`."""
+        data = asdict(self)
+        if keys is None:
+            return data
+        return {key: data[key] for key in keys}
+
+
+# Column list in table order, used for explicit SELECTs instead of SELECT *
+COUNTRY_COLUMNS = tuple(field.name for field in fields(CountryRecord))
+
+# Columns Postgres computes itself; they can be read but never written
+DERIVED_COLUMNS = (
+    'urban_population_percentage', 'population_density', 'trade_to_gdp_ratio', 'trade_balance',
+    'trade_balance_status', 'exports_to_gdp_ratio', 'imports_to_gdp_ratio', 'trade_openness_index',
+)
+
+# Columns the database stamps on every write
+MANAGED_COLUMNS = ('fetched_at', 'updated_at')
+
+# Columns written by the upserts and the bulk loader
+STORED_COLUMNS = tuple(column for column in COUNTRY_COLUMNS if column not in DERIVED_COLUMNS + MANAGED_COLUMNS)
+
+# Fields served by the /economy route
+ECONOMY_FIELDS = (
+    'country_name', 'imports', 'urban_population_growth', 'exports', 'population',
+    'urban_population', 'gdp', 'gdp_growth', 'gdp_per_capita', 'surface_area',
+)
@@ -1,54 +1,369 @@
 import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Pool sizing and behaviour, all overridable through the environment
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))  # idle seconds before a ping
+
+
+class DatabaseUnavailableError(Exception):
+    """Raised when a database connection cannot be opened or borrowed from the pool."""
+
+
+class PoolTimeoutError(DatabaseUnavailableError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections with health checks and usage stats."""
+
+    def __init__(self, min_size, max_size, timeout, health_check_interval, **connect_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size=%s max_size=%s" % (min_size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at) pairs, most recently used on the right
+        self._size = 0  # open connections, idle + checked out
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'connect_failures': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+            'wait_time_total': 0.0,
+        }
 
-def get_db_connection():
-    try:
-        connection = psycopg2.connect( #it is a python drive for postgres
-            host=os.getenv('DB_HOST'),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            port=int(os.getenv('DB_PORT', 5432))
-        )
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        try:
+            connection = psycopg2.connect(**self.connect_kwargs)  #it is a python drive for postgres
+        except psycopg2.Error as e:
+            with self._cond:
+                self._size -= 1
+                self._stats['connect_failures'] += 1
+                self._cond.notify()
+            logger.error(f"Error connecting to database: {e}")
+            raise DatabaseUnavailableError(f"Could not connect to database: {e}") from e
+        with self._cond:
+            self._stats['connects'] += 1
         return connection
-    except Exception as e:
-        return None
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def getconn(self, timeout=None):
+        """Borrows a connection, waiting up to `timeout` seconds for one to free up."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise DatabaseUnavailableError("Connection pool is closed")
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        create = False
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, idle_since, create = None, None, True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if create:
+                conn = self._connect()
+            elif not self._is_healthy(conn, idle_since):
+                # Broken or dropped by the server, replace it with a fresh one
+                logger.warning("Discarding broken pooled database connection")
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """Returns a borrowed connection, closing it instead if it is broken."""
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrows a connection for one transaction: commits on success, rolls back on error."""
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, discard=broken or conn.closed)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        return stats
+
+    def closeall(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+                    host=os.getenv('DB_HOST'),
+                    database=os.getenv('DB_NAME'),
+                    user=os.getenv('DB_USER'),
+                    password=os.getenv('DB_PASSWORD'),
+                    port=int(os.getenv('DB_PORT', 5432))
+                )
+    return _pool
+
+
+def close_pool():
+    """Closes the pool; the next get_pool() opens a new one (used before forking workers)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_db_connection(timeout=None):
+    """Borrows a pooled connection as a context manager; raises DatabaseUnavailableError on failure."""
+    return get_pool().connection(timeout)
+
+
+def get_pool_stats():
+    """Returns usage stats for the connection pool, or None if it has not been created yet."""
+    return _pool.stats() if _pool is not None else None
+
+
+# Derived metrics kept as generated columns, matching utils.prompts.derive_metrics:
+# NULL inputs and zero divisors give 0
+DERIVED_COLUMN_DEFINITIONS = (
+    ("urban_population_percentage", "FLOAT", "COALESCE(urban_population::FLOAT / NULLIF(population, 0) * 100, 0)"),
+    ("population_density", "FLOAT", "COALESCE(population / NULLIF(surface_area, 0), 0)"),
+    ("trade_to_gdp_ratio", "FLOAT", "COALESCE((exports + imports) / NULLIF(gdp, 0) * 100, 0)"),
+    ("trade_balance", "FLOAT", "COALESCE(exports - imports, 0)"),
+    ("trade_balance_status", "VARCHAR(16)", "CASE WHEN COALESCE(exports - imports, 0) > 0 THEN 'surplus' ELSE 'deficit' END"),
+    ("exports_to_gdp_ratio", "FLOAT", "COALESCE(exports / NULLIF(gdp, 0) * 100, 0)"),
+    ("imports_to_gdp_ratio", "FLOAT", "COALESCE(imports / NULLIF(gdp, 0) * 100, 0)"),
+    ("trade_openness_index", "FLOAT", "COALESCE((exports + imports) / NULLIF(gdp, 0) * 100, 0)"),
+)
+
+# Derived metrics we sort or filter by
+DERIVED_COLUMN_INDEXES = ("population_density", "trade_to_gdp_ratio", "trade_balance")
+
+# NOTIFY channel carrying the name of every inserted or updated country_economy row
+COUNTRY_CHANGES_CHANNEL = "country_economy_changed"
+
 
 def setup_database():
-    conn = get_db_connection()
-    if not conn:
-        return
-
-    cursor = conn.cursor()  #a cursor object is an interface to execute SQL commands and retrieve data from a database. It allows the program to execute queries, fetch data, and navigate through records one by one or in batches.
-    
-    try:
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS country_economy (
-            country_name VARCHAR(255) PRIMARY KEY,
-            surface_area FLOAT,
-            exports FLOAT,
-            tourists FLOAT,
-            gdp FLOAT,
-            population BIGINT,
-            imports FLOAT,
-            urban_population_growth FLOAT,
-            urban_population BIGINT,
-            gdp_growth FLOAT,
-            gdp_per_capita FLOAT
-        );
-        """)
-        
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()  #a cursor object is an interface to execute SQL commands and retrieve data from a database. It allows the program to execute queries, fetch data, and navigate through records one by one or in batches.
+
+        try:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS country_economy (
+                country_name VARCHAR(255) PRIMARY KEY,
+                surface_area FLOAT,
+                exports FLOAT,
+                tourists FLOAT,
+                gdp FLOAT,
+                population BIGINT,
+                imports FLOAT,
+                urban_population_growth FLOAT,
+                urban_population BIGINT,
+                gdp_growth FLOAT,
+                gdp_per_capita FLOAT
+            );
+            """)
+            for column, column_type, expression in DERIVED_COLUMN_DEFINITIONS:
+                cursor.execute(
+                    f"ALTER TABLE country_economy ADD COLUMN IF NOT EXISTS {column} {column_type} "
+                    f"GENERATED ALWAYS AS ({expression}) STORED"
+                )
+            cursor.execute(
+                "ALTER TABLE country_economy ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+            )
+            cursor.execute(
+                "ALTER TABLE country_economy ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+            )
+            for column in DERIVED_COLUMN_INDEXES:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS country_economy_{column}_idx ON country_economy ({column})"
+                )
+            # Lets every worker's in-process snapshot follow writes made by the others
+            cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION notify_country_economy_changed() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{COUNTRY_CHANGES_CHANNEL}', NEW.country_name);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """)
+            cursor.execute("DROP TRIGGER IF EXISTS country_economy_notify ON country_economy")
+            cursor.execute(
+                "CREATE TRIGGER country_economy_notify AFTER INSERT OR UPDATE ON country_economy "
+                "FOR EACH ROW EXECUTE FUNCTION notify_country_economy_changed()"
+            )
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS country_summary (
+                country_name VARCHAR(255) NOT NULL,
+                parameter VARCHAR(64) NOT NULL,
+                prompt_hash CHAR(64) NOT NULL,
+                model VARCHAR(255) NOT NULL,
+                summary TEXT NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (country_name, parameter, prompt_hash, model)
+            );
+            """)
+            # Normalised spellings and codes learned from API-Ninjas, each pointing at the stored country_name
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS country_alias (
+                alias VARCHAR(255) PRIMARY KEY,
+                country_name VARCHAR(255) NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """)
+            # Names API-Ninjas had no data for, answered with 404 until expires_at without calling it again
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS country_not_found (
+                name_key VARCHAR(255) PRIMARY KEY,
+                country_name VARCHAR(255) NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL
+            );
+            """)
+            # Queue behind POST /summaries; workers claim rows with FOR UPDATE SKIP LOCKED
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS summary_job (
+                id CHAR(32) PRIMARY KEY,
+                country_name VARCHAR(255) NOT NULL,
+                parameters JSONB NOT NULL,
+                callback_url TEXT,
+                status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result JSONB,
+                error TEXT,
+                callback_status VARCHAR(16),
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ,
+                available_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS summary_job_available_idx ON summary_job (available_at) "
+                "WHERE status IN ('queued', 'running')"
+            )
+        finally:
+            cursor.close()
 
 if __name__ == "__main__":
     setup_database()
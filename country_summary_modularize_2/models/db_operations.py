@@ -1,99 +1,217 @@
-from models.db_config import get_db_connection
-
-def fetch_country_data(country_name):
-    """Fetches country data from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
-    country_data = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
-    
-    if country_data:
-        return {
-            "country_name": country_data[0],
-            "surface_area": country_data[1],
-            "exports": country_data[2],
-            "tourists": country_data[3],
-            "gdp": country_data[4],
-            "population": country_data[5],
-            "imports": country_data[6],
-            "urban_population_growth": country_data[7],
-            "urban_population": country_data[8],
-            "gdp_growth": country_data[9],
-            "gdp_per_capita": country_data[10]
-        }
-    return None
+import logging
 
-def store_country_data(data):
-    """Stores country data in the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    insert_query = """
-    INSERT INTO country_economy (
-        country_name, surface_area, exports, tourists, gdp, population,
-        imports, urban_population_growth, urban_population, gdp_growth, gdp_per_capita
+from models.storage import get_storage
+from utils.metrics import timed
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Callbacks run with the country name whenever an upsert changes a row
+_country_change_listeners = []
+# Callbacks run once per upsert with every name whose row it changed
+_countries_changed_listeners = []
+# Callbacks run with every name an upsert wrote, changed or not (fetched_at moves either way)
+_countries_stored_listeners = []
+
+
+def on_country_changed(callback):
+    """Registers `callback(country_name)` to run after a country's stored row changes."""
+    _country_change_listeners.append(callback)
+    return callback
+
+
+def notify_country_changed(country_name):
+    """Runs every registered change listener for `country_name`."""
+    for callback in _country_change_listeners:
+        try:
+            callback(country_name)
+        except Exception as e:
+            logger.error(f"Country change listener failed for {country_name}: {e}")
+
+
+def on_countries_changed(callback):
+    """Registers `callback(country_names)` to run once after a batch of stored rows changes."""
+    _countries_changed_listeners.append(callback)
+    return callback
+
+
+def notify_countries_changed(country_names):
+    """Runs every registered changed-countries listener for the batch `country_names`."""
+    for country_name in country_names:
+        notify_country_changed(country_name)
+    if not country_names:
+        return
+    for callback in _countries_changed_listeners:
+        try:
+            callback(country_names)
+        except Exception as e:
+            logger.error(f"Changed-countries listener failed: {e}")
+
+
+def on_countries_stored(callback):
+    """Registers `callback(country_names)` to run after any batch of countries is written."""
+    _countries_stored_listeners.append(callback)
+    return callback
+
+
+def notify_countries_stored(country_names):
+    """Runs every registered stored-countries listener."""
+    for callback in _countries_stored_listeners:
+        try:
+            callback(country_names)
+        except Exception as e:
+            logger.error(f"Stored-countries listener failed: {e}")
+
+
+@timed('db.get_country_record')
+def get_country_record(country_name):
+    """Fetches a country's stored row as a CountryRecord in a single query."""
+    return get_storage().get_country_record(country_name)
+
+@timed('db.get_country_records')
+def get_country_records(country_names):
+    """Fetches every stored row among `country_names` in one query, keyed by country name."""
+    if not country_names:
+        return {}
+    return get_storage().get_country_records(country_names)
+
+@timed('db.get_all_country_records')
+def get_all_country_records():
+    """Fetches every stored country row."""
+    return get_storage().get_all_country_records()
+
+def advisory_lock(key):
+    """Holds a lock on `key` for the duration of the block (a `with` statement).
+
+    With Postgres this is an advisory lock on a connection of its own, serialising work on the same key across
+    every worker process sharing the database, and the block runs unlocked if the lock is not granted in time;
+    embedded backends lock within the process.
+    """
+    return get_storage().advisory_lock(key)
+
+def country_values(data):
+    """Converts a country dict into a tuple of column values in STORED_COLUMNS order."""
+    return (
+        data['country_name'],
+        float(data.get('surface_area', 0)),
+        float(data.get('exports', 0)),
+        float(data.get('tourists', 0)),
+        float(data.get('gdp', 0)),
+        int(float(data.get('population', 0))),
+        float(data.get('imports', 0)),
+        float(data.get('urban_population_growth', 0)),
+        int(float(data.get('urban_population', 0))),
+        float(data.get('gdp_growth', 0)),
+        float(data.get('gdp_per_capita', 0))
     )
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (country_name) DO UPDATE SET
-        surface_area = EXCLUDED.surface_area,
-        exports = EXCLUDED.exports,
-        tourists = EXCLUDED.tourists,
-        gdp = EXCLUDED.gdp,
-        population = EXCLUDED.population,
-        imports = EXCLUDED.imports,
-        urban_population_growth = EXCLUDED.urban_population_growth,
-        urban_population = EXCLUDED.urban_population,
-        gdp_growth = EXCLUDED.gdp_growth,
-        gdp_per_capita = EXCLUDED.gdp_per_capita;
+
+@timed('db.store_country_records')
+def store_country_records(rows):
+    """Upserts many countries in one batch; returns the names whose rows were inserted or changed."""
+    # One row per country, otherwise ON CONFLICT would hit the same row twice
+    values = list({data['country_name']: country_values(data) for data in rows}.values())
+    if not values:
+        return []
+
+    changed = get_storage().store_country_records(values)
+    notify_countries_changed(changed)
+    notify_countries_stored([value[0] for value in values])
+    return changed
+
+@timed('db.copy_country_records')
+def copy_country_records(rows):
+    """Bulk-loads countries (through COPY and one set-based merge on Postgres).
+
+    Returns the names whose rows were inserted or changed.
     """
-    
-    try:
-        cursor.execute(insert_query, (
-            data['country_name'],
-            float(data.get('surface_area', 0)),
-            float(data.get('exports', 0)),
-            float(data.get('tourists', 0)),
-            float(data.get('gdp', 0)),
-            int(data.get('population', 0)),
-            float(data.get('imports', 0)),
-            float(data.get('urban_population_growth', 0)),
-            int(data.get('urban_population', 0)),
-            float(data.get('gdp_growth', 0)),
-            float(data.get('gdp_per_capita', 0))
-        ))
-    except Exception as e:
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
-
-def get_economy_data(country_name):
-    """Retrieves economy data from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM country_economy WHERE country_name = %s", (country_name,))
-    economy_data = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
-
-    if economy_data:
-        return {
-            "country_name": economy_data[0],
-            "imports": economy_data[1],
-            "urban_population_growth": economy_data[2],
-            "exports": economy_data[3],
-            "population": economy_data[4],
-            "urban_population": economy_data[5],
-            "gdp": economy_data[6],
-            "gdp_growth": economy_data[7],
-            "gdp_per_capita": economy_data[8],
-            "surface_area": economy_data[9] if len(economy_data) > 9 else 0
-        }
-    return None
+    values = [country_values(data) for data in rows]
+    if not values:
+        return []
+
+    changed = get_storage().copy_country_records(values)
+    notify_countries_changed(changed)
+    notify_countries_stored(list(dict.fromkeys(value[0] for value in values)))
+    return changed
+
+def store_country_data(data):
+    """Stores country data in the database; returns True if the row was inserted or changed."""
+    return bool(store_country_records([data]))
+
+@timed('db.get_stored_summary')
+def get_stored_summary(country_name, parameter, prompt_hash, model):
+    """Fetches a previously generated summary from the country_summary table."""
+    return get_storage().get_stored_summary(country_name, parameter, prompt_hash, model)
+
+@timed('db.get_latest_summary')
+def get_latest_summary(country_name, parameter):
+    """Fetches the most recently generated summary for a country and parameter, for any prompt or model."""
+    return get_storage().get_latest_summary(country_name, parameter)
+
+@timed('db.store_summary')
+def store_summary(country_name, parameter, prompt_hash, model, summary):
+    """Persists a generated summary in the country_summary table."""
+    get_storage().store_summary(country_name, parameter, prompt_hash, model, summary)
+
+@timed('db.get_country_alias')
+def get_country_alias(alias):
+    """Looks up the country name stored for a normalised alias, or None."""
+    return get_storage().get_country_alias(alias)
+
+def get_country_aliases():
+    """Fetches every stored country alias as a dict of alias -> country name."""
+    return get_storage().get_country_aliases()
+
+@timed('db.store_country_aliases')
+def store_country_aliases(aliases):
+    """Stores newly learned aliases (alias -> country name), keeping any that already exist."""
+    if aliases:
+        get_storage().store_country_aliases(aliases)
+
+@timed('db.get_country_miss')
+def get_country_miss(name_key):
+    """Returns when the stored negative-cache entry for a normalised name expires, or None."""
+    return get_storage().get_country_miss(name_key)
+
+@timed('db.store_country_miss')
+def store_country_miss(name_key, country_name, ttl):
+    """Records for `ttl` seconds that API-Ninjas has no data for a name."""
+    get_storage().store_country_miss(name_key, country_name, ttl)
+
+@timed('db.delete_country_misses')
+def delete_country_misses(name_keys):
+    """Drops the stored negative-cache entries for normalised names."""
+    if name_keys:
+        get_storage().delete_country_misses(name_keys)
+
+@timed('db.enqueue_job')
+def enqueue_job(job):
+    """Adds a SummaryJob to the summary_job queue."""
+    get_storage().enqueue_job(job)
+
+@timed('db.claim_job')
+def claim_job(lease_seconds):
+    """Claims the next available job for this worker (for `lease_seconds`), or returns None."""
+    return get_storage().claim_job(lease_seconds)
+
+@timed('db.finish_job')
+def finish_job(job_id, attempts, status, result=None, error=None):
+    """Records the outcome of a claimed job."""
+    get_storage().finish_job(job_id, attempts, status, result, error)
+
+@timed('db.retry_job')
+def retry_job(job_id, attempts, delay, error):
+    """Requeues a claimed job to run again after `delay` seconds."""
+    get_storage().retry_job(job_id, attempts, delay, error)
+
+@timed('db.get_job')
+def get_job(job_id):
+    """Fetches a SummaryJob by id, or None."""
+    return get_storage().get_job(job_id)
+
+def set_job_callback_status(job_id, callback_status):
+    """Records whether a finished job's webhook was delivered."""
+    get_storage().set_job_callback_status(job_id, callback_status)
 
+def count_jobs():
+    """Returns the number of summary jobs in each status."""
+    return get_storage().count_jobs()
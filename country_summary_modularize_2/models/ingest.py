@@ -0,0 +1,157 @@
+"""Bulk loader for the country_economy table.
+
+Usage (from the project directory):
+    python -m models.ingest India France Japan
+    python -m models.ingest --file countries.csv --concurrency 8 --rate 5
+
+Rows in a JSONL/CSV dump that already carry economic fields are loaded as-is; rows with only a
+country name are fetched from API-Ninjas first. Everything is written with one COPY + merge.
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models.storage import setup_storage
+from models.db_operations import copy_country_records
+from models.country import STORED_COLUMNS
+from services.services import fetch_economy_data
+from services.country_names import canonical_country_name
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limit import background_priority
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_FIELDS = [column for column in STORED_COLUMNS if column != 'country_name']
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def read_rows(path):
+    """Reads country rows from a .jsonl or .csv file; a row needs at least a country name."""
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+        else:
+            rows.extend(csv.DictReader(f))
+
+    for row in rows:
+        if 'country_name' not in row and 'name' in row:
+            row['country_name'] = row.pop('name')
+    return [row for row in rows if row.get('country_name')]
+
+
+def _has_data(row):
+    return any(row.get(field) not in (None, '') for field in DATA_FIELDS)
+
+
+def _clean(row):
+    """Keeps only table columns and turns blank CSV cells into zeroes."""
+    return {field: (row.get(field) if row.get(field) not in (None, '') else 0) for field in STORED_COLUMNS}
+
+
+def fetch_all(country_names, concurrency, rate):
+    """Fetches countries from API-Ninjas concurrently, never exceeding `rate` requests per second."""
+    limiter = RateLimiter(rate)
+
+    def fetch(name):
+        limiter.wait()
+        try:
+            # Bulk loads queue behind the API's interactive traffic for API-Ninjas quota
+            with background_priority():
+                return name, fetch_economy_data(name)
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping {name}: {e}")
+            return name, None
+
+    fetched, failed = [], []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for name, data in executor.map(fetch, country_names):
+            if data:
+                fetched.append(data)
+            else:
+                failed.append(name)
+    return fetched, failed
+
+
+def ingest(country_names=(), path=None, concurrency=8, rate=5.0):
+    """Fetches and bulk-loads countries; returns a summary of the run."""
+    started = time.perf_counter()
+    rows = read_rows(path) if path else []
+    rows.extend({'country_name': name} for name in country_names)
+    # Store every spelling of a country under the name the API reads it by
+    for row in rows:
+        row['country_name'] = canonical_country_name(row['country_name'])
+
+    ready = [_clean(row) for row in rows if _has_data(row)]
+    to_fetch = list(dict.fromkeys(row['country_name'] for row in rows if not _has_data(row)))
+
+    fetch_started = time.perf_counter()
+    fetched, failed = fetch_all(to_fetch, concurrency, rate) if to_fetch else ([], [])
+    fetch_seconds = time.perf_counter() - fetch_started
+
+    load_started = time.perf_counter()
+    records = ready + [_clean(data) for data in fetched]
+    changed = copy_country_records(records) if records else []
+    load_seconds = time.perf_counter() - load_started
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows_loaded': len(records),
+        'rows_changed': len(changed),
+        'fetched': len(fetched),
+        'fetch_failed': failed,
+        'fetch_seconds': round(fetch_seconds, 3),
+        'load_seconds': round(load_seconds, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(records) / elapsed, 1) if elapsed else 0.0,
+        'load_rows_per_second': round(len(records) / load_seconds, 1) if load_seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load country economy data into the configured storage backend.")
+    parser.add_argument('countries', nargs='*', help="Country names to fetch from API-Ninjas")
+    parser.add_argument('--file', help="JSONL or CSV dump of countries (a country_name/name column is required)")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('INGEST_CONCURRENCY', 8)),
+                        help="Parallel upstream requests")
+    parser.add_argument('--rate', type=float, default=float(os.getenv('INGEST_RATE', 5)),
+                        help="Maximum upstream requests per second (0 for unlimited)")
+    args = parser.parse_args(argv)
+
+    if not args.countries and not args.file:
+        parser.error("give at least one country name or --file")
+
+    setup_storage()
+    report = ingest(args.countries, args.file, args.concurrency, args.rate)
+    print(json.dumps(report, indent=2))
+    return 1 if report['fetch_failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""Storage backends for country_economy and country_summary, selected with STORAGE_BACKEND.
+
+- postgres (default): the shared database configured through the DB_* settings
+- sqlite: an embedded database file (SQLITE_PATH) in WAL mode, for single-node deployments
+- memory: plain dicts in the current process, for tests and benchmarks
+
+The rest of the app goes through models.db_operations, which delegates to get_storage().
+"""
+import os
+import sqlite3
+import threading
+
+import psycopg2
+
+from models.db_config import DatabaseUnavailableError
+from models.storage.base import StorageBackend
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+
+# Errors a storage call raises when the store is unavailable or rejects a statement
+STORAGE_ERRORS = (DatabaseUnavailableError, psycopg2.Error, sqlite3.Error)
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend):
+    """Instantiates the named backend; backend modules are only imported when chosen."""
+    if backend == 'postgres':
+        from models.storage.postgres import PostgresStorage
+        return PostgresStorage()
+    if backend == 'sqlite':
+        from models.storage.sqlite import SQLiteStorage
+        return SQLiteStorage()
+    if backend == 'memory':
+        from models.storage.memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'; expected postgres, sqlite or memory")
+
+
+def get_storage():
+    """Returns the process-wide storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(STORAGE_BACKEND)
+    return _storage
+
+
+def setup_storage():
+    """Creates the configured backend's tables."""
+    get_storage().setup()
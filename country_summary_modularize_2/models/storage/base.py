@@ -0,0 +1,135 @@
+import threading
+from contextlib import contextmanager
+
+from models.country import CountryRecord, STORED_COLUMNS
+from utils.prompts import derive_metrics
+
+
+def build_record(values, fetched_at, updated_at):
+    """Builds a CountryRecord from STORED_COLUMNS values, computing the derived columns like Postgres does."""
+    data = dict(zip(STORED_COLUMNS, values))
+    data.update(derive_metrics(data))
+    return CountryRecord(fetched_at=fetched_at, updated_at=updated_at, **data)
+
+
+class StorageBackend:
+    """Interface every storage backend implements; models.db_operations delegates to the configured one.
+
+    Writes return the names of rows that were inserted or whose data changed, and drop the stored
+    summaries of those countries. Change listeners are run by db_operations, not by the backend.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._locks_guard = threading.Lock()
+        self._locks = {}
+
+    def setup(self):
+        """Creates the tables (or structures) the backend needs; safe to call more than once."""
+        raise NotImplementedError
+
+    def get_country_record(self, country_name):
+        raise NotImplementedError
+
+    def get_country_records(self, country_names):
+        raise NotImplementedError
+
+    def get_all_country_records(self):
+        raise NotImplementedError
+
+    def store_country_records(self, values):
+        """Upserts rows given as country_values() tuples; returns the changed names."""
+        raise NotImplementedError
+
+    def copy_country_records(self, values):
+        """Bulk variant of store_country_records; backends without a faster path reuse it."""
+        return self.store_country_records(list({value[0]: value for value in values}.values()))
+
+    def get_stored_summary(self, country_name, parameter, prompt_hash, model):
+        raise NotImplementedError
+
+    def get_latest_summary(self, country_name, parameter):
+        raise NotImplementedError
+
+    def store_summary(self, country_name, parameter, prompt_hash, model, summary):
+        raise NotImplementedError
+
+    def get_country_alias(self, alias):
+        """Returns the country name stored for a normalised alias, or None."""
+        raise NotImplementedError
+
+    def get_country_aliases(self):
+        """Returns every stored alias as a dict of alias -> country name."""
+        raise NotImplementedError
+
+    def store_country_aliases(self, aliases):
+        """Stores new aliases from a dict of alias -> country name; existing aliases are kept."""
+        raise NotImplementedError
+
+    def get_country_miss(self, name_key):
+        """Returns when the negative-cache entry for a normalised name expires, or None if there is none left."""
+        raise NotImplementedError
+
+    def store_country_miss(self, name_key, country_name, ttl):
+        """Records that API-Ninjas has no data for a name, for `ttl` seconds."""
+        raise NotImplementedError
+
+    def delete_country_misses(self, name_keys):
+        """Drops the negative-cache entries for normalised names that now have a stored row."""
+        raise NotImplementedError
+
+    def enqueue_job(self, job):
+        """Inserts a new SummaryJob."""
+        raise NotImplementedError
+
+    def claim_job(self, lease_seconds):
+        """Marks the oldest available job running for `lease_seconds` and returns it, or None.
+
+        Available jobs are queued ones past their retry backoff and running ones whose lease ran out
+        (their worker died). Concurrent claims never return the same job.
+        """
+        raise NotImplementedError
+
+    def finish_job(self, job_id, attempts, status, result, error):
+        """Records a claimed job's outcome; a no-op if the job was claimed again since (`attempts` differs)."""
+        raise NotImplementedError
+
+    def retry_job(self, job_id, attempts, delay, error):
+        """Puts a claimed job back in the queue, claimable again after `delay` seconds."""
+        raise NotImplementedError
+
+    def get_job(self, job_id):
+        raise NotImplementedError
+
+    def set_job_callback_status(self, job_id, callback_status):
+        raise NotImplementedError
+
+    def count_jobs(self):
+        """Returns the number of jobs in each status."""
+        raise NotImplementedError
+
+    @contextmanager
+    def advisory_lock(self, key):
+        """Serialises work on `key`; embedded backends only need to cover the current process."""
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+    def warm_up(self):
+        """Opens the connections the backend needs before the first request arrives."""
+
+    def close(self):
+        """Closes this process's connections; they are reopened on next use."""
+
+    def listen_changes(self, callback):
+        """Starts delivering `callback(country_names)` for rows written by other processes.
+
+        Returns the listener thread, or None when the backend has no cross-process notifications
+        (embedded backends only see this process's writes, which db_operations already reports).
+        """
+        return None
+
+    def stats(self):
+        return {'backend': self.name}
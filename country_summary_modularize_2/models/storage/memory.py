@@ -0,0 +1,171 @@
+import threading
+from dataclasses import replace
+from datetime import datetime, timezone, timedelta
+
+from models.storage.base import StorageBackend, build_record
+from models.summary_job import RUNNING, QUEUED, PENDING_STATUSES
+
+
+class MemoryStorage(StorageBackend):
+    """Keeps everything in process memory; nothing survives a restart and workers do not share data.
+
+    Records are replaced on write, never mutated, so readers can use them without holding the lock.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._values = {}     # country name -> country_values() tuple
+        self._records = {}    # country name -> CountryRecord
+        self._summaries = {}  # (country_name, parameter, prompt_hash, model) -> summary
+        self._jobs = {}       # job id -> SummaryJob
+        self._aliases = {}    # normalised alias -> country name
+        self._misses = {}     # normalised name -> when its negative-cache entry expires
+
+    def setup(self):
+        pass
+
+    def get_country_record(self, country_name):
+        return self._records.get(country_name)
+
+    def get_country_records(self, country_names):
+        records = self._records
+        return {name: records[name] for name in country_names if name in records}
+
+    def get_all_country_records(self):
+        with self._lock:
+            records = list(self._records.values())
+        return sorted(records, key=lambda record: record.country_name)
+
+    def store_country_records(self, values):
+        fetched_at = datetime.now(timezone.utc)
+        changed = []
+        with self._lock:
+            for value in values:
+                name = value[0]
+                if self._values.get(name) != value:
+                    changed.append(name)
+                    self._values[name] = value
+                    updated_at = fetched_at
+                else:
+                    updated_at = self._records[name].updated_at
+                self._records[name] = build_record(value, fetched_at, updated_at)
+            if changed:
+                changed_names = set(changed)
+                self._summaries = {
+                    key: summary for key, summary in self._summaries.items() if key[0] not in changed_names
+                }
+        return changed
+
+    def get_stored_summary(self, country_name, parameter, prompt_hash, model):
+        return self._summaries.get((country_name, parameter, prompt_hash, model))
+
+    def get_latest_summary(self, country_name, parameter):
+        # Dicts keep insertion order, and store_summary re-inserts, so the last match is the newest
+        latest = None
+        for key, summary in list(self._summaries.items()):
+            if key[:2] == (country_name, parameter):
+                latest = summary
+        return latest
+
+    def store_summary(self, country_name, parameter, prompt_hash, model, summary):
+        with self._lock:
+            key = (country_name, parameter, prompt_hash, model)
+            self._summaries.pop(key, None)
+            self._summaries[key] = summary
+
+    def get_country_alias(self, alias):
+        return self._aliases.get(alias)
+
+    def get_country_aliases(self):
+        with self._lock:
+            return dict(self._aliases)
+
+    def store_country_aliases(self, aliases):
+        with self._lock:
+            for alias, country_name in aliases.items():
+                self._aliases.setdefault(alias, country_name)
+
+    def get_country_miss(self, name_key):
+        expires_at = self._misses.get(name_key)
+        if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            with self._lock:
+                if self._misses.get(name_key) == expires_at:
+                    del self._misses[name_key]
+            return None
+        return expires_at
+
+    def store_country_miss(self, name_key, country_name, ttl):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            # Names that are never looked up again would otherwise stay forever
+            for key in [key for key, expires_at in self._misses.items() if expires_at <= now]:
+                del self._misses[key]
+            self._misses[name_key] = now + timedelta(seconds=ttl)
+
+    def delete_country_misses(self, name_keys):
+        with self._lock:
+            for name_key in name_keys:
+                self._misses.pop(name_key, None)
+
+    def enqueue_job(self, job):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._jobs[job.id] = replace(job, created_at=now, available_at=now)
+
+    def claim_job(self, lease_seconds):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            available = [
+                job for job in self._jobs.values() if job.status in PENDING_STATUSES and job.available_at <= now
+            ]
+            if not available:
+                return None
+            job = min(available, key=lambda job: job.available_at)
+            job = self._jobs[job.id] = replace(
+                job, status=RUNNING, attempts=job.attempts + 1, started_at=now,
+                available_at=now + timedelta(seconds=lease_seconds)
+            )
+        return job
+
+    def _update_claimed_job(self, job_id, attempts, **changes):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.attempts == attempts and job.status == RUNNING:
+                self._jobs[job_id] = replace(job, **changes)
+
+    def finish_job(self, job_id, attempts, status, result, error):
+        self._update_claimed_job(
+            job_id, attempts, status=status, result=result, error=error, finished_at=datetime.now(timezone.utc)
+        )
+
+    def retry_job(self, job_id, attempts, delay, error):
+        self._update_claimed_job(
+            job_id, attempts, status=QUEUED, error=error,
+            available_at=datetime.now(timezone.utc) + timedelta(seconds=delay)
+        )
+
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def set_job_callback_status(self, job_id, callback_status):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = replace(job, callback_status=callback_status)
+
+    def count_jobs(self):
+        counts = {}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.name, 'countries': len(self._records), 'summaries': len(self._summaries),
+                'jobs': len(self._jobs), 'aliases': len(self._aliases),
+            }
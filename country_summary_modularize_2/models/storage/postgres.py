@@ -0,0 +1,508 @@
+import io
+import os
+import csv
+import time
+import select
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.errors import LockNotAvailable
+from psycopg2.extras import execute_values, Json
+
+from models.db_config import (
+    COUNTRY_CHANGES_CHANNEL, DatabaseUnavailableError, close_pool, get_db_connection, get_pool, get_pool_stats,
+    setup_database,
+)
+from models.country import CountryRecord, COUNTRY_COLUMNS, STORED_COLUMNS
+from models.summary_job import SummaryJob, JOB_COLUMNS, RUNNING, QUEUED, PENDING_STATUSES
+from models.storage.base import StorageBackend
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Longest wait before retrying a dropped LISTEN connection
+LISTEN_MAX_BACKOFF = 30
+# Connections kept for advisory locks, outside the request pool; callers beyond this run unlocked
+ADVISORY_LOCK_MAX_CONNECTIONS = int(os.getenv('ADVISORY_LOCK_MAX_CONNECTIONS', 4))
+# Seconds to wait for an advisory lock before running unlocked
+ADVISORY_LOCK_TIMEOUT = float(os.getenv('ADVISORY_LOCK_TIMEOUT', 10))
+# Seconds to wait when opening a lock connection (libpq counts whole seconds)
+ADVISORY_LOCK_CONNECT_TIMEOUT = int(os.getenv('ADVISORY_LOCK_CONNECT_TIMEOUT', 5))
+
+SELECT_COUNTRY_QUERY = "SELECT {} FROM country_economy WHERE country_name = %s".format(", ".join(COUNTRY_COLUMNS))
+SELECT_COUNTRIES_QUERY = "SELECT {} FROM country_economy WHERE country_name = ANY(%s)".format(", ".join(COUNTRY_COLUMNS))
+SELECT_ALL_COUNTRIES_QUERY = "SELECT {} FROM country_economy ORDER BY country_name".format(", ".join(COUNTRY_COLUMNS))
+
+# Shared conflict handling: only rows that were inserted or actually changed come back
+UPSERT_CONFLICT_CLAUSE = """
+ON CONFLICT (country_name) DO UPDATE SET
+    surface_area = EXCLUDED.surface_area,
+    exports = EXCLUDED.exports,
+    tourists = EXCLUDED.tourists,
+    gdp = EXCLUDED.gdp,
+    population = EXCLUDED.population,
+    imports = EXCLUDED.imports,
+    urban_population_growth = EXCLUDED.urban_population_growth,
+    urban_population = EXCLUDED.urban_population,
+    gdp_growth = EXCLUDED.gdp_growth,
+    gdp_per_capita = EXCLUDED.gdp_per_capita,
+    updated_at = NOW()
+WHERE (
+    country_economy.surface_area, country_economy.exports, country_economy.tourists,
+    country_economy.gdp, country_economy.population, country_economy.imports,
+    country_economy.urban_population_growth, country_economy.urban_population,
+    country_economy.gdp_growth, country_economy.gdp_per_capita
+) IS DISTINCT FROM (
+    EXCLUDED.surface_area, EXCLUDED.exports, EXCLUDED.tourists,
+    EXCLUDED.gdp, EXCLUDED.population, EXCLUDED.imports,
+    EXCLUDED.urban_population_growth, EXCLUDED.urban_population,
+    EXCLUDED.gdp_growth, EXCLUDED.gdp_per_capita
+)
+RETURNING country_name
+"""
+
+# Upsert for execute_values
+UPSERT_COUNTRY_QUERY = """
+INSERT INTO country_economy ({columns})
+VALUES %s
+""".format(columns=", ".join(STORED_COLUMNS)) + UPSERT_CONFLICT_CLAUSE
+
+# Set-based merge of a COPY-loaded staging table into country_economy
+MERGE_STAGING_QUERY = """
+INSERT INTO country_economy ({columns})
+SELECT DISTINCT ON (country_name) {columns} FROM country_economy_staging
+ORDER BY country_name
+""".format(columns=", ".join(STORED_COLUMNS)) + UPSERT_CONFLICT_CLAUSE
+
+# Re-fetched rows are fresh even when their data did not change
+TOUCH_FETCHED_AT_QUERY = "UPDATE country_economy SET fetched_at = NOW() WHERE country_name = ANY(%s)"
+
+# Claims the oldest available job; SKIP LOCKED lets concurrent workers on any node each take a different one
+CLAIM_JOB_QUERY = """
+UPDATE summary_job SET
+    status = %s,
+    attempts = attempts + 1,
+    started_at = NOW(),
+    available_at = NOW() + %s * INTERVAL '1 second'
+WHERE id = (
+    SELECT id FROM summary_job
+    WHERE status = ANY(%s) AND available_at <= NOW()
+    ORDER BY available_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING {columns}
+""".format(columns=", ".join(JOB_COLUMNS))
+
+
+class PostgresStorage(StorageBackend):
+    """country_economy and country_summary in Postgres, through the pool in models.db_config."""
+
+    name = 'postgres'
+
+    def __init__(self):
+        super().__init__()
+        # Idle connections kept for advisory locks, outside the request pool, and how many are open in all
+        self._lock_connections = []
+        self._lock_connections_open = 0
+
+    def setup(self):
+        setup_database()
+
+    def get_country_record(self, country_name):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_COUNTRY_QUERY, (country_name,))
+            row = cursor.fetchone()
+            cursor.close()
+
+        return CountryRecord.from_row(row) if row else None
+
+    def get_country_records(self, country_names):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_COUNTRIES_QUERY, (list(country_names),))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return {row[0]: CountryRecord.from_row(row) for row in rows}
+
+    def get_all_country_records(self):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SELECT_ALL_COUNTRIES_QUERY)
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return [CountryRecord.from_row(row) for row in rows]
+
+    def store_country_records(self, values):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                changed = [row[0] for row in execute_values(cursor, UPSERT_COUNTRY_QUERY, values, fetch=True)]
+                cursor.execute(TOUCH_FETCHED_AT_QUERY, ([value[0] for value in values],))
+                if changed:
+                    cursor.execute("DELETE FROM country_summary WHERE country_name = ANY(%s)", (changed,))
+            finally:
+                cursor.close()
+        return changed
+
+    def copy_country_records(self, values):
+        """Bulk-loads through COPY into a staging table and one set-based merge."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(values)
+        buffer.seek(0)
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "CREATE TEMP TABLE country_economy_staging "
+                    "(LIKE country_economy INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                cursor.copy_expert(
+                    "COPY country_economy_staging ({}) FROM STDIN WITH (FORMAT csv)".format(", ".join(STORED_COLUMNS)),
+                    buffer
+                )
+                cursor.execute(MERGE_STAGING_QUERY)
+                changed = [row[0] for row in cursor.fetchall()]
+                cursor.execute(
+                    "UPDATE country_economy SET fetched_at = NOW() "
+                    "WHERE country_name IN (SELECT country_name FROM country_economy_staging)"
+                )
+                if changed:
+                    cursor.execute("DELETE FROM country_summary WHERE country_name = ANY(%s)", (changed,))
+            finally:
+                cursor.close()
+        return changed
+
+    def get_stored_summary(self, country_name, parameter, prompt_hash, model):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT summary FROM country_summary
+                WHERE country_name = %s AND parameter = %s AND prompt_hash = %s AND model = %s
+                """,
+                (country_name, parameter, prompt_hash, model)
+            )
+            row = cursor.fetchone()
+            cursor.close()
+
+        return row[0] if row else None
+
+    def get_latest_summary(self, country_name, parameter):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT summary FROM country_summary
+                WHERE country_name = %s AND parameter = %s
+                ORDER BY created_at DESC LIMIT 1
+                """,
+                (country_name, parameter)
+            )
+            row = cursor.fetchone()
+            cursor.close()
+
+        return row[0] if row else None
+
+    def store_summary(self, country_name, parameter, prompt_hash, model, summary):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    INSERT INTO country_summary (country_name, parameter, prompt_hash, model, summary)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (country_name, parameter, prompt_hash, model) DO UPDATE SET
+                        summary = EXCLUDED.summary,
+                        created_at = NOW();
+                    """,
+                    (country_name, parameter, prompt_hash, model, summary)
+                )
+            finally:
+                cursor.close()
+
+    def get_country_alias(self, alias):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT country_name FROM country_alias WHERE alias = %s", (alias,))
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+        return row[0] if row else None
+
+    def get_country_aliases(self):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT alias, country_name FROM country_alias")
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        return dict(rows)
+
+    def store_country_aliases(self, aliases):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                execute_values(
+                    cursor, "INSERT INTO country_alias (alias, country_name) VALUES %s ON CONFLICT (alias) DO NOTHING",
+                    list(aliases.items())
+                )
+            finally:
+                cursor.close()
+
+    def get_country_miss(self, name_key):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT expires_at FROM country_not_found WHERE name_key = %s AND expires_at > NOW()", (name_key,)
+                )
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+        return row[0] if row else None
+
+    def store_country_miss(self, name_key, country_name, ttl):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    INSERT INTO country_not_found (name_key, country_name, expires_at)
+                    VALUES (%s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (name_key) DO UPDATE SET
+                        country_name = EXCLUDED.country_name,
+                        expires_at = EXCLUDED.expires_at;
+                    """,
+                    (name_key, country_name, ttl)
+                )
+            finally:
+                cursor.close()
+
+    def delete_country_misses(self, name_keys):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("DELETE FROM country_not_found WHERE name_key = ANY(%s)", (list(name_keys),))
+            finally:
+                cursor.close()
+
+    def enqueue_job(self, job):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO summary_job (id, country_name, parameters, callback_url) VALUES (%s, %s, %s, %s)",
+                    (job.id, job.country_name, Json(job.parameters), job.callback_url)
+                )
+            finally:
+                cursor.close()
+
+    def claim_job(self, lease_seconds):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(CLAIM_JOB_QUERY, (RUNNING, lease_seconds, list(PENDING_STATUSES)))
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+        return SummaryJob.from_row(row) if row else None
+
+    def finish_job(self, job_id, attempts, status, result, error):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    UPDATE summary_job SET status = %s, result = %s, error = %s, finished_at = NOW()
+                    WHERE id = %s AND attempts = %s AND status = %s
+                    """,
+                    (status, Json(result) if result is not None else None, error, job_id, attempts, RUNNING)
+                )
+            finally:
+                cursor.close()
+
+    def retry_job(self, job_id, attempts, delay, error):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    UPDATE summary_job SET status = %s, error = %s, available_at = NOW() + %s * INTERVAL '1 second'
+                    WHERE id = %s AND attempts = %s AND status = %s
+                    """,
+                    (QUEUED, error, delay, job_id, attempts, RUNNING)
+                )
+            finally:
+                cursor.close()
+
+    def get_job(self, job_id):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT {} FROM summary_job WHERE id = %s".format(", ".join(JOB_COLUMNS)), (job_id,))
+            row = cursor.fetchone()
+            cursor.close()
+
+        return SummaryJob.from_row(row) if row else None
+
+    def set_job_callback_status(self, job_id, callback_status):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("UPDATE summary_job SET callback_status = %s WHERE id = %s", (callback_status, job_id))
+            finally:
+                cursor.close()
+
+    def count_jobs(self):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM summary_job GROUP BY status")
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return dict(rows)
+
+    @contextmanager
+    def advisory_lock(self, key):
+        """Holds a session-level Postgres advisory lock, shared by every worker process.
+
+        The lock is taken on a dedicated connection rather than a pooled one, so the work done while
+        holding it can check out pool connections without the pool running dry at full concurrency.
+        When all ADVISORY_LOCK_MAX_CONNECTIONS are busy, or the lock is not granted within
+        ADVISORY_LOCK_TIMEOUT, the block runs without it: a duplicate upstream fetch beats a stuck request.
+        """
+        conn = self._checkout_lock_connection()
+        if conn is None:
+            logger.warning(f"No free advisory lock connection, running {key} unlocked")
+        elif not self._try_advisory_lock(conn, key):
+            conn = None
+        if conn is None:
+            yield
+            return
+        reusable = False
+        try:
+            yield
+        finally:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (key,))
+                reusable = True
+            except psycopg2.Error as e:
+                logger.error(f"Error releasing advisory lock {key}: {e}")
+            finally:
+                # A connection that may still hold the lock is closed, which releases it
+                self._release_lock_connection(conn, reusable)
+
+    def _try_advisory_lock(self, conn, key):
+        # The connection's lock_timeout bounds the wait; a timed-out connection stays usable
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", (key,))
+        except LockNotAvailable:
+            logger.warning(f"Advisory lock {key} not granted within {ADVISORY_LOCK_TIMEOUT:.0f}s, running unlocked")
+            self._release_lock_connection(conn, True)
+            return False
+        except BaseException:
+            self._release_lock_connection(conn, False)
+            raise
+        return True
+
+    def _checkout_lock_connection(self):
+        """Returns an idle lock connection or a new one, or None when all ADVISORY_LOCK_MAX_CONNECTIONS are busy."""
+        with self._locks_guard:
+            while self._lock_connections:
+                conn = self._lock_connections.pop()
+                if not conn.closed:
+                    return conn
+                self._lock_connections_open -= 1
+            if self._lock_connections_open >= ADVISORY_LOCK_MAX_CONNECTIONS:
+                return None
+            self._lock_connections_open += 1
+        try:
+            conn = psycopg2.connect(**{'connect_timeout': ADVISORY_LOCK_CONNECT_TIMEOUT, **get_pool().connect_kwargs})
+        except BaseException as e:
+            with self._locks_guard:
+                self._lock_connections_open -= 1
+            if isinstance(e, psycopg2.Error):
+                logger.error(f"Error opening advisory lock connection: {e}")
+                raise DatabaseUnavailableError(f"Could not connect to database: {e}") from e
+            raise
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('lock_timeout', %s, false)", (f"{int(ADVISORY_LOCK_TIMEOUT * 1000)}ms",)
+                )
+        except BaseException:
+            self._release_lock_connection(conn, False)
+            raise
+        return conn
+
+    def _release_lock_connection(self, conn, reusable):
+        if reusable and not conn.closed:
+            with self._locks_guard:
+                self._lock_connections.append(conn)
+            return
+        conn.close()
+        with self._locks_guard:
+            self._lock_connections_open -= 1
+
+    def warm_up(self):
+        # Creating the pool opens DB_POOL_MIN_SIZE connections
+        get_pool()
+
+    def close(self):
+        with self._locks_guard:
+            connections, self._lock_connections = self._lock_connections, []
+            self._lock_connections_open -= len(connections)
+        for conn in connections:
+            conn.close()
+        close_pool()
+
+    def listen_changes(self, callback):
+        """LISTENs on the country_economy trigger channel in a daemon thread with its own connection."""
+        thread = threading.Thread(
+            target=self._listen, args=(callback,), name='country-changes-listener', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _listen(self, callback):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                # A LISTEN connection stays open for good, so it is not borrowed from the pool
+                conn = psycopg2.connect(**get_pool().connect_kwargs)
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {COUNTRY_CHANGES_CHANNEL}")
+                backoff = 1
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    # One callback per wake-up, covering every row a batch upsert touched
+                    names = list(dict.fromkeys(notify.payload for notify in conn.notifies))
+                    conn.notifies.clear()
+                    if names:
+                        callback(names)
+            except Exception as e:
+                logger.error(f"Country change listener lost its connection, retrying in {backoff}s: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, LISTEN_MAX_BACKOFF)
+
+    def stats(self):
+        return {'backend': self.name, 'pool': get_pool_stats()}
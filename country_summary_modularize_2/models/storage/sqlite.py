@@ -0,0 +1,343 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+
+from models.country import CountryRecord, COUNTRY_COLUMNS, STORED_COLUMNS, DERIVED_COLUMNS
+from models.summary_job import SummaryJob, JOB_COLUMNS, RUNNING, QUEUED, PENDING_STATUSES
+from models.db_config import DERIVED_COLUMN_INDEXES
+from models.storage.base import StorageBackend, build_record
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'country_economy.db')
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5))  # seconds a writer waits for the lock
+
+_SELECT = "SELECT {} FROM country_economy".format(", ".join(COUNTRY_COLUMNS))
+_WRITTEN_COLUMNS = STORED_COLUMNS + DERIVED_COLUMNS + ('fetched_at', 'updated_at')
+
+UPSERT_COUNTRY_QUERY = "INSERT INTO country_economy ({columns}) VALUES ({placeholders}) " \
+    "ON CONFLICT (country_name) DO UPDATE SET {updates}".format(
+        columns=", ".join(_WRITTEN_COLUMNS),
+        placeholders=", ".join("?" for _ in _WRITTEN_COLUMNS),
+        updates=", ".join(f"{column} = excluded.{column}" for column in _WRITTEN_COLUMNS[1:]),
+    )
+
+_COLUMN_TYPES = {
+    'country_name': 'TEXT PRIMARY KEY',
+    'population': 'INTEGER',
+    'urban_population': 'INTEGER',
+    'trade_balance_status': 'TEXT',
+    'fetched_at': 'TEXT NOT NULL',
+    'updated_at': 'TEXT NOT NULL',
+}
+
+
+_SELECT_JOB = "SELECT {} FROM summary_job".format(", ".join(JOB_COLUMNS))
+_JOB_TIMESTAMPS = ('created_at', 'started_at', 'finished_at', 'available_at')
+
+
+def _timestamp(when):
+    # Fixed-width ISO-8601, so timestamps compare correctly as text
+    return when.isoformat(timespec='microseconds')
+
+
+def _job_from_row(row):
+    data = dict(zip(JOB_COLUMNS, row))
+    data['parameters'] = json.loads(data['parameters'])
+    data['result'] = json.loads(data['result']) if data['result'] is not None else None
+    for column in _JOB_TIMESTAMPS:
+        if data[column] is not None:
+            data[column] = datetime.fromisoformat(data[column])
+    return SummaryJob(**data)
+
+
+def _record_from_row(row):
+    row = list(row)
+    # fetched_at and updated_at are stored as ISO-8601 text
+    row[-2:] = [datetime.fromisoformat(value) for value in row[-2:]]
+    return CountryRecord.from_row(row)
+
+
+class SQLiteStorage(StorageBackend):
+    """Embedded SQLite database in WAL mode, for single-node deployments, tests and benchmarks.
+
+    Each thread gets its own connection; WAL lets readers run while one writer commits. Derived
+    columns are computed on write, with the same rules as the Postgres generated columns.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._connections = 0
+        self._connections_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes open their own BEGIN IMMEDIATE transaction
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections += 1
+        return conn
+
+    def _write(self):
+        """Returns a connection with an open write transaction; the caller commits or rolls back."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def warm_up(self):
+        self._connection()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            with self._connections_lock:
+                self._connections -= 1
+        # Connections opened by other threads are not inherited by a forked child
+        self._local = threading.local()
+
+    def setup(self):
+        columns = ", ".join(f"{column} {_COLUMN_TYPES.get(column, 'REAL')}" for column in COUNTRY_COLUMNS)
+        conn = self._connection()
+        conn.execute(f"CREATE TABLE IF NOT EXISTS country_economy ({columns})")
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(country_economy)")}
+        if 'updated_at' not in existing:
+            # Files created before rows carried a version; their last fetch is the best estimate
+            conn.execute("ALTER TABLE country_economy ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''")
+            conn.execute("UPDATE country_economy SET updated_at = fetched_at")
+        for column in DERIVED_COLUMN_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS country_economy_{column}_idx ON country_economy ({column})")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS country_summary (
+            country_name TEXT NOT NULL,
+            parameter TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (country_name, parameter, prompt_hash, model)
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS country_alias (
+            alias TEXT PRIMARY KEY,
+            country_name TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS country_not_found (
+            name_key TEXT PRIMARY KEY,
+            country_name TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS summary_job (
+            id TEXT PRIMARY KEY,
+            country_name TEXT NOT NULL,
+            parameters TEXT NOT NULL,
+            callback_url TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            callback_status TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            available_at TEXT NOT NULL
+        )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS summary_job_available_idx ON summary_job (available_at) "
+            "WHERE status IN ('queued', 'running')"
+        )
+
+    def get_country_record(self, country_name):
+        row = self._connection().execute(f"{_SELECT} WHERE country_name = ?", (country_name,)).fetchone()
+        return _record_from_row(row) if row else None
+
+    def get_country_records(self, country_names):
+        names = list(country_names)
+        placeholders = ", ".join("?" for _ in names)
+        rows = self._connection().execute(f"{_SELECT} WHERE country_name IN ({placeholders})", names).fetchall()
+        return {row[0]: _record_from_row(row) for row in rows}
+
+    def get_all_country_records(self):
+        rows = self._connection().execute(f"{_SELECT} ORDER BY country_name").fetchall()
+        return [_record_from_row(row) for row in rows]
+
+    def store_country_records(self, values):
+        fetched_at = datetime.now(timezone.utc)
+        names = [value[0] for value in values]
+        placeholders = ", ".join("?" for _ in names)
+        select_stored = "SELECT {}, updated_at FROM country_economy WHERE country_name IN ({})".format(
+            ", ".join(STORED_COLUMNS), placeholders
+        )
+
+        conn = self._write()
+        try:
+            stored = {row[0]: tuple(row) for row in conn.execute(select_stored, names)}
+            changed = [value[0] for value in values if stored.get(value[0], ())[:-1] != tuple(value)]
+            changed_names = set(changed)
+            rows = []
+            for value in values:
+                updated_at = fetched_at.isoformat() if value[0] in changed_names else stored[value[0]][-1]
+                record = build_record(value, fetched_at, None).to_dict()
+                rows.append(
+                    tuple(record[column] for column in _WRITTEN_COLUMNS[:-2]) + (fetched_at.isoformat(), updated_at)
+                )
+            conn.executemany(UPSERT_COUNTRY_QUERY, rows)
+            if changed:
+                conn.execute(
+                    "DELETE FROM country_summary WHERE country_name IN ({})".format(", ".join("?" for _ in changed)),
+                    changed
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def get_stored_summary(self, country_name, parameter, prompt_hash, model):
+        row = self._connection().execute(
+            """
+            SELECT summary FROM country_summary
+            WHERE country_name = ? AND parameter = ? AND prompt_hash = ? AND model = ?
+            """,
+            (country_name, parameter, prompt_hash, model)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_latest_summary(self, country_name, parameter):
+        row = self._connection().execute(
+            """
+            SELECT summary FROM country_summary
+            WHERE country_name = ? AND parameter = ?
+            ORDER BY created_at DESC LIMIT 1
+            """,
+            (country_name, parameter)
+        ).fetchone()
+        return row[0] if row else None
+
+    def store_summary(self, country_name, parameter, prompt_hash, model, summary):
+        self._connection().execute(
+            """
+            INSERT INTO country_summary (country_name, parameter, prompt_hash, model, summary)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (country_name, parameter, prompt_hash, model) DO UPDATE SET
+                summary = excluded.summary,
+                created_at = CURRENT_TIMESTAMP
+            """,
+            (country_name, parameter, prompt_hash, model, summary)
+        )
+
+    def get_country_alias(self, alias):
+        row = self._connection().execute("SELECT country_name FROM country_alias WHERE alias = ?", (alias,)).fetchone()
+        return row[0] if row else None
+
+    def get_country_aliases(self):
+        return dict(self._connection().execute("SELECT alias, country_name FROM country_alias").fetchall())
+
+    def store_country_aliases(self, aliases):
+        self._connection().executemany(
+            "INSERT INTO country_alias (alias, country_name) VALUES (?, ?) ON CONFLICT (alias) DO NOTHING",
+            list(aliases.items())
+        )
+
+    def get_country_miss(self, name_key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM country_not_found WHERE name_key = ? AND expires_at > ?",
+            (name_key, _timestamp(datetime.now(timezone.utc)))
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def store_country_miss(self, name_key, country_name, ttl):
+        expires_at = _timestamp(datetime.now(timezone.utc) + timedelta(seconds=ttl))
+        self._connection().execute(
+            """
+            INSERT INTO country_not_found (name_key, country_name, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name_key) DO UPDATE SET country_name = excluded.country_name, expires_at = excluded.expires_at
+            """,
+            (name_key, country_name, expires_at)
+        )
+
+    def delete_country_misses(self, name_keys):
+        name_keys = list(name_keys)
+        self._connection().execute(
+            "DELETE FROM country_not_found WHERE name_key IN ({})".format(", ".join("?" for _ in name_keys)),
+            name_keys
+        )
+
+    def enqueue_job(self, job):
+        now = _timestamp(datetime.now(timezone.utc))
+        self._connection().execute(
+            "INSERT INTO summary_job (id, country_name, parameters, callback_url, created_at, available_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job.id, job.country_name, json.dumps(job.parameters), job.callback_url, now, now)
+        )
+
+    def claim_job(self, lease_seconds):
+        now = datetime.now(timezone.utc)
+        # BEGIN IMMEDIATE takes the write lock first, so two workers cannot select the same job
+        conn = self._write()
+        try:
+            row = conn.execute(
+                "SELECT id FROM summary_job WHERE status IN (?, ?) AND available_at <= ? "
+                "ORDER BY available_at LIMIT 1",
+                PENDING_STATUSES + (_timestamp(now),)
+            ).fetchone()
+            job = None
+            if row is not None:
+                conn.execute(
+                    "UPDATE summary_job SET status = ?, attempts = attempts + 1, started_at = ?, available_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, _timestamp(now), _timestamp(now + timedelta(seconds=lease_seconds)), row[0])
+                )
+                job = _job_from_row(conn.execute(f"{_SELECT_JOB} WHERE id = ?", (row[0],)).fetchone())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job
+
+    def finish_job(self, job_id, attempts, status, result, error):
+        self._connection().execute(
+            "UPDATE summary_job SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND attempts = ? AND status = ?",
+            (status, json.dumps(result) if result is not None else None, error,
+             _timestamp(datetime.now(timezone.utc)), job_id, attempts, RUNNING)
+        )
+
+    def retry_job(self, job_id, attempts, delay, error):
+        available_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self._connection().execute(
+            "UPDATE summary_job SET status = ?, error = ?, available_at = ? WHERE id = ? AND attempts = ? AND status = ?",
+            (QUEUED, error, _timestamp(available_at), job_id, attempts, RUNNING)
+        )
+
+    def get_job(self, job_id):
+        row = self._connection().execute(f"{_SELECT_JOB} WHERE id = ?", (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def set_job_callback_status(self, job_id, callback_status):
+        self._connection().execute(
+            "UPDATE summary_job SET callback_status = ? WHERE id = ?", (callback_status, job_id)
+        )
+
+    def count_jobs(self):
+        return dict(self._connection().execute("SELECT status, COUNT(*) FROM summary_job GROUP BY status").fetchall())
+
+    def stats(self):
+        with self._connections_lock:
+            connections = self._connections
+        return {'backend': self.name, 'path': self.path, 'connections': connections}
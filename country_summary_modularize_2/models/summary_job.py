@@ -0,0 +1,49 @@
+from dataclasses import dataclass, asdict, field, fields
+from datetime import datetime
+from typing import Optional
+
+# Job lifecycle: queued -> running -> succeeded / failed; a failed attempt may go back to queued
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+PENDING_STATUSES = (QUEUED, RUNNING)
+
+# Webhook delivery outcome, once the job has finished
+CALLBACK_DELIVERED, CALLBACK_FAILED = 'delivered', 'failed'
+
+
+@dataclass
+class SummaryJob:
+    """One row of the summary_job table: a summary generation requested through POST /summaries."""
+    id: str
+    country_name: str
+    parameters: list = field(default_factory=list)
+    callback_url: Optional[str] = None
+    status: str = QUEUED
+    attempts: int = 0
+    # {parameter: summary} once generated
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    callback_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Earliest time a worker may claim the job: a retry's backoff, or a running job's lease expiry
+    available_at: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a job from a row selected with JOB_COLUMNS."""
+        return cls(*row)
+
+    def to_dict(self):
+        """Returns the job as the JSON body of GET /summaries/<id>."""
+        data = asdict(self)
+        data['summaries'] = data.pop('result')
+        data['country'] = data.pop('country_name')
+        del data['available_at']
+        for key in ('created_at', 'started_at', 'finished_at'):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+
+JOB_COLUMNS = tuple(column.name for column in fields(SummaryJob))
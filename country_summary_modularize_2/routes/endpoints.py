@@ -1,28 +1,99 @@
-from flask import jsonify, request
+import os
+import time
+from flask import jsonify, request, Response, stream_with_context, g, current_app
 from services.services import fetch_economy_data
-from models.db_operations import fetch_country_data, store_country_data, get_economy_data
-from utils.prompts import get_prompt_for_parameter, format_prompt, get_comprehensive_prompt
+from models.db_operations import store_country_data
+from models.country import ECONOMY_FIELDS
+from models.db_config import get_pool_stats
+from models.storage import get_storage
+from utils.prompts import get_prompt_for_parameter, format_prompt, get_comprehensive_prompt, SUMMARY_PARAMETERS
 # import logging
-from services.groq_service import generate_summary, get_country_data_summary
+from services.groq_service import generate_summary, generate_summaries, get_country_data_summary, stream_summary, stream_country_data_summary
+from services.summary_cache import get_cache_stats
+from services.country_loader import load_country, load_countries, get_stored_country, get_loader_stats, freshness_headers
+from services.negative_cache import get_negative_cache_stats
+from services.country_names import canonical_country_name, country_names
+from services.upstream import api_ninjas
+from utils.sse import wants_event_stream, stream_events
+from utils.metrics import set_route, observe_request, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.metrics_engine import metrics_engine, RANKABLE_METRICS
+from services.country_snapshot import country_snapshot
+from services.startup import get_startup_stats
+from utils.http_cache import cached_json_response, version_tag, content_tag, get_http_cache_stats
+from utils.circuit_breaker import CircuitOpenError
+from services.breakers import get_breaker_stats
+from services.quotas import get_quota_stats
+from services.summary_jobs import parse_job_request, submit_job, get_job, get_job_stats
+from services.degraded import upstream_unavailable, summary_failed, groq_unavailable, DEGRADED_HEADERS
+from services.summary_cache import get_fallback_summary
+
+MAX_BATCH_COUNTRIES = int(os.getenv('MAX_BATCH_COUNTRIES', 200))
+
+
+def event_stream(chunks):
+    """Wraps a summary chunk iterator in a Server-Sent Events response."""
+    return Response(
+        stream_with_context(stream_events(chunks)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 def setup_routes(app):
+    @app.before_request
+    def start_request_timer():
+        # Label stage timings with the route template rather than the raw path
+        set_route(request.url_rule.rule if request.url_rule else 'unmatched')
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.get('request_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+        return response
+
+    # An open circuit answers at once with 503 and Retry-After instead of waiting on the dependency
+    app.register_error_handler(CircuitOpenError, upstream_unavailable)
+
     @app.route('/country/<country_name>')
     def get_country_data_route(country_name):
-        country_data = fetch_country_data(country_name)
-        if country_data:
-            return jsonify(country_data)
+        # Falls back to the API on a miss, with concurrent misses sharing one fetch
+        country_data = load_country(country_name)
+        if not country_data:
+            return jsonify({"error": "Country not found"}), 404
+        updated_at = country_data.get('updated_at')
+        if updated_at is None:
+            # Just fetched from API-Ninjas, there is no stored version to validate against yet
+            return jsonify(country_data), 200, freshness_headers(country_data)
+        # fetched_at is part of the body, so it is part of the version and the modification time too
+        fetched_at = country_data['fetched_at']
+        return cached_json_response(
+            request, 'country', country_data['country_name'], version_tag(updated_at, fetched_at), country_data,
+            current_app.json.dumps, last_modified=max(updated_at, fetched_at), headers=freshness_headers(country_data)
+        )
+
+    @app.route('/countries', methods=['GET', 'POST'])
+    def get_countries_route():
+        if request.method == 'POST':
+            names = (request.get_json(silent=True) or {}).get('names', [])
         else:
-            # If not in database, try to fetch from API
-            fetched_data = fetch_economy_data(country_name)
-            if fetched_data:
-                store_country_data(fetched_data)
-                return jsonify(fetched_data)
-            else:
-                return jsonify({"error": "Country not found"}), 404
+            names = request.args.get('names', '').split(',')
+        if not isinstance(names, list):
+            return jsonify({"error": "'names' must be a list of country names"}), 400
+        names = [name.strip() for name in names if isinstance(name, str) and name.strip()]
+        if not names:
+            return jsonify({"error": "No country names given"}), 400
+        if len(names) > MAX_BATCH_COUNTRIES:
+            return jsonify({"error": f"At most {MAX_BATCH_COUNTRIES} countries per request"}), 400
+
+        countries, errors = load_countries(names)
+        return jsonify({"countries": countries, "errors": errors})
 
     @app.route('/fetch-and-store/<country_name>')
     def fetch_and_store_country(country_name):
+        country_name = canonical_country_name(country_name)
         country_data = fetch_economy_data(country_name)
         if country_data:
             store_country_data(country_data)
@@ -32,15 +103,29 @@ def setup_routes(app):
 
     @app.route('/country-summary/<country_name>')
     def get_country_summary(country_name):
-        country_data = fetch_country_data(country_name)
-        if country_data:
-            summary = get_country_data_summary(country_data)
-            return jsonify(summary)
-        else:
+        country_data = get_stored_country(country_name)
+        if country_data and wants_event_stream(request):
+            return event_stream(stream_country_data_summary(country_data))
+        if not country_data:
             return jsonify({"error": "Country not found"}), 404
+        # A cached summary is served (or answered with 304) without calling Groq
+        unavailable = None
+        try:
+            summary = get_country_data_summary(country_data)
+        except CircuitOpenError as e:
+            # Groq could not be called; summary_failed answers with the fallback or a 503
+            summary, unavailable = None, e
+        if summary is None:
+            fallback = get_fallback_summary(country_data['country_name'], 'country_summary')
+            return summary_failed(fallback, {"country": country_data['country_name'], "summary": fallback}, unavailable)
+        return cached_json_response(
+            request, 'country_summary', summary['country'], content_tag(summary['country'], summary['summary']),
+            summary, current_app.json.dumps
+        )
         
     @app.route('/fetch-and-store-economy/<country_name>', methods=['GET', 'POST'])
     def fetch_and_store_economy(country_name):
+        country_name = canonical_country_name(country_name)
         economy_data = fetch_economy_data(country_name)
         if economy_data:
             store_country_data(economy_data)
@@ -52,44 +137,172 @@ def setup_routes(app):
 
     @app.route('/economy/<country_name>')
     def get_economy_data_route(country_name):
-        economy_data = get_economy_data(country_name)
-        if economy_data:
-            return jsonify(economy_data)
-        else:
+        country_data = load_country(country_name, fetch_missing=False)
+        if not country_data:
             return jsonify({"error": "Economy data not found"}), 404
+        updated_at = country_data.get('updated_at')
+        if updated_at is None:
+            # An expired row was just refetched from API-Ninjas, so there is no stored version yet
+            economy_data = {field: country_data[field] for field in ECONOMY_FIELDS}
+            return jsonify(economy_data), 200, freshness_headers(country_data)
+        return cached_json_response(
+            request, 'economy', country_data['country_name'], version_tag(updated_at),
+            lambda: {field: country_data[field] for field in ECONOMY_FIELDS}, current_app.json.dumps,
+            last_modified=updated_at, headers=freshness_headers(country_data)
+        )
 
     @app.route('/country-parameter-summary/<country_name>')
     def get_country_parameter_summary(country_name):
         parameter = request.args.get('parameter', '').lower()
-        valid_parameters = ['population_density', 'trade', 'import_export']
+        valid_parameters = list(SUMMARY_PARAMETERS)
+        # ?parameters=a,b,c asks for several summaries from a single Groq call
+        parameters = [name.strip().lower() for name in request.args.get('parameters', '').split(',') if name.strip()]
+        unknown = [name for name in parameters if name not in valid_parameters]
+        if unknown:
+            return jsonify({"error": f"Unknown parameters: {', '.join(unknown)}", "parameters": valid_parameters}), 400
         
-        country_data = fetch_country_data(country_name)
-        economy_data = get_economy_data(country_name)
-        
-        if not country_data and not economy_data:
-            country_data = fetch_economy_data(country_name)
-            if country_data:
-                store_country_data(country_data)
-        
-        if not country_data and not economy_data:
+        combined_data = load_country(country_name)
+        if not combined_data:
             return jsonify({"error": "Country data not found"}), 404
-        
-        # Combine country_data and economy_data
-        combined_data = {**country_data, **economy_data} if country_data and economy_data else country_data or economy_data or {}
+
+        # Set when Groq refuses the call (open breaker, no quota), to answer 503 with its Retry-After
+        unavailable = None
+        if parameters:
+            parameters = list(dict.fromkeys(parameters))
+            try:
+                summaries = generate_summaries(combined_data['country_name'], combined_data, parameters)
+            except CircuitOpenError as e:
+                summaries, unavailable = {name: None for name in parameters}, e
+            except Exception as e:
+                return jsonify({"error": f"Error processing request: {str(e)}"}), 500
+            failed = [name for name, summary in summaries.items() if not summary]
+            # Degraded mode: fill what Groq could not generate with the last stored summaries
+            degraded = []
+            for name in failed:
+                summaries[name] = get_fallback_summary(combined_data['country_name'], name)
+                if summaries[name]:
+                    degraded.append(name)
+            failed = [name for name in failed if name not in degraded]
+            unavailable = (unavailable or groq_unavailable()) if failed else None
+            if unavailable is not None:
+                return upstream_unavailable(unavailable)
+            if failed:
+                return jsonify({"error": f"Failed to generate summary for: {', '.join(failed)}", "summaries": summaries}), 500
+            if degraded:
+                return jsonify({"summaries": summaries, "degraded": degraded}), 200, DEGRADED_HEADERS
+            return jsonify({"summaries": summaries})
         
         try:
             if parameter in valid_parameters:
                 prompt = get_prompt_for_parameter(parameter)
             else:
+                parameter = 'comprehensive'
                 prompt = get_comprehensive_prompt()
             
-            formatted_prompt = format_prompt(prompt, country_name, combined_data)
-            summary = generate_summary(formatted_prompt)
+            formatted_prompt = format_prompt(prompt, combined_data['country_name'], combined_data)
+            if wants_event_stream(request):
+                return event_stream(stream_summary(formatted_prompt, combined_data['country_name'], parameter))
+            try:
+                summary = generate_summary(formatted_prompt, country_name=combined_data['country_name'], parameter=parameter)
+            except CircuitOpenError as e:
+                summary, unavailable = None, e
             
             if summary:
                 return jsonify({"summary": summary})
-            else:
-                return jsonify({"error": "Failed to generate summary"}), 500
+            fallback = get_fallback_summary(combined_data['country_name'], parameter)
+            return summary_failed(fallback, {"summary": fallback}, unavailable)
         except Exception as e:
             # logger.error(f"Error processing request: {str(e)}")
             return jsonify({"error": f"Error processing request: {str(e)}"}), 500
+
+    @app.route('/summaries', methods=['POST'])
+    def create_summary_job():
+        try:
+            country_name, parameters, callback_url = parse_job_request(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e), "parameters": list(SUMMARY_PARAMETERS)}), 400
+        job_id = submit_job(country_name, parameters, callback_url)
+        return jsonify({"id": job_id, "status": "queued"}), 202, {'Location': f"/summaries/{job_id}"}
+
+    @app.route('/summaries/<job_id>')
+    def get_summary_job(job_id):
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict())
+
+    @app.route('/rankings')
+    def get_rankings():
+        metric = request.args.get('metric', 'trade_to_gdp_ratio')
+        if metric not in RANKABLE_METRICS:
+            return jsonify({"error": f"Unknown metric '{metric}'", "metrics": list(RANKABLE_METRICS)}), 400
+        try:
+            top = max(1, int(request.args.get('top', 20)))
+        except ValueError:
+            return jsonify({"error": "'top' must be an integer"}), 400
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        return jsonify({"metric": metric, "rankings": metrics_engine.rankings(metric, top, descending)})
+
+    @app.route('/rankings/<country_name>')
+    def get_country_rankings(country_name):
+        profile = metrics_engine.country_profile(canonical_country_name(country_name))
+        if profile:
+            return jsonify(profile)
+        else:
+            return jsonify({"error": "Country not found"}), 404
+
+    @app.route('/metrics')
+    def get_metrics():
+        return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+    @app.route('/db-pool-stats')
+    def get_db_pool_stats():
+        return jsonify(get_pool_stats() or {"error": "Connection pool not initialised"})
+
+    @app.route('/storage-stats')
+    def get_storage_stats():
+        return jsonify(get_storage().stats())
+
+    @app.route('/snapshot-stats')
+    def get_snapshot_stats():
+        return jsonify(country_snapshot.get_stats())
+
+    @app.route('/startup-stats')
+    def get_startup_stats_route():
+        return jsonify(get_startup_stats())
+
+    @app.route('/http-cache-stats')
+    def get_http_cache_stats_route():
+        return jsonify(get_http_cache_stats())
+
+    @app.route('/breakers')
+    def get_breakers():
+        return jsonify(get_breaker_stats())
+
+    @app.route('/quota-stats')
+    def get_quota_stats_route():
+        return jsonify(get_quota_stats())
+
+    @app.route('/summary-job-stats')
+    def get_summary_job_stats():
+        return jsonify(get_job_stats())
+
+    @app.route('/negative-cache-stats')
+    def get_negative_cache_stats_route():
+        return jsonify(get_negative_cache_stats())
+
+    @app.route('/country-name-stats')
+    def get_country_name_stats():
+        return jsonify(country_names.get_stats())
+
+    @app.route('/summary-cache-stats')
+    def get_summary_cache_stats():
+        return jsonify(get_cache_stats())
+
+    @app.route('/loader-stats')
+    def get_country_loader_stats():
+        return jsonify(get_loader_stats())
+
+    @app.route('/upstream-stats')
+    def get_upstream_stats():
+        return jsonify({"api_ninjas": api_ninjas.stats()})
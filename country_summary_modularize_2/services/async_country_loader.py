@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from models import async_db_operations
+from services.async_upstream import fetch_economy_data
+from services.country_loader import normalize_country_key, data_freshness, UPSTREAM_MAX_WORKERS
+from services.country_snapshot import country_snapshot
+from services.country_names import country_names as country_name_index, canonical_country_name
+from utils.singleflight import AsyncSingleFlight
+from utils.rate_limit import set_priority, BACKGROUND
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_upstream_flights = AsyncSingleFlight()
+# Background refresh tasks by country key; holding them also keeps them from being garbage-collected
+_refreshing = {}
+_refresh_stats = {'scheduled': 0, 'skipped': 0, 'failed': 0, 'served_stale': 0, 'served_expired': 0}
+
+
+async def _fetch_and_store(country_name):
+    fetched_data = await fetch_economy_data(country_name)
+    if fetched_data:
+        await async_db_operations.store_country_data(fetched_data)
+        fetched_data['fetched_at'] = datetime.now(timezone.utc)
+    return fetched_data
+
+
+async def _refresh(country_name, key):
+    # Runs in its own task, so this does not reach the request that scheduled it
+    set_priority(BACKGROUND)
+    try:
+        if not await _upstream_flights.do(key, lambda: _fetch_and_store(country_name)):
+            logger.warning(f"Background refresh of {country_name} returned no data")
+    except Exception as e:
+        _refresh_stats['failed'] += 1
+        logger.error(f"Background refresh of {country_name} failed: {e}")
+    finally:
+        _refreshing.pop(key, None)
+
+
+def schedule_refresh(country_name):
+    """Refreshes a country from API-Ninjas in a background task unless one is already running."""
+    key = normalize_country_key(country_name)
+    if key in _refreshing:
+        _refresh_stats['skipped'] += 1
+        return False
+    _refresh_stats['scheduled'] += 1
+    _refreshing[key] = asyncio.get_running_loop().create_task(_refresh(country_name, key))
+    return True
+
+
+async def _serve_stored(country_name, country_data):
+    """Applies stale-while-revalidate to a stored row; returns the data to serve."""
+    freshness = data_freshness(country_data)
+    if freshness == 'fresh':
+        return country_data
+    if freshness == 'stale':
+        _refresh_stats['served_stale'] += 1
+        schedule_refresh(country_name)
+        return country_data
+
+    # Past the hard TTL: wait for a refresh, but fall back to the old row if the upstream is down
+    try:
+        refreshed = await _upstream_flights.do(
+            normalize_country_key(country_name), lambda: _fetch_and_store(country_name)
+        )
+    except Exception as e:
+        logger.error(f"Error refreshing expired data for {country_name}: {e}")
+        refreshed = None
+    if refreshed:
+        return refreshed
+    _refresh_stats['served_expired'] += 1
+    return country_data
+
+
+async def resolve_country_name(country_name):
+    """Returns the canonical name a requested country is stored and fetched under."""
+    # Only a name this process has not seen needs the country_alias table
+    return country_name_index.lookup(country_name) or await asyncio.to_thread(canonical_country_name, country_name)
+
+
+async def get_stored_country(country_name):
+    """Returns a country's stored row as a dict, from the in-process snapshot once it is loaded."""
+    return await _stored_country(await resolve_country_name(country_name))
+
+
+async def _stored_country(country_name):
+    if country_snapshot.loaded:
+        return country_snapshot.get(country_name)
+    record = await async_db_operations.get_country_record(country_name)
+    return record.to_dict() if record else None
+
+
+async def _stored_countries(country_names):
+    if country_snapshot.loaded:
+        return country_snapshot.get_many(country_names)
+    records = await async_db_operations.get_country_records(country_names)
+    return {name: record.to_dict() for name, record in records.items()}
+
+
+async def load_country(country_name, fetch_missing=True):
+    """Returns a country's data from the database, fetching and storing it on a miss.
+
+    Concurrent misses for the same country share a single upstream fetch. Stale rows are served
+    while a background refresh runs; expired rows are refreshed first. Any spelling or ISO code of a
+    country is resolved to its canonical name first, so they all share one row.
+    """
+    country_name = await resolve_country_name(country_name)
+    stored = await _stored_country(country_name)
+    if stored:
+        return await _serve_stored(country_name, stored)
+    if not fetch_missing:
+        return None
+    return await _upstream_flights.do(normalize_country_key(country_name), lambda: _fetch_and_store(country_name))
+
+
+async def load_countries(country_names):
+    """Loads many countries at once: one query for the stored rows, concurrent fetches for the rest.
+
+    Returns a (countries, errors) pair of dicts keyed by the requested names.
+    """
+    requested = {name: await resolve_country_name(name) for name in country_names}
+    countries, errors = await _load_countries(list(dict.fromkeys(requested.values())))
+    return (
+        {name: countries[canonical] for name, canonical in requested.items() if canonical in countries},
+        {name: errors[canonical] for name, canonical in requested.items() if canonical in errors},
+    )
+
+
+async def _load_countries(country_names):
+    stored = await _stored_countries(country_names)
+    countries = {name: stored[name] for name in country_names if name in stored}
+    errors = {}
+
+    # Stale rows are refreshed behind the response; expired ones are fetched with the misses
+    expired = {}
+    for name in list(countries):
+        freshness = data_freshness(countries[name])
+        if freshness == 'stale':
+            schedule_refresh(name)
+        elif freshness == 'expired':
+            expired[name] = countries.pop(name)
+
+    missing = [name for name in country_names if name not in countries]
+    if not missing:
+        return countries, errors
+
+    semaphore = asyncio.Semaphore(UPSTREAM_MAX_WORKERS)
+
+    async def fetch(name):
+        async with semaphore:
+            return await _upstream_flights.do(normalize_country_key(name), lambda: fetch_economy_data(name))
+
+    results = await asyncio.gather(*(fetch(name) for name in missing), return_exceptions=True)
+    fetched = []
+    for name, data in zip(missing, results):
+        if isinstance(data, Exception):
+            logger.error(f"Error fetching data for {name}: {data}")
+            if name in expired:
+                countries[name] = expired[name]
+            else:
+                errors[name] = f"Failed to fetch country data: {data}"
+        elif data:
+            countries[name] = data
+            fetched.append(data)
+        elif name in expired:
+            countries[name] = expired[name]
+        else:
+            errors[name] = "Country not found"
+
+    await async_db_operations.store_country_records(fetched)
+    fetched_at = datetime.now(timezone.utc)
+    for data in fetched:
+        data['fetched_at'] = fetched_at
+    return countries, errors
+
+
+def get_loader_stats():
+    refresh = dict(_refresh_stats, in_progress=len(_refreshing))
+    return dict(_upstream_flights.stats(), refresh=refresh)
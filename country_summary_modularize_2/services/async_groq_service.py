@@ -0,0 +1,230 @@
+import os
+import time
+import asyncio
+import logging
+from groq import AsyncGroq, RateLimitError
+from services.groq_service import (
+    GROQ_MODEL, GROQ_TIMEOUT, GROQ_MAX_RETRIES, COUNTRY_SUMMARY_SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT,
+    MULTI_SUMMARY_SYSTEM_PROMPT, build_country_summary_prompt, split_sections, estimate_tokens
+)
+from utils.prompts import get_prompt_for_parameter, format_prompt, format_multi_aspect_prompt
+from utils.metrics import track, observe_stage
+from services.summary_cache import (
+    make_key, get_or_generate_async, get_summary_async, put_summary_async, get_fallback_summary
+)
+from services.breakers import groq_breaker
+from services.quotas import groq_quota
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limit import parse_retry_after
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Your API key
+GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+# One client per API key (see GROQ_API_KEYS in services/quotas.py)
+_async_groq_clients = {}
+
+
+def get_async_groq_client(api_key=None):
+    """Returns the AsyncGroq client for a key, building it on first use so importing needs no credentials."""
+    api_key = api_key or GROQ_API_KEY
+    client = _async_groq_clients.get(api_key)
+    if client is None:
+        client = AsyncGroq(api_key=api_key, timeout=GROQ_TIMEOUT, max_retries=GROQ_MAX_RETRIES)
+        _async_groq_clients[api_key] = client
+    return client
+
+
+async def create_completion(**options):
+    """Async counterpart of groq_service.create_completion; waiting for quota does not block the loop."""
+    groq_breaker.check()
+    reserved = estimate_tokens(options['messages'], options.get('max_tokens'))
+
+    async def attempt(api_key):
+        try:
+            response = await get_async_groq_client(api_key).chat.completions.create(**options)
+        except RateLimitError as e:
+            groq_quota.throttle(api_key, parse_retry_after(e.response.headers.get('retry-after')))
+            raise
+        usage = getattr(response, 'usage', None)
+        if usage is not None and usage.total_tokens:
+            groq_quota.settle(api_key, reserved, usage.total_tokens)
+        return response
+
+    def hedge():
+        hedge_key = groq_quota.try_acquire(reserved)
+        return None if hedge_key is None else (lambda: attempt(hedge_key))
+
+    api_key = await groq_quota.acquire_async(reserved)
+    return await groq_breaker.call_async(lambda: attempt(api_key), hedge=hedge)
+
+async def get_country_data_summary(country_data):
+    """Generates a summary for the specified country without blocking the event loop."""
+    if not country_data:
+        return None
+
+    prompt = build_country_summary_prompt(country_data)
+
+    async def generate():
+        try:
+            with track('groq.completion'):
+                response = await create_completion(
+                    messages=[
+                        {"role": "system", "content": COUNTRY_SUMMARY_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=200
+                )
+            return response.choices[0].message.content.strip()
+        except CircuitOpenError:
+            # Nothing was sent; callers answer with a fallback, a 503 or a retry after e.retry_after
+            raise
+        except Exception as e:
+            logger.error(f"Groq completion failed: {e}")
+            return None
+
+    key = make_key(country_data['country_name'], 'country_summary', prompt, GROQ_MODEL)
+    summary = await get_or_generate_async(key, generate)
+    if summary is None:
+        return None
+    return {"country": country_data['country_name'], "summary": summary}
+
+async def generate_summary(prompt, country_name=None, parameter='comprehensive'):
+    """Async counterpart of groq_service.generate_summary."""
+    async def generate():
+        try:
+            with track('groq.completion'):
+                chat_completion = await create_completion(
+                    messages=[
+                        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=500,
+                    temperature=0.7,
+                )
+            return chat_completion.choices[0].message.content.strip()
+        except CircuitOpenError:
+            # Nothing was sent; callers answer with a fallback, a 503 or a retry after e.retry_after
+            raise
+        except Exception as e:
+            logger.error(f"Groq completion failed: {e}")
+            return None
+
+    if country_name is None:
+        return await generate()
+    return await get_or_generate_async(make_key(country_name, parameter, prompt, GROQ_MODEL), generate)
+
+async def stream_completion(prompt, system_prompt, key=None, **options):
+    """Async counterpart of groq_service.stream_completion."""
+    if key is not None:
+        summary = await get_summary_async(key)
+        if summary is not None:
+            yield summary
+            return
+
+    parts = []
+    started = time.perf_counter()
+    first_token = None
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        groq_breaker.check()
+        api_key = await groq_quota.acquire_async(estimate_tokens(messages, options.get('max_tokens')))
+        groq_breaker.allow()
+    except CircuitOpenError:
+        fallback = await asyncio.to_thread(get_fallback_summary, key[0], key[1]) if key is not None else None
+        if fallback is None:
+            raise
+        yield fallback
+        return
+    failed = False
+    try:
+        with track('groq.stream'):
+            stream = await get_async_groq_client(api_key).chat.completions.create(
+                messages=messages,
+                model=GROQ_MODEL,
+                stream=True,
+                **options
+            )
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    if not parts:
+                        first_token = time.perf_counter() - started
+                        observe_stage('groq.first_token', first_token)
+                    parts.append(token)
+                    yield token
+    except RateLimitError as e:
+        failed = True
+        groq_quota.throttle(api_key, parse_retry_after(e.response.headers.get('retry-after')))
+        raise
+    except Exception:
+        failed = True
+        raise
+    finally:
+        groq_breaker.record(first_token if first_token is not None else time.perf_counter() - started, failed)
+
+    summary = "".join(parts).strip()
+    if key is not None and summary:
+        await put_summary_async(key, summary)
+
+def stream_country_data_summary(country_data):
+    """Streaming counterpart of get_country_data_summary."""
+    prompt = build_country_summary_prompt(country_data)
+    key = make_key(country_data['country_name'], 'country_summary', prompt, GROQ_MODEL)
+    return stream_completion(prompt, COUNTRY_SUMMARY_SYSTEM_PROMPT, key, max_tokens=200)
+
+def stream_summary(prompt, country_name, parameter='comprehensive'):
+    """Streaming counterpart of generate_summary."""
+    key = make_key(country_name, parameter, prompt, GROQ_MODEL)
+    return stream_completion(prompt, SUMMARY_SYSTEM_PROMPT, key, max_tokens=500, temperature=0.7)
+
+async def generate_summaries(country_name, data, parameters):
+    """Async counterpart of groq_service.generate_summaries; fallback calls run concurrently."""
+    prompts = {
+        parameter: format_prompt(get_prompt_for_parameter(parameter), country_name, data)
+        for parameter in parameters
+    }
+    keys = {parameter: make_key(country_name, parameter, prompts[parameter], GROQ_MODEL) for parameter in parameters}
+    summaries = {parameter: await get_summary_async(keys[parameter]) for parameter in parameters}
+    missing = [parameter for parameter in parameters if summaries[parameter] is None]
+
+    if len(missing) > 1:
+        multi_prompt = format_multi_aspect_prompt(missing, country_name, data)
+        try:
+            with track('groq.multi_completion'):
+                chat_completion = await create_completion(
+                    messages=[
+                        {"role": "system", "content": MULTI_SUMMARY_SYSTEM_PROMPT},
+                        {"role": "user", "content": multi_prompt}
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=500 * len(missing),
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                )
+            sections = split_sections(chat_completion.choices[0].message.content, missing)
+        except CircuitOpenError:
+            # The per-parameter fallback calls would be refused the same way
+            raise
+        except Exception as e:
+            logger.warning(f"Multi-aspect summary for {country_name} failed: {e}")
+            sections = None
+        if sections is None:
+            logger.warning(f"Falling back to per-parameter summaries for {country_name}")
+        else:
+            for parameter, summary in sections.items():
+                await put_summary_async(keys[parameter], summary)
+                summaries[parameter] = summary
+            missing = []
+
+    results = await asyncio.gather(*(
+        generate_summary(prompts[parameter], country_name=country_name, parameter=parameter) for parameter in missing
+    ))
+    summaries.update(zip(missing, results))
+    return summaries
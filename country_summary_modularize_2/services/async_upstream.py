@@ -0,0 +1,185 @@
+import time
+import random
+import asyncio
+import logging
+
+import httpx
+
+from services.upstream import (
+    API_NINJAS_BASE_URL, UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT, UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX, UPSTREAM_POOL_SIZE, RETRY_STATUSES, is_failed_response,
+    with_api_key
+)
+from services.services import parse_country_response
+from services.breakers import api_ninjas_breaker
+from services.quotas import api_ninjas_quota
+from services.negative_cache import is_known_missing_async, record_missing
+from services.country_names import country_names
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limit import QuotaExhaustedError
+from utils.metrics import track
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncUpstreamClient:
+    """httpx-based counterpart of UpstreamClient for the async serving mode."""
+
+    def __init__(self, base_url, connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT,
+                 max_retries=UPSTREAM_MAX_RETRIES, backoff_base=UPSTREAM_BACKOFF_BASE,
+                 backoff_max=UPSTREAM_BACKOFF_MAX, pool_size=UPSTREAM_POOL_SIZE, breaker=None, quota=None,
+                 auth_header=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.breaker = breaker
+        self.quota = quota
+        self.auth_header = auth_header
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = None
+        self._stats = {
+            'calls': 0,
+            'attempts': 0,
+            'retries': 0,
+            'errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'status_counts': {},
+        }
+
+    @property
+    def client(self):
+        # Created lazily so it binds to the event loop that serves requests
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, latency, status=None, error=False):
+        # Single-threaded event loop, no lock needed
+        self._stats['calls'] += 1
+        self._stats['latency_total'] += latency
+        self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+        if error:
+            self._stats['errors'] += 1
+        if status is not None:
+            key = str(status)
+            self._stats['status_counts'][key] = self._stats['status_counts'].get(key, 0) + 1
+
+    async def get(self, path, params=None, headers=None):
+        """Sends a GET, retrying 429/5xx responses and transport errors with jittered backoff.
+
+        With a breaker, raises CircuitOpenError at once while it is open, and may hedge a slow call.
+        With a quota, raises QuotaExhaustedError when no key has quota in time.
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        api_key = await self.quota.acquire_async() if self.quota is not None else None
+        if self.breaker is None:
+            return await self._get(path, params, headers, api_key)
+        return await self.breaker.call_async(
+            lambda: self._get(path, params, headers, api_key),
+            is_failure=is_failed_response,
+            hedge=lambda: self._hedge(path, params, headers),
+        )
+
+    def _hedge(self, path, params, headers):
+        """Returns the hedged second call, with its own quota, or None when no key has quota to spare now."""
+        if self.quota is None:
+            return lambda: self._get(path, params, headers, None)
+        api_key = self.quota.try_acquire()
+        if api_key is None:
+            return None
+        return lambda: self._get(path, params, headers, api_key)
+
+    async def _get(self, path, params, headers, api_key):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if attempt and self.quota is not None:
+                try:
+                    api_key = await self.quota.acquire_async()
+                except QuotaExhaustedError:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+            self._stats['attempts'] += 1
+            try:
+                response = await self.client.get(
+                    path, params=params, headers=with_api_key(headers, self.auth_header, api_key)
+                )
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+                logger.warning(f"Upstream call to {path} failed ({e}), retrying")
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, response.status_code,
+                                 error=response.status_code >= 400)
+                    return response
+                logger.warning(f"Upstream call to {path} returned {response.status_code}, retrying")
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                if response.status_code == 429 and self.quota is not None:
+                    self.quota.throttle(api_key, delay)
+                    delay = 0
+
+            self._stats['retries'] += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['status_counts'] = dict(self._stats['status_counts'])
+        stats['latency_avg'] = stats['latency_total'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async_api_ninjas = AsyncUpstreamClient(
+    API_NINJAS_BASE_URL, breaker=api_ninjas_breaker, quota=api_ninjas_quota, auth_header='X-Api-Key'
+)
+
+
+async def fetch_economy_data(country_name):
+    """Fetches country data including economic indicators from an external API.
+
+    Returns None on failure, but raises CircuitOpenError while API-Ninjas' breaker is open, or
+    QuotaExhaustedError (a subclass) when no API key has quota in time. Names API-Ninjas recently had
+    no data for return None without a call. API-Ninjas is asked by the names from country_names.fetch_names.
+    """
+    if await is_known_missing_async(country_name):
+        return None
+    try:
+        for fetch_name in country_names.fetch_names(country_name):
+            with track('upstream.api_ninjas'):
+                response = await async_api_ninjas.get('/v1/country', params={'name': fetch_name})
+                response.raise_for_status()
+            # Learning a new alias writes it to the database
+            country_data = await asyncio.to_thread(parse_country_response, country_name, response.json())
+            if country_data:
+                return country_data
+        logger.warning(f"No data returned for {country_name}")
+        await asyncio.to_thread(record_missing, country_name)
+    except CircuitOpenError:
+        raise
+    except httpx.HTTPError as e:
+        logger.error(f"Error fetching data for {country_name}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error fetching data for {country_name}: {str(e)}")
+
+    return None
@@ -0,0 +1,13 @@
+from utils.circuit_breaker import CircuitBreaker
+
+# One breaker per dependency, shared by the sync and async clients of this process.
+# Tuned with GROQ_BREAKER_* / API_NINJAS_BREAKER_*; GROQ_HEDGE=1 / API_NINJAS_HEDGE=1 turn on hedged requests.
+groq_breaker = CircuitBreaker.from_env('groq', 'GROQ', slow_call_seconds=20)
+api_ninjas_breaker = CircuitBreaker.from_env('api_ninjas', 'API_NINJAS', slow_call_seconds=5)
+
+BREAKERS = (groq_breaker, api_ninjas_breaker)
+
+
+def get_breaker_stats():
+    """Returns every breaker's state, window rates and counters, keyed by dependency."""
+    return {breaker.name: breaker.get_stats() for breaker in BREAKERS}
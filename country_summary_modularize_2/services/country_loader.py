@@ -0,0 +1,243 @@
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from models.db_operations import (
+    get_country_record, get_country_records, store_country_data, store_country_records, advisory_lock
+)
+from services.services import fetch_economy_data
+from services.country_snapshot import country_snapshot
+from services.country_names import canonical_country_name
+from utils.country_codes import country_key
+from utils.singleflight import SingleFlight
+from utils.rate_limit import background_priority
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Also serialise upstream fetches across worker processes through a Postgres advisory lock
+SINGLE_FLIGHT_ADVISORY_LOCK = os.getenv('SINGLE_FLIGHT_ADVISORY_LOCK', '0') == '1'
+# Upper bound on concurrent API-Ninjas calls made while filling a batch
+UPSTREAM_MAX_WORKERS = int(os.getenv('UPSTREAM_MAX_WORKERS', 8))
+# Rows older than the soft TTL are served as-is and refreshed in the background
+COUNTRY_SOFT_TTL = int(os.getenv('COUNTRY_SOFT_TTL', 24 * 3600))
+# Rows older than the hard TTL are refreshed before they are served
+COUNTRY_HARD_TTL = int(os.getenv('COUNTRY_HARD_TTL', 30 * 24 * 3600))
+# Upper bound on concurrent background refreshes
+REFRESH_MAX_WORKERS = int(os.getenv('REFRESH_MAX_WORKERS', 2))
+
+_upstream_flights = SingleFlight()
+_refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_MAX_WORKERS, thread_name_prefix='country-refresh')
+_refresh_lock = threading.Lock()
+_refreshing = set()
+_refresh_stats = {'scheduled': 0, 'skipped': 0, 'failed': 0, 'served_stale': 0, 'served_expired': 0}
+
+
+def normalize_country_key(country_name):
+    """Returns the key under which concurrent lookups of the same country are coalesced."""
+    return country_key(country_name)
+
+
+def data_age(country_data):
+    """Returns how many seconds ago a country's data was fetched, or None if unknown."""
+    fetched_at = country_data.get('fetched_at') if country_data else None
+    if fetched_at is None:
+        return None
+    return max(0.0, (datetime.now(timezone.utc) - fetched_at).total_seconds())
+
+
+def data_freshness(country_data):
+    """Classifies country data as 'fresh', 'stale' (past the soft TTL) or 'expired' (past the hard TTL)."""
+    age = data_age(country_data)
+    if age is None or age < COUNTRY_SOFT_TTL:
+        return 'fresh'
+    return 'stale' if age < COUNTRY_HARD_TTL else 'expired'
+
+
+def freshness_headers(country_data):
+    """Returns the Age / X-Data-Fetched-At / X-Data-Freshness headers for a country response."""
+    age = data_age(country_data)
+    if age is None:
+        return {}
+    return {
+        'Age': str(int(age)),
+        'X-Data-Fetched-At': country_data['fetched_at'].isoformat(),
+        'X-Data-Freshness': data_freshness(country_data),
+    }
+
+
+def _fetch_and_store(country_name):
+    fetched_data = fetch_economy_data(country_name)
+    if fetched_data:
+        store_country_data(fetched_data)
+        fetched_data['fetched_at'] = datetime.now(timezone.utc)
+    return fetched_data
+
+
+def _refresh(country_name, key):
+    try:
+        with background_priority():
+            refreshed = _upstream_flights.do(key, lambda: _fetch_and_store(country_name))
+        if not refreshed:
+            logger.warning(f"Background refresh of {country_name} returned no data")
+    except Exception as e:
+        with _refresh_lock:
+            _refresh_stats['failed'] += 1
+        logger.error(f"Background refresh of {country_name} failed: {e}")
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(key)
+
+
+def schedule_refresh(country_name):
+    """Refreshes a country from API-Ninjas in the background unless a refresh is already queued."""
+    key = normalize_country_key(country_name)
+    with _refresh_lock:
+        if key in _refreshing:
+            _refresh_stats['skipped'] += 1
+            return False
+        _refreshing.add(key)
+        _refresh_stats['scheduled'] += 1
+    _refresh_executor.submit(_refresh, country_name, key)
+    return True
+
+
+def _serve_stored(country_name, country_data):
+    """Applies stale-while-revalidate to a stored row; returns the data to serve."""
+    freshness = data_freshness(country_data)
+    if freshness == 'fresh':
+        return country_data
+    if freshness == 'stale':
+        with _refresh_lock:
+            _refresh_stats['served_stale'] += 1
+        schedule_refresh(country_name)
+        return country_data
+
+    # Past the hard TTL: block on a refresh, but fall back to the old row if the upstream is down
+    try:
+        refreshed = _upstream_flights.do(normalize_country_key(country_name), lambda: _fetch_and_store(country_name))
+    except Exception as e:
+        logger.error(f"Error refreshing expired data for {country_name}: {e}")
+        refreshed = None
+    if refreshed:
+        return refreshed
+    with _refresh_lock:
+        _refresh_stats['served_expired'] += 1
+    return country_data
+
+
+def get_stored_country(country_name):
+    """Returns a country's stored row as a dict, from the in-process snapshot once it is loaded."""
+    return _stored_country(canonical_country_name(country_name))
+
+
+def _stored_country(country_name):
+    if country_snapshot.loaded:
+        return country_snapshot.get(country_name)
+    record = get_country_record(country_name)
+    return record.to_dict() if record else None
+
+
+def _stored_countries(country_names):
+    if country_snapshot.loaded:
+        return country_snapshot.get_many(country_names)
+    return {name: record.to_dict() for name, record in get_country_records(country_names).items()}
+
+
+def _fetch_and_store_locked(country_name, key):
+    with advisory_lock(f"country_economy:{key}"):
+        # Another worker may have stored the row while we waited for the lock
+        record = get_country_record(country_name)
+        if record:
+            return record.to_dict()
+        return _fetch_and_store(country_name)
+
+
+def load_country(country_name, fetch_missing=True):
+    """Returns a country's data from the database, fetching and storing it on a miss.
+
+    Concurrent misses for the same country share a single upstream fetch. Stale rows are served
+    while a background refresh runs; expired rows are refreshed first. Any spelling or ISO code of a
+    country is resolved to its canonical name first, so they all share one row.
+    """
+    country_name = canonical_country_name(country_name)
+    stored = _stored_country(country_name)
+    if stored:
+        return _serve_stored(country_name, stored)
+    if not fetch_missing:
+        return None
+
+    key = normalize_country_key(country_name)
+    if SINGLE_FLIGHT_ADVISORY_LOCK:
+        return _upstream_flights.do(key, lambda: _fetch_and_store_locked(country_name, key))
+    return _upstream_flights.do(key, lambda: _fetch_and_store(country_name))
+
+
+def load_countries(country_names):
+    """Loads many countries at once: one query for the stored rows, parallel fetches for the rest.
+
+    Returns a (countries, errors) pair of dicts keyed by the requested names.
+    """
+    requested = {name: canonical_country_name(name) for name in country_names}
+    countries, errors = _load_countries(list(dict.fromkeys(requested.values())))
+    return (
+        {name: countries[canonical] for name, canonical in requested.items() if canonical in countries},
+        {name: errors[canonical] for name, canonical in requested.items() if canonical in errors},
+    )
+
+
+def _load_countries(country_names):
+    stored = _stored_countries(country_names)
+    countries = {name: stored[name] for name in country_names if name in stored}
+    errors = {}
+
+    # Stale rows are refreshed behind the response; expired ones are fetched with the misses
+    expired = {}
+    for name in list(countries):
+        freshness = data_freshness(countries[name])
+        if freshness == 'stale':
+            schedule_refresh(name)
+        elif freshness == 'expired':
+            expired[name] = countries.pop(name)
+
+    missing = [name for name in country_names if name not in countries]
+    if not missing:
+        return countries, errors
+
+    def fetch(name):
+        return _upstream_flights.do(normalize_country_key(name), lambda: fetch_economy_data(name))
+
+    fetched = []
+    with ThreadPoolExecutor(max_workers=min(UPSTREAM_MAX_WORKERS, len(missing))) as executor:
+        futures = {name: executor.submit(fetch, name) for name in missing}
+        for name, future in futures.items():
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching data for {name}: {e}")
+                data = None
+                if name not in expired:
+                    errors[name] = f"Failed to fetch country data: {e}"
+                    continue
+            if data:
+                countries[name] = data
+                fetched.append(data)
+            elif name in expired:
+                countries[name] = expired[name]
+            else:
+                errors[name] = "Country not found"
+
+    # Write every newly fetched country back in a single batch
+    store_country_records(fetched)
+    fetched_at = datetime.now(timezone.utc)
+    for data in fetched:
+        data['fetched_at'] = fetched_at
+    return countries, errors
+
+
+def get_loader_stats():
+    with _refresh_lock:
+        refresh = dict(_refresh_stats, in_progress=len(_refreshing))
+    return dict(_upstream_flights.stats(), refresh=refresh)
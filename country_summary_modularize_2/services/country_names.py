@@ -0,0 +1,127 @@
+import os
+import logging
+import threading
+
+from models.db_operations import get_country_alias, get_country_aliases, store_country_aliases
+from utils.country_codes import COUNTRIES, country_key, clean_country_name, seed_aliases
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Look up aliases learned by other workers in the country_alias table when this process has not seen a name
+COUNTRY_ALIAS_DB_LOOKUP = os.getenv('COUNTRY_ALIAS_DB_LOOKUP', '1') == '1'
+
+
+class CountryNameIndex:
+    """Maps whatever spelling a caller used ("india", " INDIA ", "IND", "IN") to one canonical country name.
+
+    Seeded with ISO codes and common names, and extended with the spellings, names and ISO codes
+    API-Ninjas answers with, which are persisted in country_alias so every worker shares them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aliases = seed_aliases()
+        self._seeded = len(self._aliases)
+        # Canonical name -> the name API-Ninjas answered with, which is what later fetches send
+        self._upstream_names = {}
+        self._seed_codes = {canonical: iso2 for canonical, iso2, *_ in COUNTRIES}
+        self.stats = {'hits': 0, 'db_hits': 0, 'misses': 0, 'learned': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def lookup(self, country_name):
+        """Returns the canonical name known to this process for `country_name`, or None."""
+        canonical = self._aliases.get(country_key(country_name))
+        if canonical is not None:
+            self._count('hits')
+        return canonical
+
+    def resolve(self, country_name):
+        """Returns the canonical name for `country_name`, checking the country_alias table on a miss, or None."""
+        canonical = self.lookup(country_name)
+        if canonical is not None:
+            return canonical
+        key = country_key(country_name)
+        if COUNTRY_ALIAS_DB_LOOKUP and key:
+            try:
+                canonical = get_country_alias(key)
+            except Exception as e:
+                logger.error(f"Country alias lookup failed for {country_name}: {e}")
+            if canonical is not None:
+                with self._lock:
+                    self._aliases[key] = canonical
+                self._count('db_hits')
+                return canonical
+        self._count('misses')
+        return None
+
+    def canonical_name(self, country_name):
+        """Returns the name `country_name` is stored under: its canonical name, or the trimmed request if unknown."""
+        return self.resolve(country_name) or clean_country_name(country_name)
+
+    def fetch_names(self, country_name):
+        """Returns the names to ask API-Ninjas for canonical `country_name`, best first.
+
+        Seeded spellings are ours, not API-Ninjas', so until it has answered for a country its ISO-2
+        code is tried before the seeded name; after that, the name it answered with is used.
+        """
+        upstream_name = self._upstream_names.get(country_name)
+        if upstream_name is not None:
+            return [upstream_name]
+        code = self._seed_codes.get(country_name)
+        return [code, country_name] if code else [country_name]
+
+    def learn(self, requested_name, upstream_name=None, iso2=None):
+        """Records what API-Ninjas answered for `requested_name`; returns the canonical name to store it under.
+
+        A name this index does not know yet takes API-Ninjas' spelling, and the requested spelling, that
+        spelling and the ISO-2 code all become aliases of it.
+        """
+        aliases = self._aliases
+        canonical = (
+            aliases.get(country_key(requested_name))
+            or (upstream_name and aliases.get(country_key(upstream_name)))
+            or clean_country_name(upstream_name or requested_name)
+        )
+        names = (requested_name, upstream_name, iso2, canonical)
+        with self._lock:
+            learned = {
+                key: canonical for key in (country_key(name) for name in names if name)
+                if key and key not in self._aliases
+            }
+            self._aliases.update(learned)
+            self.stats['learned'] += len(learned)
+            if upstream_name:
+                self._upstream_names[canonical] = clean_country_name(upstream_name)
+        if learned:
+            try:
+                store_country_aliases(learned)
+            except Exception as e:
+                logger.error(f"Could not store aliases for {canonical}: {e}")
+        return canonical
+
+    def load(self):
+        """Adds every alias stored in country_alias (learned by any worker) to this process's index."""
+        stored = get_country_aliases()
+        with self._lock:
+            for key, canonical in stored.items():
+                self._aliases.setdefault(key, canonical)
+        return len(stored)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            aliases = len(self._aliases)
+        stats.update(aliases=aliases, seeded=self._seeded)
+        return stats
+
+
+country_names = CountryNameIndex()
+
+
+def canonical_country_name(country_name):
+    """Returns the name a requested country is stored and fetched under."""
+    return country_names.canonical_name(country_name)
@@ -0,0 +1,269 @@
+import os
+import sys
+import math
+import time
+import logging
+import threading
+from array import array
+from datetime import datetime, timezone
+
+from models.country import COUNTRY_COLUMNS
+from models.db_operations import get_all_country_records, get_country_records, on_countries_stored
+from models.storage import get_storage
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Serve /country, /economy and /countries reads from the in-process snapshot instead of the database
+COUNTRY_SNAPSHOT_ENABLED = os.getenv('COUNTRY_SNAPSHOT_ENABLED', '1') == '1'
+# Full reload after this many seconds, in case a change notification was missed
+SNAPSHOT_RELOAD_INTERVAL = float(os.getenv('SNAPSHOT_RELOAD_INTERVAL', 300))
+
+INT_FIELDS = ('population', 'urban_population')
+TEXT_FIELDS = ('country_name', 'trade_balance_status')
+TIMESTAMP_FIELDS = ('fetched_at', 'updated_at')
+FLOAT_FIELDS = tuple(
+    column for column in COUNTRY_COLUMNS if column not in INT_FIELDS + TEXT_FIELDS + TIMESTAMP_FIELDS
+)
+
+# array('q') has no NULL, so a missing integer is stored as the smallest int64
+_MISSING_INT = -2 ** 63
+
+
+def _float(value):
+    return math.nan if value is None else float(value)
+
+
+def _int(value):
+    return _MISSING_INT if value is None else int(value)
+
+
+def _timestamp(value):
+    return math.nan if value is None else value.timestamp()
+
+
+class _Columns:
+    """One immutable generation of the snapshot: typed column arrays plus a name -> row index."""
+
+    __slots__ = ('names', 'index', 'floats', 'ints', 'statuses', 'timestamps')
+
+    def __init__(self, names, floats, ints, statuses, timestamps):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.floats = floats
+        self.ints = ints
+        self.statuses = statuses
+        self.timestamps = timestamps  # epoch seconds
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(
+            [record.country_name for record in records],
+            {field: array('d', (_float(getattr(record, field)) for record in records)) for field in FLOAT_FIELDS},
+            {field: array('q', (_int(getattr(record, field)) for record in records)) for field in INT_FIELDS},
+            [record.trade_balance_status for record in records],
+            {
+                field: array('d', (_timestamp(getattr(record, field)) for record in records))
+                for field in TIMESTAMP_FIELDS
+            },
+        )
+
+    def with_records(self, records):
+        """Returns a new generation with `records` applied; this one is left untouched for its readers."""
+        names = list(self.names)
+        floats = {field: array('d', values) for field, values in self.floats.items()}
+        ints = {field: array('q', values) for field, values in self.ints.items()}
+        statuses = list(self.statuses)
+        timestamps = {field: array('d', values) for field, values in self.timestamps.items()}
+        index = dict(self.index)
+        for record in records:
+            i = index.get(record.country_name)
+            if i is None:
+                i = index[record.country_name] = len(names)
+                names.append(record.country_name)
+                for field, values in floats.items():
+                    values.append(math.nan)
+                for field, values in ints.items():
+                    values.append(_MISSING_INT)
+                statuses.append(None)
+                for field, values in timestamps.items():
+                    values.append(math.nan)
+            for field, values in floats.items():
+                values[i] = _float(getattr(record, field))
+            for field, values in ints.items():
+                values[i] = _int(getattr(record, field))
+            statuses[i] = record.trade_balance_status
+            for field, values in timestamps.items():
+                values[i] = _timestamp(getattr(record, field))
+        return _Columns(names, floats, ints, statuses, timestamps)
+
+    def row(self, i):
+        """Rebuilds row `i` as a dict in COUNTRY_COLUMNS order, like CountryRecord.to_dict()."""
+        data = {}
+        for column in COUNTRY_COLUMNS:
+            if column == 'country_name':
+                data[column] = self.names[i]
+            elif column == 'trade_balance_status':
+                data[column] = self.statuses[i]
+            elif column in self.timestamps:
+                value = self.timestamps[column][i]
+                data[column] = None if math.isnan(value) else datetime.fromtimestamp(value, timezone.utc)
+            elif column in self.ints:
+                value = self.ints[column][i]
+                data[column] = None if value == _MISSING_INT else value
+            else:
+                value = self.floats[column][i]
+                data[column] = None if math.isnan(value) else value
+        return data
+
+    def memory_bytes(self):
+        """Approximate footprint: array buffers, the name strings and the containers holding them."""
+        arrays = list(self.floats.values()) + list(self.ints.values()) + list(self.timestamps.values())
+        size = sum(values.buffer_info()[1] * values.itemsize for values in arrays)
+        size += sum(sys.getsizeof(name) for name in self.names)
+        size += sys.getsizeof(self.names) + sys.getsizeof(self.statuses) + sys.getsizeof(self.index)
+        # Statuses are a handful of shared strings, counted once
+        size += sum(sys.getsizeof(status) for status in set(self.statuses) if status is not None)
+        return size
+
+
+class CountrySnapshot:
+    """Read-only in-process copy of country_economy, so country reads need no database round trip.
+
+    Writes in this process refresh the affected rows right away; writes from other workers arrive
+    through the storage backend's change notifications (Postgres LISTEN/NOTIFY), and a periodic full
+    reload covers anything missed. Every refresh builds a new generation and swaps it in, so readers
+    never see a half-applied batch.
+    """
+
+    def __init__(self, reload_interval=SNAPSHOT_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._columns = None
+        # One set per full load in progress, collecting the names changed while it reads the table
+        self._changed_during_loads = []
+        self._started = False
+        self._listening = False
+        self.stats = {
+            'full_loads': 0, 'incremental_updates': 0, 'notifications': 0, 'refresh_errors': 0, 'replayed': 0,
+            'last_full_load_ms': 0.0, 'last_incremental_ms': 0.0, 'loaded_at': None,
+        }
+
+    @property
+    def loaded(self):
+        return self._columns is not None
+
+    def load(self):
+        """Rebuilds the snapshot from the whole table.
+
+        Rows changed while the table is read may be missing from the result, so they are re-read and
+        applied once the new generation is swapped in.
+        """
+        started = time.perf_counter()
+        changed = set()
+        with self._lock:
+            self._changed_during_loads.append(changed)
+        try:
+            columns = _Columns.from_records(get_all_country_records())
+        except Exception:
+            with self._lock:
+                self._changed_during_loads.remove(changed)
+            raise
+        with self._lock:
+            # Stop collecting and swap in one step, so no refresh falls between the two
+            self._changed_during_loads.remove(changed)
+            self._columns = columns
+            self.stats['full_loads'] += 1
+            self.stats['last_full_load_ms'] = (time.perf_counter() - started) * 1000
+            self.stats['loaded_at'] = datetime.now(timezone.utc).isoformat()
+            self.stats['replayed'] += len(changed)
+        self.refresh(changed)
+
+    def refresh(self, country_names):
+        """Re-reads `country_names` in one query and applies them to the snapshot."""
+        if not country_names:
+            return
+        with self._lock:
+            for changed in self._changed_during_loads:
+                changed.update(country_names)
+        if self._columns is None:
+            return
+        started = time.perf_counter()
+        try:
+            records = list(get_country_records(list(country_names)).values())
+        except Exception as e:
+            with self._lock:
+                self.stats['refresh_errors'] += 1
+            logger.error(f"Snapshot refresh of {len(country_names)} countries failed: {e}")
+            return
+        with self._lock:
+            # Built under the lock so concurrent refreshes cannot drop each other's rows
+            self._columns = self._columns.with_records(records)
+            self.stats['incremental_updates'] += 1
+            self.stats['last_incremental_ms'] = (time.perf_counter() - started) * 1000
+
+    def _on_notification(self, country_names):
+        with self._lock:
+            self.stats['notifications'] += 1
+        self.refresh(country_names)
+
+    def _reload_periodically(self):
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.load()
+            except Exception as e:
+                with self._lock:
+                    self.stats['refresh_errors'] += 1
+                logger.error(f"Snapshot reload failed: {e}")
+
+    def preload(self):
+        """Loads the snapshot without starting any thread, so it can run before workers are forked."""
+        if not COUNTRY_SNAPSHOT_ENABLED:
+            return
+        try:
+            self.load()
+        except Exception as e:
+            # Reads fall back to the database until the periodic reload succeeds
+            logger.error(f"Initial snapshot load failed: {e}")
+
+    def start(self):
+        """Loads the snapshot (unless preloaded) and keeps it current; a no-op if disabled or already started."""
+        if not COUNTRY_SNAPSHOT_ENABLED or self._started:
+            return
+        self._started = True
+        if not self.loaded:
+            self.preload()
+        self._listening = get_storage().listen_changes(self._on_notification) is not None
+        threading.Thread(target=self._reload_periodically, name='country-snapshot-reload', daemon=True).start()
+
+    def get(self, country_name):
+        """Returns a country's stored row as a dict, or None if it is not in the snapshot."""
+        columns = self._columns
+        i = columns.index.get(country_name)
+        return columns.row(i) if i is not None else None
+
+    def get_many(self, country_names):
+        """Returns the stored rows among `country_names`, keyed by country name."""
+        columns = self._columns
+        return {name: columns.row(columns.index[name]) for name in country_names if name in columns.index}
+
+    def get_stats(self):
+        columns = self._columns
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(
+            enabled=COUNTRY_SNAPSHOT_ENABLED,
+            listening=self._listening,
+            countries=len(columns.names) if columns else 0,
+            memory_bytes=columns.memory_bytes() if columns else 0,
+        )
+        return stats
+
+
+country_snapshot = CountrySnapshot()
+
+
+@on_countries_stored
+def _refresh_countries(country_names):
+    country_snapshot.refresh(country_names)
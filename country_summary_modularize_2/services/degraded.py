@@ -0,0 +1,44 @@
+import math
+
+from services.breakers import groq_breaker
+from services.quotas import groq_quota
+from utils.circuit_breaker import CircuitOpenError, OPEN
+from utils.rate_limit import QuotaExhaustedError
+
+# Marks answers built from a previously stored summary instead of a fresh Groq call
+DEGRADED_HEADERS = {'X-Degraded': 'stale-summary', 'Cache-Control': 'no-store'}
+
+
+def upstream_unavailable(error):
+    """503 answer for a CircuitOpenError, as a (body, status, headers) tuple."""
+    retry_after = max(1, math.ceil(error.retry_after))
+    return (
+        {"error": f"Upstream unavailable: {error.name}", "retry_after": retry_after},
+        503,
+        {'Retry-After': str(retry_after)},
+    )
+
+
+def groq_unavailable():
+    """Returns the error that keeps Groq from being called right now (open breaker, no quota), or None."""
+    if groq_breaker.state == OPEN:
+        return CircuitOpenError(groq_breaker.name, groq_breaker.retry_after)
+    retry_after = groq_quota.retry_after()
+    if retry_after > 0:
+        return QuotaExhaustedError(groq_quota.name, retry_after)
+    return None
+
+
+def summary_failed(fallback, payload, unavailable=None):
+    """Answer for a summary Groq did not produce.
+
+    Serves `fallback` (the last stored summary) merged into `payload` and flagged as degraded. Without
+    one, answers 503 when the call was refused (`unavailable`, the CircuitOpenError it raised) or while
+    Groq's breaker is open or its quota is used up, and 500 otherwise.
+    """
+    if fallback:
+        return dict(payload, degraded=True), 200, DEGRADED_HEADERS
+    unavailable = unavailable or groq_unavailable()
+    if unavailable is not None:
+        return upstream_unavailable(unavailable)
+    return {"error": "Failed to generate summary"}, 500
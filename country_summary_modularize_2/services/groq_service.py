@@ -1,18 +1,94 @@
 import os
-from groq import Groq
-from utils.prompts import COUNTRY_SUMMARY_PROMPT
+import time
+import json
+import logging
+import threading
+from groq import Groq, RateLimitError
+from utils.prompts import COUNTRY_SUMMARY_PROMPT, get_prompt_for_parameter, format_prompt, format_multi_aspect_prompt
+from utils.metrics import track, timed, observe_stage
+from services.summary_cache import make_key, get_or_generate, get_summary, put_summary, get_fallback_summary
+from services.breakers import groq_breaker
+from services.quotas import groq_quota
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limit import parse_retry_after
 
+# Set up logging
+logger = logging.getLogger(__name__)
 
 # Your API key
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-groq_client = Groq(api_key=GROQ_API_KEY)
+GROQ_MODEL = os.getenv('GROQ_MODEL', 'mixtral-8x7b-32768')
+# Bounds every Groq call; the SDK's own default is a minute with two retries
+GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', 30))
+GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', 1))
+
+# One client per API key (see GROQ_API_KEYS in services/quotas.py)
+_groq_clients = {}
+_groq_client_lock = threading.Lock()
+
+
+def get_groq_client(api_key=None):
+    """Returns the process-wide Groq client for a key, building it on first use so importing needs no credentials."""
+    api_key = api_key or GROQ_API_KEY
+    client = _groq_clients.get(api_key)
+    if client is None:
+        with _groq_client_lock:
+            client = _groq_clients.get(api_key)
+            if client is None:
+                client = Groq(api_key=api_key, timeout=GROQ_TIMEOUT, max_retries=GROQ_MAX_RETRIES)
+                _groq_clients[api_key] = client
+    return client
+
+
+def reset_groq_client():
+    """Drops the clients so a forked worker builds its own instead of sharing the parent's sockets."""
+    _groq_clients.clear()
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough token count of a request (about 4 characters a token) plus its completion budget."""
+    return sum(len(message['content']) for message in messages) // 4 + (max_tokens or 0)
 
-def get_country_data_summary(country_data):
-    """Generates a summary for the specified country."""
-    if not country_data:
-        return None
 
-    prompt = COUNTRY_SUMMARY_PROMPT.format(
+def create_completion(**options):
+    """Calls Groq's chat completions once quota is granted, through its circuit breaker.
+
+    Raises CircuitOpenError while the breaker is open, and QuotaExhaustedError (a subclass) when no
+    API key has quota for the call in time.
+    """
+    groq_breaker.check()
+    reserved = estimate_tokens(options['messages'], options.get('max_tokens'))
+
+    def attempt(api_key):
+        # Each attempt (a hedge included) is throttled and settled against its own key
+        try:
+            response = get_groq_client(api_key).chat.completions.create(**options)
+        except RateLimitError as e:
+            groq_quota.throttle(api_key, parse_retry_after(e.response.headers.get('retry-after')))
+            raise
+        usage = getattr(response, 'usage', None)
+        if usage is not None and usage.total_tokens:
+            groq_quota.settle(api_key, reserved, usage.total_tokens)
+        return response
+
+    def hedge():
+        hedge_key = groq_quota.try_acquire(reserved)
+        return None if hedge_key is None else (lambda: attempt(hedge_key))
+
+    api_key = groq_quota.acquire(reserved)
+    return groq_breaker.call(lambda: attempt(api_key), hedge=hedge)
+
+COUNTRY_SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that generates concise country summaries based on provided data."
+SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that generates concise summaries based on economic data."
+MULTI_SUMMARY_SYSTEM_PROMPT = (
+    "You are a helpful assistant that generates concise summaries based on economic data. "
+    "You always answer with a single JSON object."
+)
+
+@timed('format_prompt')
+def build_country_summary_prompt(country_data):
+    """Fills COUNTRY_SUMMARY_PROMPT with a country's stored data."""
+    return COUNTRY_SUMMARY_PROMPT.format(
         country_name=country_data['country_name'],
         surface_area=country_data['surface_area'],
         exports=country_data['exports'],
@@ -21,44 +97,220 @@ def get_country_data_summary(country_data):
         population=country_data['population']
     )
 
-    try:
-        response = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that generates concise country summaries based on provided data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="mixtral-8x7b-32768",  # Updated model name
-            max_tokens=200
-        )
-
-        summary = response.choices[0].message.content.strip()
-        return {"country": country_data['country_name'], "summary": summary}
-    except Exception as e:
+def get_country_data_summary(country_data):
+    """Generates a summary for the specified country."""
+    if not country_data:
         return None
 
-def generate_summary(prompt):
+    prompt = build_country_summary_prompt(country_data)
+
+    def generate():
+        try:
+            with track('groq.completion'):
+                response = create_completion(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": COUNTRY_SUMMARY_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=200
+                )
+            return response.choices[0].message.content.strip()
+        except CircuitOpenError:
+            # Nothing was sent; callers answer with a fallback, a 503 or a retry after e.retry_after
+            raise
+        except Exception as e:
+            logger.error(f"Groq completion failed: {e}")
+            return None
+
+    key = make_key(country_data['country_name'], 'country_summary', prompt, GROQ_MODEL)
+    summary = get_or_generate(key, generate)
+    if summary is None:
+        return None
+    return {"country": country_data['country_name'], "summary": summary}
+
+def generate_summary(prompt, country_name=None, parameter='comprehensive'):
+    """Generates a summary for a formatted prompt, served from the summary cache when `country_name` is given.
+
+    Returns None when the completion fails, but raises CircuitOpenError (or QuotaExhaustedError) when Groq
+    could not be called at all.
+    """
+    def generate():
+        try:
+            with track('groq.completion'):
+                chat_completion = create_completion(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": SUMMARY_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=500,
+                    temperature=0.7,
+                )
+            return chat_completion.choices[0].message.content.strip()
+        except CircuitOpenError:
+            # Nothing was sent; callers answer with a fallback, a 503 or a retry after e.retry_after
+            raise
+        except Exception as e:
+            logger.error(f"Groq completion failed: {e}")
+            return None
+
+    if country_name is None:
+        return generate()
+    return get_or_generate(make_key(country_name, parameter, prompt, GROQ_MODEL), generate)
+
+def stream_completion(prompt, system_prompt, key=None, **options):
+    """Yields summary text chunks as Groq generates them, caching the completed text under `key`.
+
+    A cache hit is yielded as a single chunk without calling Groq. Errors propagate to the consumer,
+    which may already have sent some chunks. While Groq's breaker is open or no key has quota in time,
+    the last stored summary is yielded instead when there is one.
+    """
+    if key is not None:
+        summary = get_summary(key)
+        if summary is not None:
+            yield summary
+            return
+
+    parts = []
+    started = time.perf_counter()
+    first_token = None
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        groq_breaker.check()
+        api_key = groq_quota.acquire(estimate_tokens(messages, options.get('max_tokens')))
+        groq_breaker.allow()
+    except CircuitOpenError:
+        fallback = get_fallback_summary(key[0], key[1]) if key is not None else None
+        if fallback is None:
+            raise
+        # Degraded mode: the last stored summary, right away
+        yield fallback
+        return
+    failed = False
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that generates concise summaries based on economic data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="mixtral-8x7b-32768",  # Updated model name
-            max_tokens=500,
-            temperature=0.7,
-        )
-        return chat_completion.choices[0].message.content.strip()
-    except Exception as e:
+        with track('groq.stream'):
+            stream = get_groq_client(api_key).chat.completions.create(
+                messages=messages,
+                model=GROQ_MODEL,
+                stream=True,
+                **options
+            )
+            for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    if not parts:
+                        first_token = time.perf_counter() - started
+                        observe_stage('groq.first_token', first_token)
+                    parts.append(token)
+                    yield token
+    except RateLimitError as e:
+        failed = True
+        groq_quota.throttle(api_key, parse_retry_after(e.response.headers.get('retry-after')))
+        raise
+    except Exception:
+        failed = True
+        raise
+    finally:
+        # Time to first token is what the breaker judges a stream by; a client hanging up is not a failure
+        groq_breaker.record(first_token if first_token is not None else time.perf_counter() - started, failed)
+
+    summary = "".join(parts).strip()
+    if key is not None and summary:
+        put_summary(key, summary)
+
+def stream_country_data_summary(country_data):
+    """Streaming counterpart of get_country_data_summary."""
+    prompt = build_country_summary_prompt(country_data)
+    key = make_key(country_data['country_name'], 'country_summary', prompt, GROQ_MODEL)
+    return stream_completion(prompt, COUNTRY_SUMMARY_SYSTEM_PROMPT, key, max_tokens=200)
+
+def stream_summary(prompt, country_name, parameter='comprehensive'):
+    """Streaming counterpart of generate_summary."""
+    key = make_key(country_name, parameter, prompt, GROQ_MODEL)
+    return stream_completion(prompt, SUMMARY_SYSTEM_PROMPT, key, max_tokens=500, temperature=0.7)
+
+def split_sections(text, parameters):
+    """Parses a multi-aspect JSON response into {parameter: summary}, or None if any section is missing."""
+    if not text:
+        return None
+    # Tolerate prose or code fences around the object
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        sections = json.loads(text[start:end + 1])
+    except ValueError:
         return None
+    if not isinstance(sections, dict):
+        return None
+    summaries = {}
+    for parameter in parameters:
+        summary = sections.get(parameter)
+        if not isinstance(summary, str) or not summary.strip():
+            return None
+        summaries[parameter] = summary.strip()
+    return summaries
+
+def generate_summaries(country_name, data, parameters):
+    """Generates summaries for several parameters with one Groq call; returns {parameter: summary or None}.
+
+    Each summary is cached under the same key as its single-parameter request. If the combined response
+    cannot be split into sections, the missing parameters are generated one call at a time. Raises
+    CircuitOpenError while Groq's breaker is open or its quota is used up.
+    """
+    prompts = {
+        parameter: format_prompt(get_prompt_for_parameter(parameter), country_name, data)
+        for parameter in parameters
+    }
+    keys = {parameter: make_key(country_name, parameter, prompts[parameter], GROQ_MODEL) for parameter in parameters}
+    summaries = {parameter: get_summary(keys[parameter]) for parameter in parameters}
+    missing = [parameter for parameter in parameters if summaries[parameter] is None]
+
+    if len(missing) > 1:
+        multi_prompt = format_multi_aspect_prompt(missing, country_name, data)
+        try:
+            with track('groq.multi_completion'):
+                chat_completion = create_completion(
+                    messages=[
+                        {"role": "system", "content": MULTI_SUMMARY_SYSTEM_PROMPT},
+                        {"role": "user", "content": multi_prompt}
+                    ],
+                    model=GROQ_MODEL,
+                    max_tokens=500 * len(missing),
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                )
+            sections = split_sections(chat_completion.choices[0].message.content, missing)
+        except CircuitOpenError:
+            # The per-parameter fallback calls would be refused the same way
+            raise
+        except Exception as e:
+            logger.warning(f"Multi-aspect summary for {country_name} failed: {e}")
+            sections = None
+        if sections is None:
+            logger.warning(f"Falling back to per-parameter summaries for {country_name}")
+        else:
+            for parameter, summary in sections.items():
+                put_summary(keys[parameter], summary)
+                summaries[parameter] = summary
+            missing = []
+
+    for parameter in missing:
+        summaries[parameter] = generate_summary(prompts[parameter], country_name=country_name, parameter=parameter)
+    return summaries
@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from models.db_operations import get_all_country_records, get_country_records, on_countries_changed
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Full reload from the table after this many seconds, to pick up writes made by other workers
+METRICS_RELOAD_INTERVAL = float(os.getenv('METRICS_RELOAD_INTERVAL', 300))
+
+BASE_FIELDS = (
+    'surface_area', 'exports', 'tourists', 'gdp', 'population', 'imports',
+    'urban_population_growth', 'urban_population', 'gdp_growth', 'gdp_per_capita',
+)
+
+# Numeric metrics from utils.prompts.derive_metrics (trade_balance_status is a label, not a number)
+DERIVED_FIELDS = (
+    'urban_population_percentage', 'population_density', 'trade_to_gdp_ratio', 'trade_balance',
+    'exports_to_gdp_ratio', 'imports_to_gdp_ratio', 'trade_openness_index',
+)
+
+RANKABLE_METRICS = DERIVED_FIELDS + BASE_FIELDS
+
+
+def _finite(values):
+    # NULL inputs and zero divisors come out as 0, matching derive_metrics
+    values[~np.isfinite(values)] = 0.0
+    return values
+
+
+def _percent(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _finite(numerator / denominator * 100)
+
+
+def derive_metric_columns(columns):
+    """Vectorised derive_metrics: computes every derived metric for all rows of `columns` at once."""
+    exports, imports, gdp = columns['exports'], columns['imports'], columns['gdp']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        population_density = _finite(columns['population'] / columns['surface_area'])
+    trade_to_gdp_ratio = _percent(exports + imports, gdp)
+    return {
+        'urban_population_percentage': _percent(columns['urban_population'], columns['population']),
+        'population_density': population_density,
+        'trade_to_gdp_ratio': trade_to_gdp_ratio,
+        'trade_balance': _finite(exports - imports),
+        'exports_to_gdp_ratio': _percent(exports, gdp),
+        'imports_to_gdp_ratio': _percent(imports, gdp),
+        'trade_openness_index': trade_to_gdp_ratio.copy(),
+    }
+
+
+def _to_column(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class MetricsEngine:
+    """Column-array copy of country_economy with every derived metric precomputed for ranking."""
+
+    def __init__(self, reload_interval=METRICS_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._names = []
+        self._index = {}
+        self._columns = {}
+        self._loaded_at = None
+        self.stats = {'full_loads': 0, 'incremental_updates': 0, 'last_load_seconds': 0.0}
+
+    def load(self, records=None):
+        """Rebuilds every column from `records`, or from the whole table when omitted."""
+        started = time.perf_counter()
+        if records is None:
+            records = get_all_country_records()
+        names = [record.country_name for record in records]
+        columns = {field: _to_column([getattr(record, field) for record in records]) for field in BASE_FIELDS}
+        columns.update(derive_metric_columns(columns))
+        with self._lock:
+            self._names = names
+            self._index = {name: i for i, name in enumerate(names)}
+            self._columns = columns
+            self._loaded_at = time.monotonic()
+            self.stats['full_loads'] += 1
+            self.stats['last_load_seconds'] = time.perf_counter() - started
+
+    @property
+    def reload_due(self):
+        """True when the next read reloads the whole table first (nothing loaded yet, or past the interval)."""
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.reload_interval
+
+    def _ensure_loaded(self):
+        if self.reload_due:
+            self.load()
+
+    def update(self, records):
+        """Applies a batch of changed rows, recomputing only their metrics and copying each column once."""
+        if self._loaded_at is None or not records:
+            return  # nothing cached yet, the first request loads the full table
+        rows = {field: _to_column([getattr(record, field) for record in records]) for field in BASE_FIELDS}
+        rows.update(derive_metric_columns(rows))
+        with self._lock:
+            # Copy-on-write so readers holding the previous snapshot never see a half-updated batch
+            names = list(self._names)
+            index = dict(self._index)
+            positions = []
+            for record in records:
+                i = index.get(record.country_name)
+                if i is None:
+                    i = index[record.country_name] = len(names)
+                    names.append(record.country_name)
+                positions.append(i)
+            added = len(names) - len(self._names)
+            columns = {}
+            for field, values in self._columns.items():
+                values = np.concatenate((values, np.full(added, np.nan))) if added else values.copy()
+                values[positions] = rows[field]
+                columns[field] = values
+            self._names, self._index, self._columns = names, index, columns
+            self.stats['incremental_updates'] += 1
+
+    def _snapshot(self):
+        self._ensure_loaded()
+        with self._lock:
+            return self._names, self._index, self._columns
+
+    def rankings(self, metric, top=20, descending=True):
+        """Returns the `top` countries by `metric` with their value, rank and percentile."""
+        names, _, columns = self._snapshot()
+        values = columns[metric]
+        # Countries with no stored value for a base field are left out of its ranking
+        candidates = np.flatnonzero(np.isfinite(values))
+        ranked = values[candidates]
+        order = candidates[np.argsort(-ranked if descending else ranked, kind='stable')[:top]]
+        percentiles = _percentiles(values)
+        return [
+            {
+                'rank': rank,
+                'country_name': names[i],
+                'value': float(values[i]),
+                'percentile': float(percentiles[i]),
+            }
+            for rank, i in enumerate(order, start=1)
+        ]
+
+    def country_profile(self, country_name):
+        """Returns every metric for one country with its rank (1 = highest) and percentile, or None."""
+        names, index, columns = self._snapshot()
+        i = index.get(country_name)
+        if i is None:
+            return None
+        profile = {}
+        for metric in RANKABLE_METRICS:
+            values = columns[metric]
+            if not np.isfinite(values[i]):
+                profile[metric] = {'value': None, 'rank': None, 'percentile': None}
+                continue
+            profile[metric] = {
+                'value': float(values[i]),
+                'rank': int(np.count_nonzero(values > values[i])) + 1,
+                'percentile': float(_percentiles(values)[i]),
+            }
+        return {'country_name': country_name, 'countries': len(names), 'metrics': profile}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['countries'] = len(self._names)
+        return stats
+
+
+def _percentiles(values):
+    """Share of countries (0-100) whose value is less than or equal to each value, ignoring missing values."""
+    ordered = np.sort(values[np.isfinite(values)])
+    if not len(ordered):
+        return np.zeros(len(values))
+    return np.searchsorted(ordered, values, side='right') / len(ordered) * 100
+
+
+metrics_engine = MetricsEngine()
+
+
+@on_countries_changed
+def _refresh_countries(country_names):
+    # One query and one rebuild per stored batch, however many rows it changed
+    metrics_engine.update(list(get_country_records(country_names).values()))
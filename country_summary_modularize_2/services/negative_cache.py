@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+
+from utils.cache import TTLCache
+from utils.country_codes import country_key
+from utils.metrics import count_upstream_skipped
+from models.storage import STORAGE_ERRORS
+from models.db_operations import get_country_miss, store_country_miss, delete_country_misses, on_countries_stored
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Seconds a name API-Ninjas had no data for is answered with 404 without asking it again; 0 turns this off
+NEGATIVE_CACHE_TTL = float(os.getenv('NEGATIVE_CACHE_TTL', 6 * 3600))
+NEGATIVE_CACHE_SIZE = int(os.getenv('NEGATIVE_CACHE_SIZE', 10000))
+# Also keep entries in the country_not_found table, shared by every worker and kept across restarts
+NEGATIVE_CACHE_PERSIST = os.getenv('NEGATIVE_CACHE_PERSIST', '1') == '1'
+
+_memory = TTLCache(NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_TTL)
+_stats_lock = threading.Lock()
+_stats = {
+    'memory_hits': 0,
+    'db_hits': 0,
+    'misses': 0,
+    'recorded': 0,
+    'invalidated': 0,
+    'db_errors': 0,
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _hit(tier):
+    _count(f'{tier}_hits')
+    count_upstream_skipped('api_ninjas', tier)
+
+
+def _remember(key, expires_at):
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    if remaining > 0:
+        _memory.set(key, True, ttl=min(remaining, NEGATIVE_CACHE_TTL))
+
+
+def is_known_missing(country_name):
+    """Returns True if API-Ninjas recently had no data for `country_name`, so it need not be asked again."""
+    if not NEGATIVE_CACHE_TTL:
+        return False
+    key = country_key(country_name)
+    if _memory.get(key):
+        _hit('memory')
+        return True
+
+    if NEGATIVE_CACHE_PERSIST:
+        try:
+            expires_at = get_country_miss(key)
+        except STORAGE_ERRORS as e:
+            logger.warning(f"Negative cache lookup skipped: {e}")
+            _count('db_errors')
+            expires_at = None
+        if expires_at is not None:
+            _remember(key, expires_at)
+            _hit('db')
+            return True
+
+    _count('misses')
+    return False
+
+
+async def is_known_missing_async(country_name):
+    """Async counterpart of is_known_missing, reading the persistent tier through asyncpg."""
+    # Imported here so the sync serving mode does not need asyncpg installed
+    from models import async_db_operations
+
+    if not NEGATIVE_CACHE_TTL:
+        return False
+    key = country_key(country_name)
+    if _memory.get(key):
+        _hit('memory')
+        return True
+
+    if NEGATIVE_CACHE_PERSIST:
+        try:
+            expires_at = await async_db_operations.get_country_miss(key)
+        except Exception as e:
+            logger.warning(f"Negative cache lookup skipped: {e}")
+            _count('db_errors')
+            expires_at = None
+        if expires_at is not None:
+            _remember(key, expires_at)
+            _hit('db')
+            return True
+
+    _count('misses')
+    return False
+
+
+def record_missing(country_name):
+    """Remembers that API-Ninjas answered with no data for `country_name`."""
+    if not NEGATIVE_CACHE_TTL:
+        return
+    key = country_key(country_name)
+    _memory.set(key, True)
+    _count('recorded')
+    if NEGATIVE_CACHE_PERSIST:
+        try:
+            store_country_miss(key, country_name, NEGATIVE_CACHE_TTL)
+        except STORAGE_ERRORS as e:
+            logger.warning(f"Negative cache store skipped: {e}")
+            _count('db_errors')
+
+
+@on_countries_stored
+def _forget_stored(country_names):
+    # A name that now has a row (an ingest, or another route) is no longer missing. The stored entry goes
+    # too: /fetch-and-store and background refreshes ask the cache without reading the row first.
+    if not NEGATIVE_CACHE_TTL:
+        return
+    keys = list(dict.fromkeys(country_key(name) for name in country_names))
+    removed = sum(_memory.delete(key) for key in keys)
+    if removed:
+        _count('invalidated', removed)
+    if NEGATIVE_CACHE_PERSIST:
+        try:
+            delete_country_misses(keys)
+        except STORAGE_ERRORS as e:
+            logger.warning(f"Negative cache invalidation skipped: {e}")
+            _count('db_errors')
+
+
+def get_negative_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['upstream_calls_saved'] = stats['memory_hits'] + stats['db_hits']
+    stats.update(enabled=bool(NEGATIVE_CACHE_TTL), persist=NEGATIVE_CACHE_PERSIST, memory=_memory.stats())
+    return stats
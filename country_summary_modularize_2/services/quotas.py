@@ -0,0 +1,27 @@
+import os
+
+from utils.rate_limit import QuotaScheduler
+
+
+def _api_keys(list_variable, single_variable):
+    """Keys from a comma-separated `list_variable`, falling back to the single-key variable."""
+    value = os.getenv(list_variable) or os.getenv(single_variable) or ''
+    return [key.strip() for key in value.split(',') if key.strip()]
+
+
+# Calls are spread round-robin over every configured key, each with its own quota
+GROQ_API_KEYS = _api_keys('GROQ_API_KEYS', 'GROQ_API_KEY')
+API_NINJAS_API_KEYS = _api_keys('API_NINJAS_API_KEYS', 'YOUR_API_KEY')
+
+# One scheduler per provider, shared by the sync and async clients of this process.
+# Limits are per key, tuned with GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE / API_NINJAS_REQUESTS_PER_MINUTE,
+# and split over QUOTA_PROCESSES processes since each one keeps its own buckets.
+groq_quota = QuotaScheduler.from_env('groq', 'GROQ', GROQ_API_KEYS, requests_per_minute=30, tokens_per_minute=6000)
+api_ninjas_quota = QuotaScheduler.from_env('api_ninjas', 'API_NINJAS', API_NINJAS_API_KEYS, requests_per_minute=60)
+
+QUOTAS = (groq_quota, api_ninjas_quota)
+
+
+def get_quota_stats():
+    """Returns every provider's queue depth, wait times and this process's per-key quota, keyed by provider."""
+    return {quota.name: quota.get_stats() for quota in QUOTAS}
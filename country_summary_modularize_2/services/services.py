@@ -1,42 +1,59 @@
-import os
 import requests
 import logging
+from services.upstream import api_ninjas
+from utils.metrics import track
+from utils.circuit_breaker import CircuitOpenError
+from services.country_names import country_names
+from services.negative_cache import is_known_missing, record_missing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Your API key
-API_KEY = os.getenv('YOUR_API_KEY')
+def parse_country_response(country_name, data):
+    """Maps an API-Ninjas /v1/country payload onto our country_economy fields, or None if it is empty.
+
+    The row is named by the country name index, which learns the name and ISO code API-Ninjas answered with.
+    """
+    if data and isinstance(data, list) and len(data) > 0:
+        data = data[0]
+        return {
+            'country_name': country_names.learn(country_name, data.get('name'), data.get('iso2')),
+            'imports': data.get('imports', 0),
+            'urban_population_growth': data.get('urban_population_growth', 0),
+            'exports': data.get('exports', 0),
+            'population': data.get('population', 0),
+            'urban_population': data.get('urban_population', 0),
+            'gdp': data.get('gdp', 0),
+            'gdp_growth': data.get('gdp_growth', 0),
+            'gdp_per_capita': data.get('gdp_per_capita', 0),
+            'surface_area': data.get('surface_area', 0),
+            'tourists': data.get('tourists', 0)
+        }
+    return None
 
 def fetch_economy_data(country_name):
-    """Fetches country data including economic indicators from an external API."""
-    api_url = f"https://api.api-ninjas.com/v1/country?name={country_name}"
-    
+    """Fetches country data including economic indicators from an external API.
+
+    Returns None on failure, but raises CircuitOpenError while API-Ninjas' breaker is open, or
+    QuotaExhaustedError (a subclass) when no API key has quota in time. Names API-Ninjas recently had
+    no data for return None without a call. API-Ninjas is asked by the names from country_names.fetch_names.
+    """
+    if is_known_missing(country_name):
+        return None
     try:
-        response = requests.get(api_url, headers={'X-Api-Key': API_KEY})
-        response.raise_for_status()
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data and isinstance(data, list) and len(data) > 0:
-                data = data[0]
-                return {
-                    'country_name': country_name,
-                    'imports': data.get('imports', 0),
-                    'urban_population_growth': data.get('urban_population_growth', 0),
-                    'exports': data.get('exports', 0),
-                    'population': data.get('population', 0),
-                    'urban_population': data.get('urban_population', 0),
-                    'gdp': data.get('gdp', 0),
-                    'gdp_growth': data.get('gdp_growth', 0),
-                    'gdp_per_capita': data.get('gdp_per_capita', 0),
-                    'surface_area': data.get('surface_area', 0),
-                    'tourists': data.get('tourists', 0)
-                }
-            else:
-                logger.warning(f"No data returned for {country_name}")
-                return None
+        for fetch_name in country_names.fetch_names(country_name):
+            with track('upstream.api_ninjas'):
+                response = api_ninjas.get('/v1/country', params={'name': fetch_name})
+                response.raise_for_status()
+
+            country_data = parse_country_response(country_name, response.json())
+            if country_data:
+                return country_data
+        logger.warning(f"No data returned for {country_name}")
+        record_missing(country_name)
+    except CircuitOpenError:
+        raise
     except requests.RequestException as e:
         logger.error(f"Error fetching data for {country_name}: {str(e)}")
     except Exception as e:
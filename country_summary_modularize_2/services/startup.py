@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import click
+
+from models.storage import get_storage, setup_storage, STORAGE_BACKEND
+from services.country_snapshot import country_snapshot
+from services.metrics_engine import metrics_engine
+from services.country_names import country_names
+from services.groq_service import get_groq_client, reset_groq_client
+from services.summary_jobs import start_workers as start_job_workers
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Run schema setup when the app is created; turn off when a release step runs `flask --app app setup-storage`
+SETUP_STORAGE = os.getenv('SETUP_STORAGE', '1') == '1'
+# Warm caches in the server's master process and fork workers from it (see gunicorn.conf.py)
+APP_PRELOAD = os.getenv('APP_PRELOAD', '0') == '1'
+
+_stats_lock = threading.Lock()
+_startup_stats = {'pid': os.getpid(), 'mode': None, 'stages': {}, 'cold_start_seconds': None}
+
+
+@contextmanager
+def startup_stage(name):
+    """Times one startup stage and records it under `name` in the startup stats."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _stats_lock:
+            _startup_stats['stages'][name] = round(time.perf_counter() - started, 4)
+
+
+def running_cli_command():
+    """Returns True while a `flask` CLI command other than `run` (e.g. setup-storage) is loading the app.
+
+    Such commands only need the app object, not warm caches, job workers or listener threads.
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name != 'run'
+
+
+def run_schema_setup():
+    """Creates the storage backend's tables; run once per deployment, not once per worker."""
+    with startup_stage('schema_setup'):
+        setup_storage()
+
+
+def warm_caches():
+    """Fills the in-memory caches every worker serves from; safe to run before forking (no threads)."""
+    with startup_stage('warm_caches'):
+        country_snapshot.preload()
+        try:
+            country_names.load()
+        except Exception as e:
+            logger.error(f"Could not load stored country aliases: {e}")
+        try:
+            metrics_engine.load()
+        except Exception as e:
+            logger.error(f"Could not preload the rankings engine: {e}")
+        try:
+            # Only builds the client object; no connection is opened until the first completion
+            get_groq_client()
+        except Exception as e:
+            logger.warning(f"Groq client not configured, summary routes will fail: {e}")
+
+
+def prepare_fork():
+    """Closes this process's connections so forked workers never share a socket with their parent."""
+    with startup_stage('prepare_fork'):
+        get_storage().close()
+        reset_groq_client()
+
+
+def start_worker():
+    """Opens this worker's connections and starts its background threads, before it takes traffic."""
+    started = time.perf_counter()
+    with startup_stage('worker_warm_up'):
+        try:
+            get_storage().warm_up()
+        except Exception as e:
+            # Requests open connections on demand, so a slow database only delays the first of them
+            logger.error(f"Could not warm up {STORAGE_BACKEND} connections: {e}")
+        country_snapshot.start()
+        start_job_workers()
+    with _stats_lock:
+        _startup_stats['pid'] = os.getpid()
+        _startup_stats['worker_ready_seconds'] = round(time.perf_counter() - started, 4)
+
+
+def record_cold_start(mode, started):
+    """Records the time from `started` (perf_counter at the top of the entry module) until the app was built."""
+    seconds = time.perf_counter() - started
+    with _stats_lock:
+        _startup_stats['mode'] = mode
+        _startup_stats['cold_start_seconds'] = round(seconds, 4)
+    logger.info(f"App ready in {seconds:.3f}s ({mode} mode)")
+
+
+def get_startup_stats():
+    with _stats_lock:
+        return dict(_startup_stats, stages=dict(_startup_stats['stages']))
@@ -0,0 +1,184 @@
+import os
+import hashlib
+import logging
+import threading
+
+from utils.cache import TTLCache
+from models.storage import STORAGE_ERRORS
+from models.db_operations import get_stored_summary, get_latest_summary, store_summary, on_country_changed
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 1024))
+SUMMARY_CACHE_TTL = float(os.getenv('SUMMARY_CACHE_TTL', 3600))  # seconds an entry stays in memory
+SUMMARY_CACHE_PERSIST = os.getenv('SUMMARY_CACHE_PERSIST', '1') == '1'
+# Last summary served per (country, parameter), kept through invalidations for the degraded mode
+FALLBACK_SUMMARY_SIZE = int(os.getenv('FALLBACK_SUMMARY_SIZE', 4096))
+FALLBACK_SUMMARY_TTL = float(os.getenv('FALLBACK_SUMMARY_TTL', 7 * 24 * 3600))
+
+_memory = TTLCache(SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL)
+_last_good = TTLCache(FALLBACK_SUMMARY_SIZE, FALLBACK_SUMMARY_TTL)
+_stats_lock = threading.Lock()
+_stats = {
+    'memory_hits': 0,
+    'db_hits': 0,
+    'misses': 0,
+    'stores': 0,
+    'invalidations': 0,
+    'db_errors': 0,
+    'fallbacks': 0,
+}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def make_key(country_name, parameter, prompt, model):
+    """Builds the cache key: country, parameter, a hash of the formatted prompt and the model."""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return (country_name, parameter, prompt_hash, model)
+
+
+def _remember(key, summary):
+    _last_good.set(key[:2], summary)
+
+
+def get_summary(key):
+    """Looks a summary up in memory, then in the storage backend; returns None on a miss."""
+    summary = _memory.get(key)
+    if summary is not None:
+        _count('memory_hits')
+        _remember(key, summary)
+        return summary
+
+    if SUMMARY_CACHE_PERSIST:
+        try:
+            summary = get_stored_summary(*key)
+        except STORAGE_ERRORS as e:
+            # The cache must never take the summary routes down with it
+            logger.warning(f"Summary cache lookup skipped: {e}")
+            _count('db_errors')
+        if summary is not None:
+            _memory.set(key, summary)
+            _remember(key, summary)
+            _count('db_hits')
+            return summary
+
+    _count('misses')
+    return None
+
+
+def put_summary(key, summary):
+    """Stores a freshly generated summary in both cache tiers."""
+    _memory.set(key, summary)
+    _remember(key, summary)
+    _count('stores')
+    if SUMMARY_CACHE_PERSIST:
+        try:
+            store_summary(*key, summary)
+        except STORAGE_ERRORS as e:
+            logger.warning(f"Summary cache store skipped: {e}")
+            _count('db_errors')
+
+
+def get_or_generate(key, generate):
+    """Returns the cached summary for `key`, calling `generate()` and caching its result on a miss."""
+    summary = get_summary(key)
+    if summary is not None:
+        return summary
+    summary = generate()
+    if summary:
+        put_summary(key, summary)
+    return summary
+
+
+async def get_summary_async(key):
+    """Async counterpart of get_summary, reading the persistent tier through asyncpg."""
+    # Imported here so the sync serving mode does not need asyncpg installed
+    from models import async_db_operations
+
+    summary = _memory.get(key)
+    if summary is not None:
+        _count('memory_hits')
+        _remember(key, summary)
+        return summary
+
+    if SUMMARY_CACHE_PERSIST:
+        try:
+            summary = await async_db_operations.get_stored_summary(*key)
+        except Exception as e:
+            logger.warning(f"Summary cache lookup skipped: {e}")
+            _count('db_errors')
+        if summary is not None:
+            _memory.set(key, summary)
+            _remember(key, summary)
+            _count('db_hits')
+            return summary
+
+    _count('misses')
+    return None
+
+
+async def put_summary_async(key, summary):
+    """Async counterpart of put_summary."""
+    from models import async_db_operations
+
+    _memory.set(key, summary)
+    _remember(key, summary)
+    _count('stores')
+    if SUMMARY_CACHE_PERSIST:
+        try:
+            await async_db_operations.store_summary(*key, summary)
+        except Exception as e:
+            logger.warning(f"Summary cache store skipped: {e}")
+            _count('db_errors')
+
+
+async def get_or_generate_async(key, generate):
+    """Async counterpart of get_or_generate; `generate` is a coroutine function."""
+    summary = await get_summary_async(key)
+    if summary is not None:
+        return summary
+    summary = await generate()
+    if summary:
+        await put_summary_async(key, summary)
+    return summary
+
+
+def get_fallback_summary(country_name, parameter):
+    """Returns the last summary seen for a country and parameter, whatever data, prompt or model produced it.
+
+    Used when Groq is unavailable; None if this process never served one and none is stored.
+    """
+    summary = _last_good.get((country_name, parameter))
+    if summary is None and SUMMARY_CACHE_PERSIST:
+        try:
+            summary = get_latest_summary(country_name, parameter)
+        except STORAGE_ERRORS as e:
+            logger.warning(f"Fallback summary lookup skipped: {e}")
+            _count('db_errors')
+    if summary is not None:
+        _count('fallbacks')
+    return summary
+
+
+@on_country_changed
+def invalidate_country(country_name):
+    """Drops every in-memory summary for a country; store_country_data clears the table rows."""
+    removed = _memory.delete_where(lambda key: key[0] == country_name)
+    _count('invalidations')
+    return removed
+
+
+def get_cache_stats():
+    """Returns hit/miss counters for both tiers plus the in-memory LRU's occupancy."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_ratio'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+    stats['memory'] = _memory.stats()
+    stats['fallback_entries'] = len(_last_good)
+    return stats
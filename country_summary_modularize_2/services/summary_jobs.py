@@ -0,0 +1,329 @@
+"""Summary job queue: POST /summaries enqueues a generation, workers run it, GET /summaries/<id> reports it.
+
+Jobs live in the storage backend's summary_job table, so they survive restarts; with Postgres, workers on
+any node claim them with FOR UPDATE SKIP LOCKED. Each web process runs SUMMARY_JOB_WORKERS worker
+threads; dedicated worker processes can run instead (set SUMMARY_JOB_WORKERS=0 on the web tier):
+    python -m services.summary_jobs --processes 4 --threads 2
+"""
+import os
+import hmac
+import json
+import time
+import uuid
+import signal
+import socket
+import hashlib
+import ipaddress
+import argparse
+import logging
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+
+import requests
+
+from models import db_operations
+from models.storage import get_storage
+from models.summary_job import SummaryJob, SUCCEEDED, FAILED, CALLBACK_DELIVERED, CALLBACK_FAILED
+from services.country_loader import load_country
+from services.groq_service import generate_summary, generate_summaries
+from utils.prompts import SUMMARY_PARAMETERS, get_prompt_for_parameter, get_comprehensive_prompt, format_prompt
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limit import background_priority
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Worker threads in each web process (started by services.startup.start_worker)
+SUMMARY_JOB_WORKERS = int(os.getenv('SUMMARY_JOB_WORKERS', 1))
+# Seconds an idle worker waits before checking the queue again; jobs enqueued by this process wake it at once
+SUMMARY_JOB_POLL_INTERVAL = float(os.getenv('SUMMARY_JOB_POLL_INTERVAL', 1))
+# A job whose worker has not finished it within the lease (it crashed or was killed) is claimed again
+SUMMARY_JOB_LEASE_SECONDS = float(os.getenv('SUMMARY_JOB_LEASE_SECONDS', 300))
+SUMMARY_JOB_MAX_ATTEMPTS = int(os.getenv('SUMMARY_JOB_MAX_ATTEMPTS', 3))
+SUMMARY_JOB_RETRY_DELAY = float(os.getenv('SUMMARY_JOB_RETRY_DELAY', 5))  # seconds, doubled per attempt
+SUMMARY_JOB_CALLBACK_TIMEOUT = float(os.getenv('SUMMARY_JOB_CALLBACK_TIMEOUT', 5))
+SUMMARY_JOB_CALLBACK_ATTEMPTS = int(os.getenv('SUMMARY_JOB_CALLBACK_ATTEMPTS', 3))
+# When set, webhook bodies are signed with HMAC-SHA256 in an X-Signature header
+SUMMARY_JOB_CALLBACK_SECRET = os.getenv('SUMMARY_JOB_CALLBACK_SECRET')
+# Comma-separated hosts callbacks may go to; when unset, any host resolving only to public addresses is allowed
+SUMMARY_JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv('SUMMARY_JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()
+}
+
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+_callbacks = requests.Session()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'claimed': 0, 'succeeded': 0, 'failed': 0, 'retried': 0, 'callbacks_delivered': 0, 'callbacks_failed': 0,
+}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def parse_job_request(body):
+    """Validates a POST /summaries body; returns (country_name, parameters, callback_url) or raises ValueError.
+
+    Takes `parameters` (a list, like ?parameters= on /country-parameter-summary) or a single `parameter`,
+    which falls back to the comprehensive summary like ?parameter= does.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    country_name = body.get('country')
+    if not isinstance(country_name, str) or not country_name.strip():
+        raise ValueError("'country' is required")
+
+    parameters = body.get('parameters')
+    if parameters is None:
+        parameter = str(body.get('parameter') or '').lower()
+        parameters = [parameter if parameter in SUMMARY_PARAMETERS else 'comprehensive']
+    else:
+        if not isinstance(parameters, list) or not parameters or not all(isinstance(name, str) for name in parameters):
+            raise ValueError("'parameters' must be a non-empty list of names")
+        parameters = list(dict.fromkeys(name.strip().lower() for name in parameters))
+        unknown = [name for name in parameters if name not in SUMMARY_PARAMETERS]
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+
+    callback_url = body.get('callback_url')
+    if callback_url is not None:
+        check_callback_url(callback_url)
+    return country_name.strip(), parameters, callback_url
+
+
+def check_callback_url(callback_url):
+    """Raises ValueError unless `callback_url` is an http(s) URL the server may POST to.
+
+    With SUMMARY_JOB_CALLBACK_ALLOWED_HOSTS set, the host must be listed. Otherwise every address it
+    resolves to must be public: loopback, private, link-local (cloud metadata) and reserved ranges
+    are refused, so a job cannot make the server call into its own network.
+    """
+    parsed = urlparse(callback_url) if isinstance(callback_url, str) else None
+    if parsed is None or parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("'callback_url' must be an http or https URL")
+    host = parsed.hostname.lower()
+    if SUMMARY_JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in SUMMARY_JOB_CALLBACK_ALLOWED_HOSTS:
+            raise ValueError(f"'callback_url' host {host} is not allowed")
+        return
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"'callback_url' host {host} cannot be resolved: {e}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ValueError(f"'callback_url' host {host} resolves to a non-public address")
+
+
+def submit_job(country_name, parameters, callback_url=None):
+    """Enqueues a summary job and returns its id."""
+    job = SummaryJob(id=uuid.uuid4().hex, country_name=country_name, parameters=parameters, callback_url=callback_url)
+    db_operations.enqueue_job(job)
+    _wake.set()
+    return job.id
+
+
+def get_job(job_id):
+    """Returns a SummaryJob by id, or None."""
+    return db_operations.get_job(job_id)
+
+
+def generate_job_summaries(job):
+    """Runs format_prompt + generation for a job; returns {parameter: summary or None}, or None for an unknown country."""
+    country_data = load_country(job.country_name)
+    if not country_data:
+        return None
+    if len(job.parameters) > 1:
+        return generate_summaries(country_data['country_name'], country_data, job.parameters)
+
+    parameter = job.parameters[0]
+    prompt = get_comprehensive_prompt() if parameter == 'comprehensive' else get_prompt_for_parameter(parameter)
+    formatted_prompt = format_prompt(prompt, country_data['country_name'], country_data)
+    return {parameter: generate_summary(formatted_prompt, country_name=country_data['country_name'], parameter=parameter)}
+
+
+def _retry_or_fail(job, error, delay=None):
+    if job.attempts >= SUMMARY_JOB_MAX_ATTEMPTS:
+        _finish(job, FAILED, error=f"{error} (gave up after {job.attempts} attempts)")
+        return
+    delay = delay if delay else SUMMARY_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+    logger.warning(f"Summary job {job.id} failed ({error}), retrying in {delay:.0f}s")
+    db_operations.retry_job(job.id, job.attempts, delay, error)
+    _count('retried')
+
+
+def _finish(job, status, result=None, error=None):
+    db_operations.finish_job(job.id, job.attempts, status, result, error)
+    _count('succeeded' if status == SUCCEEDED else 'failed')
+    if job.callback_url:
+        finished = db_operations.get_job(job.id)
+        # Skip the webhook if another worker re-claimed the job after our lease ran out
+        if finished is not None and finished.attempts == job.attempts and finished.status == status:
+            deliver_callback(finished)
+
+
+def run_job(job):
+    """Generates a claimed job's summaries and records the outcome; transient failures are retried."""
+    _count('claimed')
+    if job.attempts > SUMMARY_JOB_MAX_ATTEMPTS:
+        # Its earlier workers died mid-job, so the lease ran out each time
+        _finish(job, FAILED, error=f"Gave up after {job.attempts - 1} attempts")
+        return
+    try:
+        # Queued work waits behind interactive requests for upstream quota
+        with background_priority():
+            summaries = generate_job_summaries(job)
+    except CircuitOpenError as e:
+        _retry_or_fail(job, str(e), e.retry_after)
+        return
+    except Exception as e:
+        logger.error(f"Summary job {job.id} raised: {e}")
+        _retry_or_fail(job, f"Error processing request: {e}")
+        return
+
+    if summaries is None:
+        _finish(job, FAILED, error="Country data not found")
+        return
+    failed = [name for name, summary in summaries.items() if not summary]
+    if failed:
+        _retry_or_fail(job, f"Failed to generate summary for: {', '.join(failed)}")
+        return
+    _finish(job, SUCCEEDED, result=summaries)
+
+
+def deliver_callback(job):
+    """POSTs a finished job to its callback_url, retrying connection errors, 429s and 5xx responses."""
+    try:
+        # Checked again at delivery: the host may resolve elsewhere now than when the job was submitted
+        check_callback_url(job.callback_url)
+    except ValueError as e:
+        logger.warning(f"Callback for summary job {job.id} refused: {e}")
+        db_operations.set_job_callback_status(job.id, CALLBACK_FAILED)
+        _count('callbacks_failed')
+        return False
+    body = json.dumps(job.to_dict())
+    headers = {'Content-Type': 'application/json', 'X-Summary-Job-Id': job.id}
+    if SUMMARY_JOB_CALLBACK_SECRET:
+        digest = hmac.new(SUMMARY_JOB_CALLBACK_SECRET.encode('utf-8'), body.encode('utf-8'), hashlib.sha256)
+        headers['X-Signature'] = f"sha256={digest.hexdigest()}"
+
+    for attempt in range(SUMMARY_JOB_CALLBACK_ATTEMPTS):
+        if attempt:
+            time.sleep(2 ** (attempt - 1))
+        try:
+            response = _callbacks.post(job.callback_url, data=body, headers=headers,
+                                       timeout=SUMMARY_JOB_CALLBACK_TIMEOUT, allow_redirects=False)
+        except requests.RequestException as e:
+            logger.warning(f"Callback for summary job {job.id} failed: {e}")
+            continue
+        response.close()
+        if response.status_code < 300:
+            db_operations.set_job_callback_status(job.id, CALLBACK_DELIVERED)
+            _count('callbacks_delivered')
+            return True
+        logger.warning(f"Callback for summary job {job.id} returned {response.status_code}")
+        if response.status_code < 500 and response.status_code != 429:
+            break
+    db_operations.set_job_callback_status(job.id, CALLBACK_FAILED)
+    _count('callbacks_failed')
+    return False
+
+
+def work():
+    """Claims and runs jobs until stop_workers() is called."""
+    while not _stop.is_set():
+        try:
+            job = db_operations.claim_job(SUMMARY_JOB_LEASE_SECONDS)
+            if job is not None:
+                run_job(job)
+                continue
+        except Exception as e:
+            logger.error(f"Summary job worker error: {e}")
+        _wake.wait(SUMMARY_JOB_POLL_INTERVAL)
+        _wake.clear()
+
+
+def start_workers(count=SUMMARY_JOB_WORKERS):
+    """Starts `count` worker threads in this process, once."""
+    with _workers_lock:
+        if _workers:
+            return
+        _stop.clear()
+        for index in range(count):
+            thread = threading.Thread(target=work, name=f'summary-job-{index}', daemon=True)
+            thread.start()
+            _workers.append(thread)
+
+
+def stop_workers(timeout=None):
+    """Stops the worker threads after their current job."""
+    _stop.set()
+    _wake.set()
+    with _workers_lock:
+        for thread in _workers:
+            thread.join(timeout)
+        _workers.clear()
+
+
+def get_job_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    with _workers_lock:
+        stats['workers'] = sum(thread.is_alive() for thread in _workers)
+    stats['jobs'] = db_operations.count_jobs()
+    return stats
+
+
+def _serve(threads):
+    """Runs one dedicated worker process until SIGTERM or SIGINT."""
+    signal.signal(signal.SIGTERM, lambda *_: _stop.set())
+    signal.signal(signal.SIGINT, lambda *_: _stop.set())
+    get_storage().warm_up()
+    start_workers(threads)
+    logger.info(f"Summary job worker {os.getpid()} running {threads} threads")
+    while not _stop.wait(1):
+        pass
+    # Let running jobs finish; anything cut short is re-claimed once its lease runs out
+    stop_workers()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run summary job workers for the queue behind POST /summaries.")
+    parser.add_argument('--processes', type=int, default=int(os.getenv('SUMMARY_JOB_PROCESSES', 2)),
+                        help="Worker processes")
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SUMMARY_JOB_THREADS', 2)),
+                        help="Worker threads per process")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        _serve(args.threads)
+        return 0
+    # Forked before any connection is opened, so every process opens its own
+    processes = [
+        multiprocessing.Process(target=_serve, args=(args.threads,), name=f'summary-jobs-{index}')
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: [process.terminate() for process in processes])
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The children got the same SIGINT and are finishing their jobs
+        for process in processes:
+            process.join()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
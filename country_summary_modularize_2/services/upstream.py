@@ -0,0 +1,175 @@
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.breakers import api_ninjas_breaker
+from services.quotas import api_ninjas_quota
+from utils.rate_limit import QuotaExhaustedError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+API_NINJAS_BASE_URL = os.getenv('API_NINJAS_BASE_URL', 'https://api.api-ninjas.com')
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 10))
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 3))
+UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', 0.25))  # seconds
+UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', 8))  # seconds
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 20))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_failed_response(response):
+    """Responses that count against the circuit breaker: rate limiting and server errors."""
+    return response.status_code in RETRY_STATUSES
+
+
+def with_api_key(headers, auth_header, api_key):
+    """Adds the key the quota scheduler picked to a request's headers."""
+    if auth_header is None or api_key is None:
+        return headers
+    return dict(headers or {}, **{auth_header: api_key})
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client with timeouts, jittered retries and per-call latency stats."""
+
+    def __init__(self, base_url, connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT,
+                 max_retries=UPSTREAM_MAX_RETRIES, backoff_base=UPSTREAM_BACKOFF_BASE,
+                 backoff_max=UPSTREAM_BACKOFF_MAX, pool_size=UPSTREAM_POOL_SIZE, breaker=None, quota=None,
+                 auth_header=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker
+        # With a quota, every attempt waits for a key from the scheduler and sends it in `auth_header`
+        self.quota = quota
+        self.auth_header = auth_header
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        # Retries are handled in get() so they can be jittered and counted
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'attempts': 0,
+            'retries': 0,
+            'errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'status_counts': {},
+        }
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: a random delay up to the exponential ceiling
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, latency, status=None, error=False):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['latency_total'] += latency
+            self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            if error:
+                self._stats['errors'] += 1
+            if status is not None:
+                key = str(status)
+                self._stats['status_counts'][key] = self._stats['status_counts'].get(key, 0) + 1
+
+    def get(self, path, params=None, headers=None):
+        """Sends a GET, retrying 429/5xx responses and connection failures with jittered backoff.
+
+        Returns the final response (which may still be an error status) or raises the last
+        requests.RequestException once the retries are used up. With a breaker, raises
+        CircuitOpenError at once while it is open, and may hedge a slow call. With a quota, raises
+        QuotaExhaustedError when no key has quota in time; waiting for quota does not count as call latency.
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        api_key = self.quota.acquire() if self.quota is not None else None
+        if self.breaker is None:
+            return self._get(path, params, headers, api_key)
+        return self.breaker.call(
+            lambda: self._get(path, params, headers, api_key),
+            is_failure=is_failed_response,
+            hedge=lambda: self._hedge(path, params, headers),
+            discard=lambda response: response.close(),
+        )
+
+    def _hedge(self, path, params, headers):
+        """Returns the hedged second call, with its own quota, or None when no key has quota to spare now."""
+        if self.quota is None:
+            return lambda: self._get(path, params, headers, None)
+        api_key = self.quota.try_acquire()
+        if api_key is None:
+            return None
+        return lambda: self._get(path, params, headers, api_key)
+
+    def _get(self, path, params, headers, api_key):
+        url = f"{self.base_url}{path}"
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if attempt and self.quota is not None:
+                # A retry is another request against the quota, possibly on another key
+                try:
+                    api_key = self.quota.acquire()
+                except QuotaExhaustedError:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+            with self._lock:
+                self._stats['attempts'] += 1
+            try:
+                response = self.session.get(
+                    url, params=params, headers=with_api_key(headers, self.auth_header, api_key), timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+                logger.warning(f"Upstream call to {path} failed ({e}), retrying")
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, response.status_code,
+                                 error=response.status_code >= 400)
+                    return response
+                logger.warning(f"Upstream call to {path} returned {response.status_code}, retrying")
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                if response.status_code == 429 and self.quota is not None:
+                    # The scheduler holds this key back, so the retry waits for quota instead of sleeping
+                    self.quota.throttle(api_key, delay)
+                    delay = 0
+                response.close()
+
+            with self._lock:
+                self._stats['retries'] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['status_counts'] = dict(self._stats['status_counts'])
+        stats['latency_avg'] = stats['latency_total'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+api_ninjas = UpstreamClient(
+    API_NINJAS_BASE_URL, breaker=api_ninjas_breaker, quota=api_ninjas_quota, auth_header='X-Api-Key'
+)
@@ -0,0 +1,314 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from functools import partial
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Outcomes kept per breaker, and how many are needed before it may trip
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', 20))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))
+# Share of slow calls in the window that trips a breaker
+BREAKER_SLOW_CALL_RATE = float(os.getenv('BREAKER_SLOW_CALL_RATE', 0.5))
+# Never hedge sooner than this, however fast the dependency usually is
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 0.05))
+HEDGE_MAX_WORKERS = int(os.getenv('HEDGE_MAX_WORKERS', 16))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='hedge')
+# One slot per executor thread: work is only handed to the executor when a thread is free, never queued
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_WORKERS)
+
+
+def _submit_to_free_thread(fn):
+    """Starts `fn()` on a free hedge thread in a copy of the caller's context, or returns None if all are busy.
+
+    Queueing would count the wait as dependency latency and, once the hedge deadline passed, add a
+    second queued call exactly when the process is saturated.
+    """
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    return _start_in_slot(fn)
+
+
+def _start_in_slot(fn):
+    # The caller holds a slot, released when `fn` finishes
+    run = contextvars.copy_context().run
+
+    def attempt():
+        try:
+            return run(fn)
+        finally:
+            _hedge_slots.release()
+
+    try:
+        return _hedge_executor.submit(attempt)
+    except BaseException:
+        _hedge_slots.release()
+        raise
+
+
+def _discard_result(discard, future):
+    # Hands a losing hedge's result to `discard` (e.g. to close a response) once it finishes
+    if not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name, retry_after, reason='circuit open'):
+        super().__init__(f"{name} is unavailable ({reason}, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Circuit breaker over a sliding window of a dependency's recent calls.
+
+    The breaker opens when the share of failed calls reaches `failure_rate`, or the share of calls slower
+    than `slow_call_seconds` reaches BREAKER_SLOW_CALL_RATE. While open, calls fail at once with
+    CircuitOpenError. After `open_seconds` one probe call is let through (half-open); it closes the
+    breaker on success and reopens it on failure. The latencies of successful calls give the p95 used
+    as the hedging deadline.
+    """
+
+    def __init__(self, name, failure_rate=0.5, slow_call_seconds=10.0, open_seconds=30.0, hedge=False):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)  # (failed, slow) per call
+        self._latencies = deque(maxlen=200)
+        self._stats = {
+            'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0, 'hedged': 0, 'hedges_skipped': 0,
+        }
+
+    @classmethod
+    def from_env(cls, name, prefix, slow_call_seconds):
+        """Builds a breaker configured through `<prefix>_BREAKER_*` and `<prefix>_HEDGE` variables."""
+        return cls(
+            name,
+            failure_rate=float(os.getenv(f'{prefix}_BREAKER_FAILURE_RATE', 0.5)),
+            slow_call_seconds=float(os.getenv(f'{prefix}_BREAKER_SLOW_CALL_SECONDS', slow_call_seconds)),
+            open_seconds=float(os.getenv(f'{prefix}_BREAKER_OPEN_SECONDS', 30)),
+            hedge=os.getenv(f'{prefix}_HEDGE', '0') == '1',
+        )
+
+    def _retry_after(self):
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def check(self):
+        """Raises CircuitOpenError while the breaker is open, without taking a half-open probe slot."""
+        with self._lock:
+            if self._state == OPEN and self._retry_after() > 0:
+                raise CircuitOpenError(self.name, self._retry_after())
+
+    def allow(self):
+        """Admits a call or raises CircuitOpenError."""
+        with self._lock:
+            if self._state == OPEN:
+                if self._retry_after() > 0:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(self.name, self._retry_after())
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._probing = True
+
+    def record(self, latency, failed):
+        """Records the outcome of an admitted call and moves the breaker between states."""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += failed
+            self._stats['slow_calls'] += slow
+            if not failed:
+                self._latencies.append(latency)
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open()
+                else:
+                    logger.info(f"Circuit for {self.name} closed")
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((failed, slow))
+            if self._state == CLOSED and len(self._outcomes) >= BREAKER_MIN_CALLS:
+                failures = sum(outcome[0] for outcome in self._outcomes) / len(self._outcomes)
+                slow_calls = sum(outcome[1] for outcome in self._outcomes) / len(self._outcomes)
+                if failures >= self.failure_rate or slow_calls >= BREAKER_SLOW_CALL_RATE:
+                    self._open()
+
+    def _release(self):
+        """Frees a half-open probe slot without recording an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        logger.warning(f"Circuit for {self.name} opened for {self.open_seconds:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats['opened'] += 1
+
+    def hedge_delay(self):
+        """Returns the p95 latency of recent successful calls, or None until there are enough of them."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < BREAKER_MIN_CALLS:
+            return None
+        return max(HEDGE_MIN_DELAY, latencies[math.ceil(0.95 * len(latencies)) - 1])
+
+    @property
+    def retry_after(self):
+        """Seconds until an open breaker lets a probe call through; 0 when it is not open."""
+        with self._lock:
+            return self._retry_after() if self._state == OPEN else 0.0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._retry_after() <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def _hedge_skipped(self):
+        with self._lock:
+            self._stats['hedges_skipped'] += 1
+
+    def call(self, fn, is_failure=None, hedge=None, discard=None):
+        """Runs `fn()` through the breaker, with a hedged second call after the p95 when hedging is on.
+
+        `is_failure(result)` marks results that count as failures without raising (e.g. 5xx responses).
+        `hedge()` returns the function for the second call, or None to skip it (e.g. when it would get no
+        quota); without it `fn` is called again. `discard(result)` releases the result of the losing call.
+        """
+        self.allow()
+        started = time.perf_counter()
+        try:
+            delay = self.hedge_delay() if self.hedge else None
+            result = fn() if delay is None else self._hedged(fn, delay, hedge, discard)
+        except Exception:
+            self.record(time.perf_counter() - started, True)
+            raise
+        except BaseException:
+            self._release()
+            raise
+        self.record(time.perf_counter() - started, bool(is_failure and is_failure(result)))
+        return result
+
+    def _hedged(self, fn, delay, hedge, discard):
+        # Each attempt runs in a copy of the caller's context so stage metrics keep their route label
+        first = _submit_to_free_thread(fn)
+        if first is None:
+            # Every hedge thread is busy: call on this thread, without a hedge
+            self._hedge_skipped()
+            return fn()
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        # A thread is held before hedge() takes quota for the second call, so that quota is never wasted
+        if not _hedge_slots.acquire(blocking=False):
+            self._hedge_skipped()
+            return first.result()
+        try:
+            second_fn = hedge() if hedge is not None else fn
+        except BaseException:
+            _hedge_slots.release()
+            raise
+        if second_fn is None:
+            _hedge_slots.release()
+            self._hedge_skipped()
+            return first.result()
+        second = _start_in_slot(second_fn)
+        with self._lock:
+            self._stats['hedged'] += 1
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+            if succeeded or not pending:
+                winner = succeeded[0] if succeeded else done.pop()
+                for loser in (pending | done) - {winner}:
+                    # The slower attempt cannot be interrupted once running; its result is released when it ends
+                    loser.cancel()
+                    if discard is not None:
+                        loser.add_done_callback(partial(_discard_result, discard))
+                return winner.result()
+
+    async def call_async(self, fn, is_failure=None, hedge=None, discard=None):
+        """Async counterpart of call(); `fn` is a coroutine function and the losing hedge is cancelled."""
+        self.allow()
+        started = time.perf_counter()
+        try:
+            delay = self.hedge_delay() if self.hedge else None
+            result = await fn() if delay is None else await self._hedged_async(fn, delay, hedge, discard)
+        except Exception:
+            self.record(time.perf_counter() - started, True)
+            raise
+        except BaseException:
+            # Cancelled by the caller, which says nothing about the dependency
+            self._release()
+            raise
+        self.record(time.perf_counter() - started, bool(is_failure and is_failure(result)))
+        return result
+
+    async def _hedged_async(self, fn, delay, hedge, discard):
+        first = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            return first.result()
+        second_fn = hedge() if hedge is not None else fn
+        if second_fn is None:
+            self._hedge_skipped()
+            return await first
+        with self._lock:
+            self._stats['hedged'] += 1
+        pending = {first, asyncio.ensure_future(second_fn())}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded or not pending:
+                    winner = succeeded[0] if succeeded else done.pop()
+                    if discard is not None:
+                        for task in succeeded[1:]:
+                            discard(task.result())
+                    return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self):
+        state = self.state
+        retry_after = self.retry_after
+        with self._lock:
+            stats = dict(self._stats)
+            outcomes = list(self._outcomes)
+        stats.update(
+            state=state,
+            retry_after=round(retry_after, 1),
+            window_failure_rate=sum(outcome[0] for outcome in outcomes) / len(outcomes) if outcomes else 0.0,
+            window_slow_call_rate=sum(outcome[1] for outcome in outcomes) / len(outcomes) if outcomes else 0.0,
+            p95_seconds=self.hedge_delay(),
+            hedge=self.hedge,
+            failure_rate_threshold=self.failure_rate,
+            slow_call_seconds=self.slow_call_seconds,
+        )
+        return stats
@@ -0,0 +1,229 @@
+import re
+import unicodedata
+
+# (canonical name, ISO 3166-1 alpha-2, alpha-3, other common names)
+COUNTRIES = (
+    ("Afghanistan", "AF", "AFG"),
+    ("Albania", "AL", "ALB"),
+    ("Algeria", "DZ", "DZA"),
+    ("Andorra", "AD", "AND"),
+    ("Angola", "AO", "AGO"),
+    ("Antigua and Barbuda", "AG", "ATG", "Antigua"),
+    ("Argentina", "AR", "ARG"),
+    ("Armenia", "AM", "ARM"),
+    ("Australia", "AU", "AUS"),
+    ("Austria", "AT", "AUT"),
+    ("Azerbaijan", "AZ", "AZE"),
+    ("Bahamas", "BS", "BHS", "The Bahamas"),
+    ("Bahrain", "BH", "BHR"),
+    ("Bangladesh", "BD", "BGD"),
+    ("Barbados", "BB", "BRB"),
+    ("Belarus", "BY", "BLR"),
+    ("Belgium", "BE", "BEL"),
+    ("Belize", "BZ", "BLZ"),
+    ("Benin", "BJ", "BEN"),
+    ("Bhutan", "BT", "BTN"),
+    ("Bolivia", "BO", "BOL"),
+    ("Bosnia and Herzegovina", "BA", "BIH", "Bosnia"),
+    ("Botswana", "BW", "BWA"),
+    ("Brazil", "BR", "BRA", "Brasil"),
+    ("Brunei", "BN", "BRN", "Brunei Darussalam"),
+    ("Bulgaria", "BG", "BGR"),
+    ("Burkina Faso", "BF", "BFA"),
+    ("Burundi", "BI", "BDI"),
+    ("Cabo Verde", "CV", "CPV", "Cape Verde"),
+    ("Cambodia", "KH", "KHM"),
+    ("Cameroon", "CM", "CMR"),
+    ("Canada", "CA", "CAN"),
+    ("Central African Republic", "CF", "CAF"),
+    ("Chad", "TD", "TCD"),
+    ("Chile", "CL", "CHL"),
+    ("China", "CN", "CHN", "People's Republic of China", "PRC"),
+    ("Colombia", "CO", "COL"),
+    ("Comoros", "KM", "COM"),
+    ("Congo", "CG", "COG", "Republic of the Congo", "Congo-Brazzaville"),
+    ("Costa Rica", "CR", "CRI"),
+    ("Cote d'Ivoire", "CI", "CIV", "Ivory Coast"),
+    ("Croatia", "HR", "HRV"),
+    ("Cuba", "CU", "CUB"),
+    ("Cyprus", "CY", "CYP"),
+    ("Czech Republic", "CZ", "CZE", "Czechia"),
+    ("Democratic Republic of the Congo", "CD", "COD", "DR Congo", "DRC", "Congo-Kinshasa"),
+    ("Denmark", "DK", "DNK"),
+    ("Djibouti", "DJ", "DJI"),
+    ("Dominica", "DM", "DMA"),
+    ("Dominican Republic", "DO", "DOM"),
+    ("Ecuador", "EC", "ECU"),
+    ("Egypt", "EG", "EGY"),
+    ("El Salvador", "SV", "SLV"),
+    ("Equatorial Guinea", "GQ", "GNQ"),
+    ("Eritrea", "ER", "ERI"),
+    ("Estonia", "EE", "EST"),
+    ("Eswatini", "SZ", "SWZ", "Swaziland"),
+    ("Ethiopia", "ET", "ETH"),
+    ("Fiji", "FJ", "FJI"),
+    ("Finland", "FI", "FIN"),
+    ("France", "FR", "FRA"),
+    ("Gabon", "GA", "GAB"),
+    ("Gambia", "GM", "GMB", "The Gambia"),
+    ("Georgia", "GE", "GEO"),
+    ("Germany", "DE", "DEU", "Deutschland"),
+    ("Ghana", "GH", "GHA"),
+    ("Greece", "GR", "GRC", "Hellas"),
+    ("Grenada", "GD", "GRD"),
+    ("Guatemala", "GT", "GTM"),
+    ("Guinea", "GN", "GIN"),
+    ("Guinea-Bissau", "GW", "GNB"),
+    ("Guyana", "GY", "GUY"),
+    ("Haiti", "HT", "HTI"),
+    ("Honduras", "HN", "HND"),
+    ("Hong Kong", "HK", "HKG"),
+    ("Hungary", "HU", "HUN"),
+    ("Iceland", "IS", "ISL"),
+    ("India", "IN", "IND", "Bharat"),
+    ("Indonesia", "ID", "IDN"),
+    ("Iran", "IR", "IRN", "Persia"),
+    ("Iraq", "IQ", "IRQ"),
+    ("Ireland", "IE", "IRL", "Eire"),
+    ("Israel", "IL", "ISR"),
+    ("Italy", "IT", "ITA", "Italia"),
+    ("Jamaica", "JM", "JAM"),
+    ("Japan", "JP", "JPN", "Nippon"),
+    ("Jordan", "JO", "JOR"),
+    ("Kazakhstan", "KZ", "KAZ"),
+    ("Kenya", "KE", "KEN"),
+    ("Kiribati", "KI", "KIR"),
+    ("Kosovo", "XK", "XKX"),
+    ("Kuwait", "KW", "KWT"),
+    ("Kyrgyzstan", "KG", "KGZ"),
+    ("Laos", "LA", "LAO"),
+    ("Latvia", "LV", "LVA"),
+    ("Lebanon", "LB", "LBN"),
+    ("Lesotho", "LS", "LSO"),
+    ("Liberia", "LR", "LBR"),
+    ("Libya", "LY", "LBY"),
+    ("Liechtenstein", "LI", "LIE"),
+    ("Lithuania", "LT", "LTU"),
+    ("Luxembourg", "LU", "LUX"),
+    ("Macao", "MO", "MAC", "Macau"),
+    ("Madagascar", "MG", "MDG"),
+    ("Malawi", "MW", "MWI"),
+    ("Malaysia", "MY", "MYS"),
+    ("Maldives", "MV", "MDV"),
+    ("Mali", "ML", "MLI"),
+    ("Malta", "MT", "MLT"),
+    ("Marshall Islands", "MH", "MHL"),
+    ("Mauritania", "MR", "MRT"),
+    ("Mauritius", "MU", "MUS"),
+    ("Mexico", "MX", "MEX"),
+    ("Micronesia", "FM", "FSM"),
+    ("Moldova", "MD", "MDA"),
+    ("Monaco", "MC", "MCO"),
+    ("Mongolia", "MN", "MNG"),
+    ("Montenegro", "ME", "MNE"),
+    ("Morocco", "MA", "MAR"),
+    ("Mozambique", "MZ", "MOZ"),
+    ("Myanmar", "MM", "MMR", "Burma"),
+    ("Namibia", "NA", "NAM"),
+    ("Nauru", "NR", "NRU"),
+    ("Nepal", "NP", "NPL"),
+    ("Netherlands", "NL", "NLD", "Holland", "The Netherlands"),
+    ("New Zealand", "NZ", "NZL"),
+    ("Nicaragua", "NI", "NIC"),
+    ("Niger", "NE", "NER"),
+    ("Nigeria", "NG", "NGA"),
+    ("North Korea", "KP", "PRK", "DPRK"),
+    ("North Macedonia", "MK", "MKD", "Macedonia"),
+    ("Norway", "NO", "NOR"),
+    ("Oman", "OM", "OMN"),
+    ("Pakistan", "PK", "PAK"),
+    ("Palau", "PW", "PLW"),
+    ("Palestine", "PS", "PSE"),
+    ("Panama", "PA", "PAN"),
+    ("Papua New Guinea", "PG", "PNG"),
+    ("Paraguay", "PY", "PRY"),
+    ("Peru", "PE", "PER"),
+    ("Philippines", "PH", "PHL"),
+    ("Poland", "PL", "POL"),
+    ("Portugal", "PT", "PRT"),
+    ("Puerto Rico", "PR", "PRI"),
+    ("Qatar", "QA", "QAT"),
+    ("Romania", "RO", "ROU"),
+    ("Russia", "RU", "RUS", "Russian Federation"),
+    ("Rwanda", "RW", "RWA"),
+    ("Saint Kitts and Nevis", "KN", "KNA", "St Kitts and Nevis"),
+    ("Saint Lucia", "LC", "LCA", "St Lucia"),
+    ("Saint Vincent and the Grenadines", "VC", "VCT", "St Vincent and the Grenadines"),
+    ("Samoa", "WS", "WSM"),
+    ("San Marino", "SM", "SMR"),
+    ("Sao Tome and Principe", "ST", "STP"),
+    ("Saudi Arabia", "SA", "SAU"),
+    ("Senegal", "SN", "SEN"),
+    ("Serbia", "RS", "SRB"),
+    ("Seychelles", "SC", "SYC"),
+    ("Sierra Leone", "SL", "SLE"),
+    ("Singapore", "SG", "SGP"),
+    ("Slovakia", "SK", "SVK"),
+    ("Slovenia", "SI", "SVN"),
+    ("Solomon Islands", "SB", "SLB"),
+    ("Somalia", "SO", "SOM"),
+    ("South Africa", "ZA", "ZAF", "RSA"),
+    ("South Korea", "KR", "KOR", "Korea", "Republic of Korea"),
+    ("South Sudan", "SS", "SSD"),
+    ("Spain", "ES", "ESP", "Espana"),
+    ("Sri Lanka", "LK", "LKA"),
+    ("Sudan", "SD", "SDN"),
+    ("Suriname", "SR", "SUR"),
+    ("Sweden", "SE", "SWE"),
+    ("Switzerland", "CH", "CHE"),
+    ("Syria", "SY", "SYR"),
+    ("Taiwan", "TW", "TWN"),
+    ("Tajikistan", "TJ", "TJK"),
+    ("Tanzania", "TZ", "TZA"),
+    ("Thailand", "TH", "THA"),
+    ("Timor-Leste", "TL", "TLS", "East Timor"),
+    ("Togo", "TG", "TGO"),
+    ("Tonga", "TO", "TON"),
+    ("Trinidad and Tobago", "TT", "TTO"),
+    ("Tunisia", "TN", "TUN"),
+    ("Turkey", "TR", "TUR", "Turkiye"),
+    ("Turkmenistan", "TM", "TKM"),
+    ("Tuvalu", "TV", "TUV"),
+    ("Uganda", "UG", "UGA"),
+    ("Ukraine", "UA", "UKR"),
+    ("United Arab Emirates", "AE", "ARE", "UAE", "Emirates"),
+    ("United Kingdom", "GB", "GBR", "UK", "Great Britain", "Britain"),
+    ("United States", "US", "USA", "United States of America", "America"),
+    ("Uruguay", "UY", "URY"),
+    ("Uzbekistan", "UZ", "UZB"),
+    ("Vanuatu", "VU", "VUT"),
+    ("Vatican City", "VA", "VAT", "Holy See"),
+    ("Venezuela", "VE", "VEN"),
+    ("Vietnam", "VN", "VNM", "Viet Nam"),
+    ("Yemen", "YE", "YEM"),
+    ("Zambia", "ZM", "ZMB"),
+    ("Zimbabwe", "ZW", "ZWE"),
+)
+
+
+def country_key(name):
+    """Returns the case-, whitespace-, punctuation- and diacritic-insensitive lookup key for a country name."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    key = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    # "Cote d'Ivoire" and "St. Lucia" match "cote divoire" and "st lucia"; other separators become spaces
+    key = re.sub(r"['’.]", "", key.replace('&', ' and '))
+    return " ".join(re.sub(r"[\W_]+", " ", key).split())
+
+
+def clean_country_name(name):
+    """Trims a requested country name and collapses its whitespace, keeping its spelling."""
+    return " ".join(name.split())
+
+
+def seed_aliases():
+    """Returns the built-in alias table: the key of every name and code in COUNTRIES -> canonical name."""
+    aliases = {}
+    for canonical, *names in COUNTRIES:
+        for name in (canonical, *names):
+            aliases[country_key(name)] = canonical
+    return aliases
@@ -0,0 +1,84 @@
+import os
+import hashlib
+import threading
+
+from werkzeug.http import http_date
+
+from utils.cache import TTLCache
+
+# Cache-Control sent with each cacheable route
+CACHE_CONTROL = {
+    'country': os.getenv('CACHE_CONTROL_COUNTRY', 'public, max-age=60'),
+    'economy': os.getenv('CACHE_CONTROL_ECONOMY', 'public, max-age=300'),
+    'country_summary': os.getenv('CACHE_CONTROL_COUNTRY_SUMMARY', 'public, max-age=3600'),
+}
+
+# Serialised response bodies, keyed by route, resource and ETag, so repeat reads skip JSON encoding
+HTTP_BODY_CACHE_SIZE = int(os.getenv('HTTP_BODY_CACHE_SIZE', 2048))
+HTTP_BODY_CACHE_TTL = float(os.getenv('HTTP_BODY_CACHE_TTL', 3600))
+
+_bodies = TTLCache(HTTP_BODY_CACHE_SIZE, HTTP_BODY_CACHE_TTL)
+_stats_lock = threading.Lock()
+_stats = {'not_modified': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def version_tag(*timestamps):
+    """Builds an ETag value from row timestamps (microseconds since the epoch, in hex)."""
+    return "-".join(format(int(timestamp.timestamp() * 1_000_000), 'x') for timestamp in timestamps)
+
+
+def content_tag(*parts):
+    """Builds an ETag value from a hash of the given strings."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Evaluates If-None-Match (which takes precedence) and If-Modified-Since against a resource."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole-second precision
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def cached_json_response(request, route, resource, etag, payload, dumps, last_modified=None, headers=None):
+    """Returns a (body, status, headers) response for `payload` with validators and Cache-Control.
+
+    Answers 304 with no body when the client's copy is current. Otherwise the JSON body is serialised
+    with `dumps` once per (route, resource, etag) and reused. `payload` may be a callable, so a repeat
+    read does not even have to build it.
+    """
+    response_headers = dict(headers or {})
+    response_headers['ETag'] = f'"{etag}"'
+    response_headers['Cache-Control'] = CACHE_CONTROL[route]
+    if last_modified is not None:
+        response_headers['Last-Modified'] = http_date(last_modified)
+
+    if is_not_modified(request, etag, last_modified):
+        _count('not_modified')
+        return b'', 304, response_headers
+
+    key = (route, resource, etag)
+    body = _bodies.get(key)
+    if body is None:
+        body = (dumps(payload() if callable(payload) else payload) + "\n").encode('utf-8')
+        _bodies.set(key, body)
+    response_headers['Content-Type'] = 'application/json'
+    return body, 200, response_headers
+
+
+def get_http_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['bodies'] = _bodies.stats()
+    return stats
@@ -0,0 +1,202 @@
+import os
+import time
+import bisect
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set METRICS_ENABLED=0 to turn every timer into a no-op
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+
+# Latency buckets in seconds, from a cache hit to a slow LLM completion
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Route template of the request being served; work outside a request is labelled 'background'
+_current_route = ContextVar('current_route', default='background')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label combination."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram per label combination; an observation is one bisect and a few additions."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [per-bucket counts (last one is +Inf), sum, count]
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                label_text = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'country_api_request_duration_seconds', "Time spent serving each HTTP request.", ('route', 'method', 'status')
+)
+STAGE_DURATION = Histogram(
+    'country_api_stage_duration_seconds', "Time spent in each stage (DB, upstream, prompt, Groq) of a request.",
+    ('route', 'stage')
+)
+STAGE_ERRORS = Counter(
+    'country_api_stage_errors_total', "Stages that raised an exception, including ones later handled.", ('route', 'stage')
+)
+QUEUE_WAIT = Histogram(
+    'country_api_quota_queue_wait_seconds', "Time upstream calls waited for rate-limit quota.", ('provider', 'priority')
+)
+QUEUE_REJECTED = Counter(
+    'country_api_quota_rejected_total', "Upstream calls rejected for lack of quota.", ('provider', 'priority')
+)
+
+UPSTREAM_SKIPPED = Counter(
+    'country_api_upstream_skipped_total', "Upstream calls not made because the negative cache knew the answer.",
+    ('provider', 'tier')
+)
+
+_registry = [REQUEST_DURATION, STAGE_DURATION, STAGE_ERRORS, QUEUE_WAIT, QUEUE_REJECTED, UPSTREAM_SKIPPED]
+
+
+def set_route(route):
+    """Labels the stages timed from here on in this thread or task with `route`."""
+    _current_route.set(route)
+
+
+def current_route():
+    return _current_route.get()
+
+
+def observe_request(route, method, status, seconds):
+    if METRICS_ENABLED:
+        REQUEST_DURATION.observe(seconds, route, method, str(status))
+
+
+def observe_stage(stage, seconds, error=False):
+    """Records one timed stage under the current route."""
+    if not METRICS_ENABLED:
+        return
+    route = _current_route.get()
+    STAGE_DURATION.observe(seconds, route, stage)
+    if error:
+        STAGE_ERRORS.inc(route, stage)
+
+
+def observe_queue_wait(provider, priority, seconds):
+    if METRICS_ENABLED:
+        QUEUE_WAIT.observe(seconds, provider, priority)
+
+
+def count_queue_rejection(provider, priority):
+    if METRICS_ENABLED:
+        QUEUE_REJECTED.inc(provider, priority)
+
+
+def count_upstream_skipped(provider, tier):
+    if METRICS_ENABLED:
+        UPSTREAM_SKIPPED.inc(provider, tier)
+
+
+@contextmanager
+def track(stage):
+    """Times the enclosed block as `stage`, counting it as an error if it raises."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        # Cancellations and closed generators are timed but not counted as errors
+        observe_stage(stage, time.perf_counter() - started, error=error)
+
+
+def timed(stage):
+    """Decorator form of track() for plain functions and coroutines."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with track(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Content type Prometheus expects from a text-format scrape
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
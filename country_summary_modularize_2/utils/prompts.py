@@ -1,4 +1,5 @@
 import string  # Add this import at the top of the file
+from utils.metrics import timed
 
 # Define the population density prompt with placeholders for data
 POPULATION_DENSITY_PROMPT = """
@@ -90,6 +91,50 @@ Population: {population}
 Provide insights on the country's economy, tourism, and demographics in a paragraph.
 """
 
+# Parameters with a dedicated prompt, in the order multi-aspect responses list them
+SUMMARY_PARAMETERS = ('population_density', 'trade', 'import_export')
+
+# One prompt covering several parameters; the country's data is listed once and the model answers in JSON
+MULTI_ASPECT_PROMPT = """
+Analyze the economy of {country_name} based on the following data:
+
+1. Population and Urbanization:
+   - Total population: {population}
+   - Urban population: {urban_population} ({urban_population_percentage:.2f}% of total)
+   - Urban population growth rate: {urban_population_growth:.2f}%
+   - Population density: {population_density:.2f} people per square kilometer
+
+2. Economic Indicators:
+   - Gross Domestic Product (GDP): ${gdp} billion
+   - GDP growth rate: {gdp_growth:.2f}%
+   - GDP per capita: ${gdp_per_capita}
+
+3. Trade Profile:
+   - Exports: ${exports} billion
+   - Imports: ${imports} billion
+   - Trade balance: ${trade_balance} billion ({trade_balance_status})
+   - Trade to GDP ratio: {trade_to_gdp_ratio:.2f}%
+   - Export to GDP ratio: {exports_to_gdp_ratio:.2f}%
+   - Import to GDP ratio: {imports_to_gdp_ratio:.2f}%
+   - Trade openness index: {trade_openness_index:.2f}%
+
+Write a separate concise summary for each of these aspects:
+{aspects}
+
+Respond with a single JSON object and nothing else. Use exactly these keys: {keys}. Each value must be the summary for that aspect as a plain string.
+"""
+
+# What each section of a multi-aspect response should cover, mirroring the single-parameter prompts
+ASPECT_INSTRUCTIONS = {
+    "population_density": "population density and urbanization trends, how the density compares to the global average, "
+                          "the implications of the urbanization rate on infrastructure and resources, and the challenges "
+                          "or opportunities of the current population distribution",
+    "trade": "the economic situation shown by GDP, GDP growth, GDP per capita and the trade to GDP ratio, including "
+             "strengths, weaknesses, growth prospects and the factors helping or hindering growth",
+    "import_export": "import and export patterns, any trade surplus or deficit, the level of trade openness, and "
+                     "potential areas for trade diversification or improvement",
+}
+
 # Function to retrieve the appropriate prompt based on the parameter
 def get_prompt_for_parameter(parameter):
     prompts = {
@@ -103,56 +148,156 @@ def get_prompt_for_parameter(parameter):
 def get_comprehensive_prompt():
     return COMPREHENSIVE_PROMPT
 
-def format_prompt(prompt, country_name, data):
-    # Create a copy of the data to avoid modifying the original
-    formatted_data = data.copy()
-
-    # Add country_name to the data dictionary
-    formatted_data['country_name'] = country_name
-
-    # Helper function to safely get values and perform calculations
-    def safe_calc(operation, default=0):
-        try:
-            return operation()
-        except (KeyError, TypeError, ZeroDivisionError):
-            return default
-
-    # Calculate additional metrics
-    formatted_data['urban_population_percentage'] = safe_calc(lambda: (formatted_data.get('urban_population', 0) / formatted_data.get('population', 1)) * 100)
-    formatted_data['population_density'] = safe_calc(lambda: formatted_data.get('population', 0) / formatted_data.get('surface_area', 1))
-    formatted_data['trade_to_gdp_ratio'] = safe_calc(lambda: ((formatted_data.get('exports', 0) + formatted_data.get('imports', 0)) / formatted_data.get('gdp', 1)) * 100)
-    formatted_data['trade_balance'] = safe_calc(lambda: formatted_data.get('exports', 0) - formatted_data.get('imports', 0))
-    formatted_data['trade_balance_status'] = 'surplus' if formatted_data['trade_balance'] > 0 else 'deficit'
-    formatted_data['exports_to_gdp_ratio'] = safe_calc(lambda: (formatted_data.get('exports', 0) / formatted_data.get('gdp', 1)) * 100)
-    formatted_data['imports_to_gdp_ratio'] = safe_calc(lambda: (formatted_data.get('imports', 0) / formatted_data.get('gdp', 1)) * 100)
-    formatted_data['trade_openness_index'] = safe_calc(lambda: ((formatted_data.get('exports', 0) + formatted_data.get('imports', 0)) / formatted_data.get('gdp', 1)) * 100)
-
-    # Ensure all required fields are present, use placeholders if missing
-    required_fields = ['population', 'urban_population', 'urban_population_growth', 'gdp', 'gdp_growth', 'gdp_per_capita', 'exports', 'imports', 'surface_area']
-    for field in required_fields:
-        if field not in formatted_data or formatted_data[field] is None:
-            formatted_data[field] = "N/A"
-
-    # Format numbers for better readability
-    for key, value in formatted_data.items():
-        if isinstance(value, (int, float)):
-            if abs(value) >= 1e9:
-                formatted_data[key] = f"{value/1e9:.2f} billion"
-            elif abs(value) >= 1e6:
-                formatted_data[key] = f"{value/1e6:.2f} million"
-            elif abs(value) >= 1e3:
-                formatted_data[key] = f"{value/1e3:.2f} thousand"
+# The engine below (templates, derive_metrics, CompiledPrompt) is vendored in country_summarizer_modularized/prompts.py;
+# keep that copy in sync when changing it.
+
+# Metrics derived from the stored fields, shared by every template
+DERIVED_METRICS = (
+    'urban_population_percentage', 'population_density', 'trade_to_gdp_ratio', 'trade_balance',
+    'trade_balance_status', 'exports_to_gdp_ratio', 'imports_to_gdp_ratio', 'trade_openness_index',
+)
+
+_DERIVED_METRIC_SET = frozenset(DERIVED_METRICS)
+
+# Fields shown as "N/A" when missing or NULL
+REQUIRED_FIELDS = frozenset([
+    'population', 'urban_population', 'urban_population_growth', 'gdp', 'gdp_growth',
+    'gdp_per_capita', 'exports', 'imports', 'surface_area',
+])
+
+
+def _percent(numerator, denominator):
+    try:
+        return (numerator / denominator) * 100
+    except (TypeError, ZeroDivisionError):
+        return 0
+
+
+def derive_metrics(data):
+    """Computes every derived metric in one pass; missing inputs and zero divisors yield 0."""
+    exports = data.get('exports', 0)
+    imports = data.get('imports', 0)
+    gdp = data.get('gdp', 1)
+    try:
+        trade_total = exports + imports
+    except TypeError:
+        trade_total = None
+    try:
+        trade_balance = exports - imports
+    except TypeError:
+        trade_balance = 0
+    try:
+        population_density = data.get('population', 0) / data.get('surface_area', 1)
+    except (TypeError, ZeroDivisionError):
+        population_density = 0
+
+    trade_to_gdp_ratio = _percent(trade_total, gdp)
+    return {
+        'urban_population_percentage': _percent(data.get('urban_population', 0), data.get('population', 1)),
+        'population_density': population_density,
+        'trade_to_gdp_ratio': trade_to_gdp_ratio,
+        'trade_balance': trade_balance,
+        'trade_balance_status': 'surplus' if trade_balance > 0 else 'deficit',
+        'exports_to_gdp_ratio': _percent(exports, gdp),
+        'imports_to_gdp_ratio': _percent(imports, gdp),
+        # Same formula as the trade-to-GDP ratio, reported under its own name
+        'trade_openness_index': trade_to_gdp_ratio,
+    }
+
+
+def humanize_number(value):
+    """Formats numbers for readability (e.g. 1.50 billion); other values are returned unchanged."""
+    if isinstance(value, (int, float)):
+        if abs(value) >= 1e9:
+            return f"{value/1e9:.2f} billion"
+        elif abs(value) >= 1e6:
+            return f"{value/1e6:.2f} million"
+        elif abs(value) >= 1e3:
+            return f"{value/1e3:.2f} thousand"
+        return f"{value:.2f}"
+    return value
+
+
+def _format_field(value, format_spec):
+    if format_spec.endswith('f') and not isinstance(value, (int, float)):
+        return value  # Return the value as-is if it's not a number
+    return format(value, format_spec)
+
+
+class CompiledPrompt:
+    """A prompt template parsed once into literal text and field slots."""
+
+    def __init__(self, template):
+        self.template = template
+        self.segments = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if field_name is not None and not field_name.isidentifier():
+                raise ValueError(f"Unsupported placeholder {{{field_name}}} in prompt template")
+            self.segments.append((literal, field_name, format_spec or '', conversion))
+        self.fields = frozenset(field for _, field, _, _ in self.segments if field)
+        self.needs_metrics = not self.fields.isdisjoint(DERIVED_METRICS)
+
+    def render(self, country_name, data):
+        """Fills the template straight from `data`, formatting only the fields it uses.
+
+        Derived metrics already present in `data` (stored rows carry them) are used as-is.
+        """
+        metrics = data
+        if self.needs_metrics and any(data.get(metric) is None for metric in DERIVED_METRICS):
+            metrics = derive_metrics(data)
+        parts = []
+        for literal, field_name, format_spec, conversion in self.segments:
+            parts.append(literal)
+            if field_name is None:
+                continue
+            if field_name == 'country_name':
+                value = country_name
+            elif field_name in _DERIVED_METRIC_SET:
+                value = metrics[field_name]
             else:
-                formatted_data[key] = f"{value:.2f}"
-        elif value == "N/A":
-            formatted_data[key] = "N/A"
-
-    # Use a custom formatter to handle the formatting
-    class CustomFormatter(string.Formatter):
-        def format_field(self, value, format_spec):
-            if format_spec.endswith('f') and not isinstance(value, (int, float)):
-                return value  # Return the value as-is if it's not a number
-            return super().format_field(value, format_spec)
-
-    formatter = CustomFormatter()
-    return formatter.format(prompt, **formatted_data)
+                value = data.get(field_name)
+                if value is None:
+                    if field_name in REQUIRED_FIELDS:
+                        value = "N/A"
+                    elif field_name not in data:
+                        raise KeyError(field_name)
+            value = humanize_number(value)
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            parts.append(_format_field(value, format_spec))
+        return "".join(parts)
+
+
+_compiled_prompts = {}
+
+
+def compile_prompt(template):
+    """Returns the compiled form of `template`, parsing each distinct template only once."""
+    compiled = _compiled_prompts.get(template)
+    if compiled is None:
+        compiled = _compiled_prompts[template] = CompiledPrompt(template)
+    return compiled
+
+
+# Compile the built-in templates at import time
+for _template in (POPULATION_DENSITY_PROMPT, TRADE_PROMPT, IMPORT_EXPORT_PROMPT, COMPREHENSIVE_PROMPT, COUNTRY_SUMMARY_PROMPT,
+                  MULTI_ASPECT_PROMPT):
+    compile_prompt(_template)
+
+
+@timed('format_prompt')
+def format_prompt(prompt, country_name, data):
+    """Renders a prompt template with a country's data and its derived metrics."""
+    return compile_prompt(prompt).render(country_name, data)
+
+
+@timed('format_prompt')
+def format_multi_aspect_prompt(parameters, country_name, data):
+    """Renders MULTI_ASPECT_PROMPT asking for one JSON section per parameter."""
+    aspects = "\n".join(f"- {parameter}: {ASPECT_INSTRUCTIONS[parameter]}" for parameter in parameters)
+    keys = ", ".join(f'"{parameter}"' for parameter in parameters)
+    return compile_prompt(MULTI_ASPECT_PROMPT).render(country_name, dict(data, aspects=aspects, keys=keys))
@@ -0,0 +1,386 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.circuit_breaker import CircuitOpenError
+from utils.metrics import observe_queue_wait, count_queue_rejection
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Lower values are admitted first
+INTERACTIVE, BACKGROUND = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+# Longest a call may queue for quota before it is rejected, by priority
+QUOTA_MAX_WAIT = float(os.getenv('QUOTA_MAX_WAIT', 10))
+QUOTA_BACKGROUND_MAX_WAIT = float(os.getenv('QUOTA_BACKGROUND_MAX_WAIT', 120))
+QUOTA_QUEUE_SIZE = int(os.getenv('QUOTA_QUEUE_SIZE', 256))
+# Processes sharing the same API keys (web workers on every node plus summary job worker processes). Buckets
+# live in process memory, so each process admits only its share of a key's limits.
+QUOTA_PROCESSES = max(1, int(os.getenv('QUOTA_PROCESSES', os.getenv('WEB_CONCURRENCY', 1))))
+
+# Priority of upstream calls made in this thread or task; background work lowers it with background_priority()
+_priority = ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Queues the upstream calls made inside the block behind interactive ones."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def set_priority(priority):
+    """Sets the priority of upstream calls made from here on in this thread or task."""
+    _priority.set(priority)
+
+
+
+def parse_retry_after(value, default=1.0):
+    """Seconds from a Retry-After header value, or `default` when it is missing or an HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+class QuotaExhaustedError(CircuitOpenError):
+    """Raised when a call cannot get quota before its deadline; answered like an open circuit."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(name, retry_after, reason='quota exhausted')
+
+
+class TokenBucket:
+    """Refills `per_minute` tokens a minute up to a full minute's worth; not thread-safe on its own.
+
+    The balance may go negative when a call turns out to have used more than it reserved.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` tokens (capped at the capacity) are available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+
+class _Lane:
+    """Quota of one API key: a request bucket, an optional token bucket and a pause after a 429."""
+
+    __slots__ = ('key', 'requests', 'tokens', 'paused_until', 'admitted', 'throttled')
+
+    def __init__(self, key, requests_per_minute, tokens_per_minute):
+        self.key = key
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+        self.admitted = 0
+        self.throttled = 0
+
+    def delay(self, cost, now):
+        delay = max(0.0, self.paused_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(cost, now))
+        return delay
+
+    def take(self, cost, now):
+        self.admitted += 1
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(cost, now)
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'cost', 'enqueued', 'deadline', 'rejected', 'wake')
+
+    def __init__(self, priority, seq, cost, enqueued, deadline, wake):
+        self.priority = priority
+        self.seq = seq
+        self.cost = cost
+        self.enqueued = enqueued
+        self.deadline = deadline
+        self.rejected = False
+        self.wake = wake
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class QuotaScheduler:
+    """Admits calls to a rate-limited provider in priority order, within per-key token buckets.
+
+    Callers queue in a bounded priority queue; only the head of the queue is admitted, as soon as one
+    of the provider's API keys has quota for it (keys are tried round-robin). A full queue evicts its
+    lowest-priority waiter for a more urgent one. A call that would wait past its deadline
+    (QUOTA_MAX_WAIT, or QUOTA_BACKGROUND_MAX_WAIT for background work) fails at once with
+    QuotaExhaustedError. Works from threads and from asyncio tasks alike.
+
+    `requests_per_minute` and `tokens_per_minute` are a key's limits across the whole deployment; with
+    `processes` > 1 this scheduler enforces a 1/`processes` share of them.
+    """
+
+    def __init__(self, name, keys, requests_per_minute, tokens_per_minute=0, max_queue=QUOTA_QUEUE_SIZE,
+                 processes=1):
+        self.name = name
+        self.max_queue = max_queue
+        self.max_wait = {INTERACTIVE: QUOTA_MAX_WAIT, BACKGROUND: QUOTA_BACKGROUND_MAX_WAIT}
+        self.processes = max(1, processes)
+        self.limits = {'requests_per_minute': requests_per_minute, 'tokens_per_minute': tokens_per_minute}
+        # Without configured keys, one unnamed lane still enforces the quota
+        self._lanes = [
+            _Lane(key, requests_per_minute / self.processes, tokens_per_minute / self.processes)
+            for key in (keys or [None])
+        ]
+        self._lanes_by_key = {lane.key: lane for lane in self._lanes}
+        self._next_lane = 0
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._stats = {
+            'admitted': {name: 0 for name in PRIORITY_NAMES.values()},
+            'rejected': {name: 0 for name in PRIORITY_NAMES.values()},
+            'evicted': 0,
+            'throttled': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, name, prefix, keys, requests_per_minute, tokens_per_minute=0):
+        """Builds a scheduler configured through `<prefix>_REQUESTS_PER_MINUTE` and `<prefix>_TOKENS_PER_MINUTE`.
+
+        A limit of 0 turns that bucket off. Limits are split over QUOTA_PROCESSES processes.
+        """
+        return cls(
+            name,
+            keys,
+            requests_per_minute=float(os.getenv(f'{prefix}_REQUESTS_PER_MINUTE', requests_per_minute)),
+            tokens_per_minute=float(os.getenv(f'{prefix}_TOKENS_PER_MINUTE', tokens_per_minute)),
+            processes=QUOTA_PROCESSES,
+        )
+
+    @property
+    def keys(self):
+        return [lane.key for lane in self._lanes]
+
+    # All methods below starting with an underscore expect self._lock to be held
+
+    def _enqueue(self, cost, wake):
+        now = time.monotonic()
+        priority = _priority.get()
+        waiter = _Waiter(priority, next(self._seq), cost, now, now + self.max_wait[priority], wake)
+        if len(self._queue) >= self.max_queue:
+            lowest = max(self._queue)
+            if not waiter < lowest:
+                self._reject(waiter, self._retry_after(now))
+            # Make room by dropping the least urgent waiter, which fails when it wakes
+            self._remove(lowest)
+            lowest.rejected = True
+            self._stats['evicted'] += 1
+            lowest.wake()
+        heapq.heappush(self._queue, waiter)
+        return waiter
+
+    def _remove(self, waiter):
+        was_head = self._queue[0] is waiter
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        if was_head and self._queue:
+            self._queue[0].wake()
+
+    def _retry_after(self, now):
+        return min(lane.delay(1, now) for lane in self._lanes) or 1.0
+
+    def _reject(self, waiter, retry_after):
+        self._stats['rejected'][PRIORITY_NAMES[waiter.priority]] += 1
+        count_queue_rejection(self.name, PRIORITY_NAMES[waiter.priority])
+        raise QuotaExhaustedError(self.name, retry_after)
+
+    def _poll(self, waiter):
+        """Admits `waiter` and returns (key, None), or returns (None, seconds to wait before polling again)."""
+        now = time.monotonic()
+        if waiter.rejected:
+            self._reject(waiter, self._retry_after(now))
+        if self._queue[0] is not waiter:
+            if now >= waiter.deadline:
+                self._remove(waiter)
+                self._reject(waiter, self._retry_after(now))
+            return None, waiter.deadline - now
+
+        count = len(self._lanes)
+        best, best_delay = None, None
+        for offset in range(count):
+            lane = self._lanes[(self._next_lane + offset) % count]
+            delay = lane.delay(waiter.cost, now)
+            if best_delay is None or delay < best_delay:
+                best, best_delay = lane, delay
+            if delay == 0:
+                break
+        if best_delay > 0:
+            if now + best_delay > waiter.deadline:
+                # Fail fast instead of holding the caller for longer than it is willing to wait
+                self._remove(waiter)
+                self._reject(waiter, best_delay)
+            return None, best_delay
+
+        best.take(waiter.cost, now)
+        self._next_lane = (self._lanes.index(best) + 1) % count
+        heapq.heappop(self._queue)
+        if self._queue:
+            self._queue[0].wake()
+        waited = now - waiter.enqueued
+        self._stats['admitted'][PRIORITY_NAMES[waiter.priority]] += 1
+        self._stats['wait_total'] += waited
+        self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+        observe_queue_wait(self.name, PRIORITY_NAMES[waiter.priority], waited)
+        return best.key, None
+
+    def acquire(self, cost=1):
+        """Blocks until a key has quota for a call estimated at `cost` tokens and returns that key.
+
+        Raises QuotaExhaustedError when the call cannot be admitted before its deadline.
+        """
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enqueue(cost, event.set)
+        try:
+            while True:
+                with self._lock:
+                    event.clear()
+                    key, delay = self._poll(waiter)
+                if delay is None:
+                    return key
+                event.wait(delay)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def acquire_async(self, cost=1):
+        """Async counterpart of acquire(); waiting does not block the event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self._lock:
+            waiter = self._enqueue(cost, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                with self._lock:
+                    event.clear()
+                    key, delay = self._poll(waiter)
+                if delay is None:
+                    return key
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def try_acquire(self, cost=1):
+        """Returns a key with quota for `cost` tokens right now, or None without waiting or queueing.
+
+        Used for optional extra calls such as hedges, which must not go ahead of queued callers.
+        """
+        with self._lock:
+            if self._queue:
+                return None
+            now = time.monotonic()
+            count = len(self._lanes)
+            for offset in range(count):
+                lane = self._lanes[(self._next_lane + offset) % count]
+                if lane.delay(cost, now) == 0:
+                    lane.take(cost, now)
+                    self._next_lane = (self._lanes.index(lane) + 1) % count
+                    self._stats['admitted'][PRIORITY_NAMES[_priority.get()]] += 1
+                    return lane.key
+        return None
+
+    def _abandon(self, waiter):
+        # Takes the lock itself: drops a waiter that gave up (cancelled, rejected) if it is still queued
+        with self._lock:
+            if waiter in self._queue:
+                self._remove(waiter)
+
+    def retry_after(self):
+        """Seconds until some key could admit a call, or 0 when one can now."""
+        with self._lock:
+            return min(lane.delay(1, time.monotonic()) for lane in self._lanes)
+
+    def settle(self, key, reserved, used):
+        """Corrects a key's token bucket once the provider reports what a call actually used."""
+        lane = self._lanes_by_key.get(key)
+        if lane is None or lane.tokens is None:
+            return
+        with self._lock:
+            lane.tokens.take(used - reserved, time.monotonic())
+            if used < reserved and self._queue:
+                self._queue[0].wake()
+
+    def throttle(self, key, retry_after):
+        """Pauses a key that the provider rate-limited (429) for `retry_after` seconds."""
+        lane = self._lanes_by_key.get(key)
+        if lane is None:
+            return
+        with self._lock:
+            lane.paused_until = max(lane.paused_until, time.monotonic() + retry_after)
+            lane.throttled += 1
+            self._stats['throttled'] += 1
+        logger.warning(f"Rate limited by {self.name}, pausing one of its keys for {retry_after:.1f}s")
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats, admitted=dict(self._stats['admitted']), rejected=dict(self._stats['rejected']))
+            stats['queued'] = len(self._queue)
+            # Availability below is this process's share only; the other processes hold the rest
+            stats['processes'] = self.processes
+            stats['limits_per_key'] = dict(self.limits)
+            stats['process_share_per_key'] = {
+                name: limit / self.processes for name, limit in self.limits.items()
+            }
+            stats['keys'] = [
+                {
+                    # Only the tail of a key, enough to tell them apart
+                    'key': f"...{lane.key[-4:]}" if lane.key else None,
+                    'requests_available': round(lane.requests.available(now), 1) if lane.requests else None,
+                    'tokens_available': round(lane.tokens.available(now), 1) if lane.tokens else None,
+                    'paused_for': round(max(0.0, lane.paused_until - now), 1),
+                    'admitted': lane.admitted,
+                    'throttled': lane.throttled,
+                }
+                for lane in self._lanes
+            ]
+        admitted = sum(stats['admitted'].values())
+        stats['wait_avg'] = stats['wait_total'] / admitted if admitted else 0.0
+        return stats
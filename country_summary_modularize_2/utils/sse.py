@@ -0,0 +1,57 @@
+import json
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ERROR_EVENT = {"error": "Failed to generate summary"}
+
+
+def format_sse(data, event=None):
+    """Encodes one Server-Sent Events message with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def wants_event_stream(request):
+    """True when a request opts into streaming via `?stream=1` or `Accept: text/event-stream`."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def stream_events(chunks):
+    """Turns a summary chunk iterator into SSE messages: one `token` event per chunk, then `done`.
+
+    An `error` event replaces `done` if the iterator fails or yields nothing.
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield format_sse({"token": chunk}, event="token")
+    except Exception as e:
+        logger.error(f"Summary stream failed: {e}")
+        yield format_sse(ERROR_EVENT, event="error")
+        return
+    if parts:
+        yield format_sse({"summary": "".join(parts).strip()}, event="done")
+    else:
+        yield format_sse(ERROR_EVENT, event="error")
+
+
+async def stream_events_async(chunks):
+    """Async counterpart of stream_events for async chunk iterators."""
+    parts = []
+    try:
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield format_sse({"token": chunk}, event="token")
+    except Exception as e:
+        logger.error(f"Summary stream failed: {e}")
+        yield format_sse(ERROR_EVENT, event="error")
+        return
+    if parts:
+        yield format_sse({"summary": "".join(parts).strip()}, event="done")
+    else:
+        yield format_sse(ERROR_EVENT, event="error")